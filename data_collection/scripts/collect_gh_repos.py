@@ -1,7 +1,13 @@
+import contextlib
+import functools
 import logging
 import multiprocessing
 import os
+import shutil
+import subprocess
 import tarfile
+import time
+from typing import IO, Any, Dict, Iterator, Literal, Optional, Tuple, cast
 
 import git
 import hydra
@@ -10,6 +16,20 @@ from dotenv import load_dotenv
 from hydra.utils import to_absolute_path
 from omegaconf import DictConfig, OmegaConf
 from pydantic import BaseModel
+from tqdm import tqdm
+
+MANIFEST_FILE_NAME = "manifest.jsonl"
+
+COMPRESSORS = {
+    "gz": lambda level, threads: ["pigz", f"-{level or 6}", *([f"-p{threads}"] if threads else [])],
+    "zst": lambda level, threads: ["zstd", f"-{level or 3}", f"-T{threads}", "-q"],
+}
+"""External tools used for compressing archives in a separate (multi-threaded) process when available."""
+
+DECOMPRESSORS = {
+    "gz": ["pigz", "-dc"],
+    "zst": ["zstd", "-dcq"],
+}
 
 
 class RepoDataCollectionConfig(BaseModel):
@@ -26,6 +46,20 @@ class RepoDataCollectionConfig(BaseModel):
     output_dir: str
     """Path to directory where archived repositories will be saved. 
     Will be appended to the path specified in `DATA_ROOT` environment variable."""
+    compression: Literal["gz", "zst"] = "gz"
+    """Compression for archives: `gz` (`.tar.gz`) or `zst` (`.tar.zst`)."""
+    compression_level: Optional[int] = None
+    """Compression level; the default one for the chosen compression if not set."""
+    compression_threads: Optional[int] = None
+    """Number of threads for compression of each archive (when `pigz`/`zstd` are available); 0 means all available
+    cores. By default, available cores are split between `num_workers` processes."""
+    mirror_dir: Optional[str] = None
+    """Path to directory where clones are kept between runs. When not set, clones are stored in `temp_dir`
+    and removed right after archiving.
+    Will be appended to the path specified in `DATA_ROOT` environment variable."""
+    update: bool = False
+    """Set to True to refresh existing archives: new objects are fetched into the clones from `mirror_dir`,
+    and only repositories whose refs have changed are archived again. Requires `mirror_dir`."""
 
 
 class RepoProcessor:
@@ -33,48 +67,238 @@ class RepoProcessor:
         self,
         temp_dir: str,
         output_dir: str,
+        compression: Literal["gz", "zst"] = "gz",
+        compression_level: Optional[int] = None,
+        compression_threads: int = 0,
+        mirror_dir: Optional[str] = None,
     ):
         self.temp_dir = temp_dir
         self.output_dir = output_dir
+        self.compression = compression
+        self.compression_level = compression_level
+        self.compression_threads = compression_threads
+        self.mirror_dir = mirror_dir
+
+    def get_archive_path(self, repo_name: str) -> str:
+        return os.path.join(self.output_dir, f"{repo_name.replace('/', '__')}.tar.{self.compression}")
+
+    def get_clone_path(self, repo_name: str) -> str:
+        return os.path.join(self.mirror_dir or self.temp_dir, repo_name.replace("/", "__"))
 
     def _clone_repo(self, repo_name: str) -> str:
-        tmp_repo_path = os.path.join(self.temp_dir, repo_name.replace("/", "__"))
+        tmp_repo_path = self.get_clone_path(repo_name)
+        if os.path.exists(tmp_repo_path):
+            shutil.rmtree(tmp_repo_path)
         git.Repo.clone_from(f"https://github.com/{repo_name}.git", tmp_repo_path)
-        repo = git.Repo(tmp_repo_path)
-        repo.remotes.origin.fetch()
         return tmp_repo_path
 
+    @staticmethod
+    def _get_objects_size(repo_path: str) -> int:
+        size = 0
+        for root, _, files in os.walk(os.path.join(repo_path, ".git", "objects")):
+            for file in files:
+                with contextlib.suppress(OSError):
+                    size += os.path.getsize(os.path.join(root, file))
+        return size
+
+    @staticmethod
+    def _get_refs(repo: git.Repo) -> str:
+        return repo.git.for_each_ref("--format=%(refname) %(objectname)")
+
+    def _fetch_repo(self, repo_name: str) -> Tuple[bool, int]:
+        """Fetches new objects into the existing clone.
+
+        Returns:
+            Whether any refs have changed and number of bytes added to the clone's object storage.
+        """
+        repo_path = self.get_clone_path(repo_name)
+        repo = git.Repo(repo_path)
+        refs_before, size_before = self._get_refs(repo), self._get_objects_size(repo_path)
+        repo.remotes.origin.fetch(prune=True)
+        refs_after, size_after = self._get_refs(repo), self._get_objects_size(repo_path)
+        if refs_before != refs_after:
+            # keep the working tree in archives the same as in a fresh clone
+            repo.git.reset("--hard", "origin/HEAD")
+        return refs_before != refs_after, max(size_after - size_before, 0)
+
+    @contextlib.contextmanager
+    def _open_compressed_stream(self, path: str) -> Iterator[IO[bytes]]:
+        compressor = COMPRESSORS[self.compression](self.compression_level, self.compression_threads)
+        if shutil.which(compressor[0]):
+            with open(path, "wb") as f:
+                process = subprocess.Popen(compressor, stdin=subprocess.PIPE, stdout=f)
+                assert process.stdin is not None
+                try:
+                    yield process.stdin
+                finally:
+                    process.stdin.close()
+                    return_code = process.wait()
+            if return_code != 0:
+                raise RuntimeError(f"{compressor[0]} failed to compress {path}.")
+        elif self.compression == "gz":
+            import gzip
+
+            with gzip.open(path, "wb", compresslevel=self.compression_level or 6) as gzip_stream:
+                yield cast(IO[bytes], gzip_stream)
+        else:
+            import zstandard  # type: ignore[import-untyped, import-not-found]
+
+            zstd = zstandard.ZstdCompressor(level=self.compression_level or 3, threads=self.compression_threads or -1)
+            with open(path, "wb") as f, zstd.stream_writer(f) as writer:
+                yield writer
+
     def _compress_repo(self, repo_path: str, repo_name: str) -> str:
-        final_path = os.path.join(self.output_dir, f"{repo_name.replace('/', '__')}.tar.gz")
-        with tarfile.open(final_path, "w:gz") as tar:
-            tar.add(
-                repo_path,
-                arcname=os.path.basename(final_path),
-            )
+        final_path = self.get_archive_path(repo_name)
+        # archive is written under a temporary name, so that existing archives are always complete
+        tmp_path = f"{final_path}.tmp"
+        try:
+            with self._open_compressed_stream(tmp_path) as stream, tarfile.open(fileobj=stream, mode="w|") as tar:
+                tar.add(
+                    repo_path,
+                    arcname=os.path.basename(final_path),
+                )
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        os.replace(tmp_path, final_path)
 
         return final_path
 
-    def __call__(self, repo_name: str) -> None:
-        repo_path = self._clone_repo(repo_name=repo_name)
-        logging.info("Cloned repo!")
-        self._compress_repo(repo_path=repo_path, repo_name=repo_name)
-        logging.info("Compressed repo!")
+    def verify_archive(self, archive_path: str) -> bool:
+        """Checks that the archive can be fully read."""
+        try:
+            decompressor = DECOMPRESSORS[self.compression]
+            if shutil.which(decompressor[0]):
+                process = subprocess.Popen(
+                    [*decompressor, archive_path], stdout=subprocess.PIPE, stderr=subprocess.DEVNULL
+                )
+                assert process.stdout is not None
+                try:
+                    with tarfile.open(fileobj=process.stdout, mode="r|") as tar:
+                        for _ in tar:
+                            pass
+                except BaseException:
+                    process.kill()
+                    raise
+                finally:
+                    process.stdout.close()
+                    return_code = process.wait()
+                return return_code == 0
+            if self.compression == "gz":
+                with tarfile.open(archive_path, mode="r|gz") as tar:
+                    for _ in tar:
+                        pass
+                return True
+
+            import zstandard  # type: ignore[import-untyped, import-not-found]
+
+            with open(archive_path, "rb") as f, zstandard.ZstdDecompressor().stream_reader(f) as reader:
+                with tarfile.open(fileobj=reader, mode="r|") as tar:
+                    for _ in tar:
+                        pass
+            return True
+        except Exception as e:
+            logging.warning(f"Archive {archive_path} is corrupted: {e}")
+            return False
+
+    def __call__(self, repo_name: str) -> Dict[str, Any]:
+        archive_path = self.get_archive_path(repo_name)
+        record: Dict[str, Any] = {"repo_name": repo_name, "archive": os.path.basename(archive_path)}
+        try:
+            repo_path = self.get_clone_path(repo_name)
+            if self.mirror_dir is not None and os.path.exists(repo_path):
+                start_time = time.time()
+                refs_changed, bytes_transferred = self._fetch_repo(repo_name=repo_name)
+                record["fetch_time"] = time.time() - start_time
+                record["bytes_transferred"] = bytes_transferred
+                logging.info(f"Fetched repo! Refs changed: {refs_changed}.")
+
+                if not refs_changed and os.path.exists(archive_path):
+                    record["size_bytes"] = os.path.getsize(archive_path)
+                    record["status"] = "unchanged"
+                    return record
+            else:
+                start_time = time.time()
+                repo_path = self._clone_repo(repo_name=repo_name)
+                record["clone_time"] = time.time() - start_time
+                record["bytes_transferred"] = self._get_objects_size(repo_path)
+                logging.info("Cloned repo!")
+
+            start_time = time.time()
+            archive_path = self._compress_repo(repo_path=repo_path, repo_name=repo_name)
+            record["archive_time"] = time.time() - start_time
+            record["size_bytes"] = os.path.getsize(archive_path)
+            record["status"] = "ok"
+            logging.info("Compressed repo!")
+        except Exception as e:
+            logging.error(f"Failed to process {repo_name}: {e}")
+            record["status"] = "failed"
+            record["error"] = str(e)
+        finally:
+            if self.mirror_dir is None:
+                shutil.rmtree(self.get_clone_path(repo_name), ignore_errors=True)
+        return record
 
 
 def process_repo(
     temp_dir: str,
     output_dir: str,
     repo_name: str,
-) -> None:
-    repo_processor = RepoProcessor(temp_dir=temp_dir, output_dir=output_dir)
+    compression: Literal["gz", "zst"] = "gz",
+    compression_level: Optional[int] = None,
+    compression_threads: int = 0,
+    mirror_dir: Optional[str] = None,
+) -> Dict[str, Any]:
+    repo_processor = RepoProcessor(
+        temp_dir=temp_dir,
+        output_dir=output_dir,
+        compression=compression,
+        compression_level=compression_level,
+        compression_threads=compression_threads,
+        mirror_dir=mirror_dir,
+    )
     return repo_processor(repo_name=repo_name)
 
 
+def load_manifest(manifest_path: str) -> Dict[str, Dict[str, Any]]:
+    """Returns the latest manifest record for each repository."""
+    records: Dict[str, Dict[str, Any]] = {}
+    if os.path.exists(manifest_path):
+        with jsonlines.open(manifest_path, "r") as reader:
+            for record in reader:
+                records[record["repo_name"]] = record
+    return records
+
+
+def is_archived(repo_processor: RepoProcessor, repo_name: str, manifest: Dict[str, Dict[str, Any]]) -> bool:
+    """Checks whether the repository already has a complete archive."""
+    archive_path = repo_processor.get_archive_path(repo_name)
+    if not os.path.exists(archive_path):
+        return False
+
+    record = manifest.get(repo_name)
+    if (
+        record is not None
+        and record["status"] in ("ok", "unchanged")
+        and record["archive"] == os.path.basename(archive_path)
+        and record.get("size_bytes") == os.path.getsize(archive_path)
+    ):
+        return True
+
+    # archives without a matching manifest record (e.g., from previous versions of the script) are checked fully
+    return repo_processor.verify_archive(archive_path)
+
+
 @hydra.main(version_base="1.1", config_path="../configs", config_name="collect_gh_repos")
 def main(cfg: DictConfig):
     OmegaConf.resolve(cfg)
     # TODO: mypy error: Keywords must be strings
     cfg_model = RepoDataCollectionConfig(**cfg)  # type: ignore[misc]
+    compression_threads = cfg_model.compression_threads
+    if compression_threads is None:
+        # each worker compresses its own archive, so running all of them with all cores would oversubscribe the CPU
+        compression_threads = max(1, (os.cpu_count() or 1) // cfg_model.num_workers)
 
     load_dotenv()
     data_root = os.getenv("DATA_ROOT")
@@ -85,17 +309,56 @@ def main(cfg: DictConfig):
     os.makedirs(temp_dir, exist_ok=True)
     output_dir = to_absolute_path(os.path.join(data_root, cfg_model.output_dir))
     os.makedirs(output_dir, exist_ok=True)
+    mirror_dir = None
+    if cfg_model.mirror_dir is not None:
+        mirror_dir = to_absolute_path(os.path.join(data_root, cfg_model.mirror_dir))
+        os.makedirs(mirror_dir, exist_ok=True)
+    elif cfg_model.update:
+        raise ValueError("`mirror_dir` is required to update archives.")
 
     with jsonlines.open(to_absolute_path(os.path.join(data_root, cfg_model.input_path)), "r") as reader:
         repos = [line["repo_name"] for line in reader]
 
     logging.info(f"Got {len(repos)} repositories to process!")
 
+    manifest_path = os.path.join(output_dir, MANIFEST_FILE_NAME)
+    manifest = load_manifest(manifest_path)
+    repo_processor = RepoProcessor(
+        temp_dir=temp_dir,
+        output_dir=output_dir,
+        compression=cfg_model.compression,
+        compression_level=cfg_model.compression_level,
+        compression_threads=compression_threads,
+        mirror_dir=mirror_dir,
+    )
+    if not cfg_model.update:
+        repos = [repo for repo in repos if not is_archived(repo_processor, repo, manifest)]
+        logging.info(f"Got {len(repos)} repositories without archives.")
+
+    process_fn = functools.partial(
+        process_repo,
+        temp_dir,
+        output_dir,
+        compression=cfg_model.compression,
+        compression_level=cfg_model.compression_level,
+        compression_threads=compression_threads,
+        mirror_dir=mirror_dir,
+    )
+    # manifest is updated as soon as each repository is processed, so that interrupted runs can be resumed
+    num_archived, num_unchanged, num_failed, bytes_transferred = 0, 0, 0, 0
     with multiprocessing.Pool(processes=cfg_model.num_workers) as pool:
-        pool.starmap(
-            process_repo,
-            ((temp_dir, output_dir, repo) for repo in repos),
-        )
+        with jsonlines.open(manifest_path, "a", flush=True) as writer:
+            for record in tqdm(pool.imap_unordered(process_fn, repos), total=len(repos)):
+                writer.write(record)
+                num_archived += record["status"] == "ok"
+                num_unchanged += record["status"] == "unchanged"
+                num_failed += record["status"] == "failed"
+                bytes_transferred += record.get("bytes_transferred", 0)
+
+    logging.info(
+        f"Done! Archived {num_archived} repositories, {num_unchanged} unchanged, {num_failed} failed; "
+        f"transferred {bytes_transferred / 2**20:.1f} MiB. See {manifest_path} for details."
+    )
 
 
 if __name__ == "__main__":
@@ -1,5 +1,5 @@
-from .base import BaseDataSource
+from .base import BaseDataSource, TransformedDataSource
 from .hf import HFDataSource
 from .local import LocalFileDataSource
 
-__all__ = ["BaseDataSource", "LocalFileDataSource", "HFDataSource"]
+__all__ = ["BaseDataSource", "TransformedDataSource", "LocalFileDataSource", "HFDataSource"]
@@ -1,8 +1,115 @@
+import hashlib
+import itertools
+import os
 from abc import ABC, abstractmethod
-from typing import Any, Dict, Iterator
+from typing import Any, Callable, Dict, Iterable, Iterator, Mapping, Sequence, Set, Tuple, Union
+
+Row = Dict[str, Any]
+
+DEFAULT_KEYS = ("repository", "revision")
+"""Fields identifying a datapoint (repo@revision)."""
+
+
+def get_row_key(row: Row, keys: Sequence[str] = DEFAULT_KEYS) -> Tuple[str, ...]:
+    return tuple(str(row[key]) for key in keys)
+
+
+def missing_column_error(column: str, columns: Iterable[str]) -> KeyError:
+    return KeyError(f"The data is expected to have column {column!r}, but it has only: {list(columns)}.")
+
+
+def hash_key(key: Tuple[str, ...], seed: int = 0) -> int:
+    """Stable 64-bit hash of a key; unlike `hash`, it does not change between processes."""
+    data = "\0".join((str(seed), *key)).encode()
+    return int.from_bytes(hashlib.blake2b(data, digest_size=8).digest(), "big")
 
 
 class BaseDataSource(ABC):
+    """Iterable over datapoints (dicts).
+
+    Operators (`select`, `map`, `filter`, `shard`, `sample`, `head`, `dedupe`, `exclude`) return new data sources
+    that are applied lazily while iterating, so they can be chained without loading the underlying data, e.g.:
+    `source.dedupe().exclude("scripts.jsonl").shard(num_shards=4, index=0).head(100)`.
+    """
+
     @abstractmethod
-    def __iter__(self) -> Iterator[Dict[str, Any]]:
+    def __iter__(self) -> Iterator[Row]:
         raise NotImplementedError()
+
+    def select(self, columns: Mapping[str, str]) -> "BaseDataSource":
+        """Keep only the given columns under new names, `columns` maps new names to column names in the data,
+        e.g., `{"repository": "repo_name"}`."""
+
+        def select_columns(row: Row) -> Row:
+            try:
+                return {name: row[column] for name, column in columns.items()}
+            except KeyError as e:
+                raise missing_column_error(e.args[0], row) from None
+
+        return self.map(select_columns)
+
+    def map(self, function: Callable[[Row], Row]) -> "BaseDataSource":
+        """Apply `function` to each row."""
+        return TransformedDataSource(self, lambda rows: map(function, rows))
+
+    def filter(self, predicate: Callable[[Row], bool]) -> "BaseDataSource":
+        """Keep rows for which `predicate` is true."""
+        return TransformedDataSource(self, lambda rows: (row for row in rows if predicate(row)))
+
+    def shard(self, num_shards: int, index: int, keys: Sequence[str] = DEFAULT_KEYS) -> "BaseDataSource":
+        """Keep the `index`-th of `num_shards` disjoint shards, assigned by a hash of `keys`;
+        the assignment does not depend on the order of rows or on the process."""
+        if not 0 <= index < num_shards:
+            raise ValueError(f"Shard index should be in [0, {num_shards}), got {index}.")
+        return self.filter(lambda row: hash_key(get_row_key(row, keys)) % num_shards == index)
+
+    def sample(self, fraction: float, seed: int = 0, keys: Sequence[str] = DEFAULT_KEYS) -> "BaseDataSource":
+        """Keep approximately `fraction` of rows, chosen deterministically by a hash of `keys` and `seed`."""
+        if not 0 <= fraction <= 1:
+            raise ValueError(f"Sample fraction should be in [0, 1], got {fraction}.")
+        threshold = fraction * 2**64
+        return self.filter(lambda row: hash_key(get_row_key(row, keys), seed=seed + 1) < threshold)
+
+    def head(self, n: int) -> "BaseDataSource":
+        """Keep the first `n` rows; stops reading the underlying data source after them."""
+        return TransformedDataSource(self, lambda rows: itertools.islice(rows, n))
+
+    def dedupe(self, keys: Sequence[str] = DEFAULT_KEYS) -> "BaseDataSource":
+        """Keep the first row for each value of `keys`."""
+
+        def dedupe_rows(rows: Iterator[Row]) -> Iterator[Row]:
+            seen: Set[Tuple[str, ...]] = set()
+            for row in rows:
+                key = get_row_key(row, keys)
+                if key not in seen:
+                    seen.add(key)
+                    yield row
+
+        return TransformedDataSource(self, dedupe_rows)
+
+    def exclude(self, manifest: Union[str, Iterable[Row]], keys: Sequence[str] = DEFAULT_KEYS) -> "BaseDataSource":
+        """Drop rows listed in a manifest of completed datapoints: a local file (as in `LocalFileDataSource`;
+        a missing file excludes nothing) or an iterable of rows. The manifest is read once iteration starts."""
+
+        def exclude_rows(rows: Iterator[Row]) -> Iterator[Row]:
+            if isinstance(manifest, str):
+                from .local import LocalFileDataSource
+
+                manifest_rows: Iterable[Row] = LocalFileDataSource(manifest) if os.path.exists(manifest) else []
+            else:
+                manifest_rows = manifest
+            completed = {get_row_key(row, keys) for row in manifest_rows}
+            return (row for row in rows if get_row_key(row, keys) not in completed)
+
+        return TransformedDataSource(self, exclude_rows)
+
+
+class TransformedDataSource(BaseDataSource):
+    """Data source that lazily applies `transform` to the rows of another data source."""
+
+    def __init__(self, source: BaseDataSource, transform: Callable[[Iterator[Row]], Iterator[Row]]):
+        self._source = source
+        self._transform = transform
+
+    def __iter__(self) -> Iterator[Row]:
+        return iter(self._transform(iter(self._source)))
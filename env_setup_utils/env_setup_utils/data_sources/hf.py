@@ -1,4 +1,4 @@
-from typing import List, Optional
+from typing import Any, Dict, Iterator, List, Optional
 
 from datasets import get_dataset_config_names, load_dataset  # type: ignore[import-untyped, import-not-found]
 
@@ -6,7 +6,19 @@ from .base import BaseDataSource
 
 
 class HFDataSource(BaseDataSource):
-    """Class to iterate over a dataset from HuggingFace Hub."""
+    """Class to iterate over a dataset from HuggingFace Hub.
+
+    Args:
+        hub_name: Name of the dataset on HuggingFace Hub.
+        configs: Dataset configs to iterate over (in order); all configs by default.
+        split: Dataset split.
+        cache_dir: Directory to cache the dataset in.
+        streaming: Whether to stream the dataset instead of downloading and materializing the whole split first;
+            rows are yielded as soon as the first shard starts downloading, and memory usage does not grow
+            with the split size.
+        columns: Columns to keep (e.g., `["repository", "revision"]`); all columns by default.
+        batch_size: Number of rows converted from Arrow at once when not streaming.
+    """
 
     def __init__(
         self,
@@ -14,6 +26,9 @@ class HFDataSource(BaseDataSource):
         configs: Optional[List[str]] = None,
         split: Optional[str] = None,
         cache_dir: Optional[str] = None,
+        streaming: bool = False,
+        columns: Optional[List[str]] = None,
+        batch_size: int = 1000,
     ):
         self._hub_name = hub_name
         self._cache_dir = cache_dir
@@ -23,8 +38,21 @@ class HFDataSource(BaseDataSource):
         else:
             self._configs = get_dataset_config_names(self._hub_name)
         self._split = split
+        self._streaming = streaming
+        self._columns = columns
+        self._batch_size = batch_size
 
-    def __iter__(self):
+    def __iter__(self) -> Iterator[Dict[str, Any]]:
         for config in self._configs:
-            dataset = load_dataset(self._hub_name, config, split=self._split, cache_dir=self._cache_dir)
-            yield from dataset
+            dataset = load_dataset(
+                self._hub_name, config, split=self._split, cache_dir=self._cache_dir, streaming=self._streaming
+            )
+            if self._columns:
+                dataset = dataset.select_columns(self._columns)
+            if self._streaming:
+                yield from dataset
+                continue
+            # converting rows from Arrow in batches is much faster than indexing the dataset row by row
+            for batch in dataset.iter(batch_size=self._batch_size):
+                keys = list(batch)
+                yield from (dict(zip(keys, values)) for values in zip(*batch.values()))
@@ -1,34 +1,127 @@
 import csv
 import gzip
+import io
 import json
-from typing import Any, Dict, Iterator
+from contextlib import contextmanager
+from typing import Any, BinaryIO, Callable, Dict, Iterator, List, Optional, cast
 
-import jsonlines
+from .base import BaseDataSource, missing_column_error
 
-from .base import BaseDataSource
+try:
+    import orjson  # type: ignore[import-untyped, import-not-found]
+
+    json_loads: Callable[[bytes], Any] = orjson.loads
+except ImportError:
+    json_loads = json.loads
+
+SUPPORTED_FORMATS = (
+    ".jsonl",
+    ".jsonl.gz",
+    ".jsonl.zst",
+    ".csv",
+    ".csv.gz",
+    ".csv.zst",
+    ".parquet",
+    ".arrow",
+    ".feather",
+)
 
 
 class LocalFileDataSource(BaseDataSource):
-    """A wrapper to iterate over locally stored JSONLines or CSV file."""
+    """A wrapper to iterate over locally stored JSONLines, CSV, Parquet or Arrow file.
+
+    JSONLines and CSV files can be compressed with gzip (`.gz`) or zstd (`.zst`, requires `zstandard` package).
+    JSONLines are parsed with `orjson` when it is installed. Parquet and Arrow (IPC file or stream, e.g., `.arrow`
+    files from HuggingFace datasets cache) require `pyarrow` package and are read in batches; only the requested
+    `columns` are read from disk.
+
+    Args:
+        path: Path to the file.
+        columns: Columns to keep (e.g., `["repository", "revision"]`); all columns by default.
+        batch_size: Number of rows converted from Arrow at once.
+    """
 
-    def __init__(self, path: str):
+    def __init__(self, path: str, columns: Optional[List[str]] = None, batch_size: int = 10_000):
+        if not path.endswith(SUPPORTED_FORMATS):
+            raise ValueError(f"Unsupported file format. Currently supported: {', '.join(SUPPORTED_FORMATS)}")
         self._path = path
+        self._columns = columns
+        self._batch_size = batch_size
 
-    def __iter__(self) -> Iterator[Dict[str, Any]]:
-        if self._path.endswith(".jsonl"):
-            with jsonlines.open(self._path, "r") as jsonl_reader:
-                yield from jsonl_reader
-        elif self._path.endswith(".csv"):
-            with open(self._path, "r") as f:
-                csv_reader = csv.DictReader(f)
-                yield from csv_reader
-        elif self._path.endswith(".jsonl.gz"):
-            with gzip.open(self._path, "rt") as f:
-                for line in f:
-                    yield json.loads(line)
-        elif self._path.endswith(".csv.gz"):
-            with gzip.open(self._path, "rt") as f:
-                csv_reader = csv.DictReader(f)
-                yield from csv_reader
+    @contextmanager
+    def _open(self) -> Iterator[BinaryIO]:
+        if self._path.endswith(".gz"):
+            with gzip.open(self._path, "rb") as gzip_file:
+                yield cast(BinaryIO, gzip_file)
+        elif self._path.endswith(".zst"):
+            try:
+                import zstandard  # type: ignore[import-untyped, import-not-found]
+            except ImportError as e:
+                raise ImportError("Reading .zst files requires `zstandard` package.") from e
+
+            with open(self._path, "rb") as compressed_file:
+                with zstandard.ZstdDecompressor().stream_reader(compressed_file) as reader:
+                    yield cast(BinaryIO, io.BufferedReader(reader, buffer_size=1 << 20))
         else:
-            raise ValueError("Unsupported file format. Currently supported: .jsonl, .jsonl.gz, .csv, .csv.gz")
+            with open(self._path, "rb", buffering=1 << 20) as f:
+                yield f
+
+    def _iter_jsonl(self) -> Iterator[Dict[str, Any]]:
+        with self._open() as f:
+            for line in f:
+                if line.strip():
+                    yield json_loads(line)
+
+    def _iter_csv(self) -> Iterator[Dict[str, Any]]:
+        with self._open() as f:
+            yield from csv.DictReader(io.TextIOWrapper(f, encoding="utf-8", newline=""))
+
+    def _iter_arrow(self) -> Iterator[Dict[str, Any]]:
+        try:
+            import pyarrow as pa  # type: ignore[import-untyped, import-not-found]
+            import pyarrow.parquet as pq  # type: ignore[import-untyped, import-not-found]
+        except ImportError as e:
+            raise ImportError("Reading Parquet and Arrow files requires `pyarrow` package.") from e
+
+        if self._path.endswith(".parquet"):
+            parquet_file = pq.ParquetFile(self._path)
+            self._check_columns(parquet_file.schema_arrow.names)
+            batches = parquet_file.iter_batches(batch_size=self._batch_size, columns=self._columns)
+            for batch in batches:
+                yield from batch.to_pylist()
+            return
+
+        with pa.memory_map(self._path) as source:
+            try:
+                reader = pa.ipc.open_file(source)
+                batches = (reader.get_batch(i) for i in range(reader.num_record_batches))
+            except pa.ArrowInvalid:
+                source.seek(0)
+                reader = pa.ipc.open_stream(source)
+                batches = iter(reader)
+            self._check_columns(reader.schema.names)
+            for batch in batches:
+                if self._columns:
+                    # memory-mapped columns that are not selected are never read
+                    batch = batch.select(self._columns)
+                yield from batch.to_pylist()
+
+    def _check_columns(self, available_columns: List[str]) -> None:
+        for column in self._columns or []:
+            if column not in available_columns:
+                raise missing_column_error(column, available_columns)
+
+    def __iter__(self) -> Iterator[Dict[str, Any]]:
+        if self._path.endswith((".parquet", ".arrow", ".feather")):
+            yield from self._iter_arrow()
+            return
+
+        rows = self._iter_jsonl() if self._path.endswith((".jsonl", ".jsonl.gz", ".jsonl.zst")) else self._iter_csv()
+        if not self._columns:
+            yield from rows
+            return
+        for row in rows:
+            try:
+                yield {column: row[column] for column in self._columns}
+            except KeyError as e:
+                raise missing_column_error(e.args[0], row) from None
@@ -0,0 +1,182 @@
+import json
+import logging
+import os
+import subprocess
+import time
+import urllib.error
+import urllib.request
+from dataclasses import dataclass
+from typing import Dict
+
+PYPI_PROXY_PORT = 5000
+MAVEN_PROXY_PORT = 8080
+
+MAVEN_PROXY_NGINX_CONFIG = (
+    "proxy_cache_path /var/cache/nginx/maven levels=1:2 keys_zone=maven:64m max_size={max_size_gb}g"
+    " inactive=3650d use_temp_path=off;\n"
+    """
+server {{
+    listen {port};
+
+    location /maven2/ {{
+        proxy_pass https://repo.maven.apache.org/maven2/;
+        proxy_ssl_server_name on;
+        proxy_set_header Host repo.maven.apache.org;
+        proxy_cache maven;
+        proxy_cache_valid 200 3650d;
+        proxy_cache_valid 404 10m;
+        proxy_cache_lock on;
+        # serve cached artifacts when Maven Central is unreachable, so that runs can be reproduced offline
+        proxy_cache_use_stale error timeout updating http_500 http_502 http_503 http_504;
+    }}
+}}
+"""
+)
+"""nginx configuration for a caching proxy of Maven Central."""
+
+MAVEN_SETTINGS = """<settings>
+  <mirrors>
+    <mirror>
+      <id>envsetup-proxy</id>
+      <mirrorOf>central</mirrorOf>
+      <url>{url}</url>
+    </mirror>
+  </mirrors>
+</settings>
+"""
+"""Maven settings redirecting Maven Central to the proxy."""
+
+
+@dataclass
+class PackageProxy:
+    """Addresses of locally running package proxies, as seen from Docker containers on the default network."""
+
+    pypi_url: str
+    maven_url: str
+
+    @property
+    def pypi_host(self) -> str:
+        return self.pypi_url.split("://", 1)[1].split("/", 1)[0].split(":", 1)[0]
+
+    def get_env_vars(self) -> Dict[str, str]:
+        """Environment variables that make package managers inside containers use the proxies."""
+        return {
+            "PIP_INDEX_URL": self.pypi_url,
+            "PIP_TRUSTED_HOST": self.pypi_host,
+            "UV_INDEX_URL": self.pypi_url,
+            "UV_INSECURE_HOST": self.pypi_host,
+            "PIPENV_PYPI_MIRROR": self.pypi_url,
+            # Maven has no environment variable for mirrors, it is written to ~/.m2/settings.xml by `get_setup_command`
+            "ENVSETUP_MAVEN_MIRROR": self.maven_url,
+        }
+
+    def get_setup_command(self) -> str:
+        """Shell command that points Maven to the proxy unless the container already has its own settings."""
+        settings = MAVEN_SETTINGS.format(url=self.maven_url)
+        return f"mkdir -p ~/.m2 && [ -f ~/.m2/settings.xml ] || printf '%s' '{settings}' > ~/.m2/settings.xml"
+
+
+def _docker(*args: str) -> str:
+    return subprocess.run(["docker", *args], check=True, capture_output=True, text=True).stdout.strip()
+
+
+def _start_container(name: str, args: list[str]) -> str:
+    """Start a proxy container unless it is already running; returns its IP address on the default network."""
+    try:
+        state = json.loads(_docker("inspect", "--format", "{{json .State.Running}}", name))
+    except subprocess.CalledProcessError:
+        state = None
+    if state is False:
+        _docker("rm", "-f", name)
+    if not state:
+        logging.info(f"Starting package proxy container {name}.")
+        _docker("run", "--detach", "--restart", "unless-stopped", "--name", name, *args)
+    return _docker("inspect", "--format", "{{.NetworkSettings.IPAddress}}", name)
+
+
+def _wait_until_ready(url: str, timeout: float) -> None:
+    start_time = time.time()
+    while True:
+        try:
+            with urllib.request.urlopen(url, timeout=5):
+                return
+        except urllib.error.HTTPError:
+            # the server is up, it just has nothing at this path
+            return
+        except (urllib.error.URLError, OSError):
+            if time.time() - start_time > timeout:
+                raise TimeoutError(f"Package proxy at {url} did not start in {timeout} seconds.")
+            time.sleep(1)
+
+
+def start_package_proxy(
+    config_dir: str,
+    name_prefix: str = "envsetup-proxy",
+    pypi_image: str = "epicwink/proxpi:latest",
+    maven_image: str = "nginx:alpine",
+    pypi_cache_size_gb: float = 50,
+    maven_cache_size_gb: float = 50,
+    index_ttl: int = 1800,
+    start_timeout: float = 120,
+) -> PackageProxy:
+    """Start (or reuse) caching proxies for PyPI and Maven Central as Docker containers.
+
+    Cached packages are kept in named volumes, so they survive restarts and are reused by subsequent runs.
+
+    Args:
+        config_dir: Directory to write the proxies' configuration files to; must be accessible by the Docker daemon.
+        name_prefix: Prefix for the containers' and volumes' names.
+        pypi_image: Image of the PyPI caching proxy (proxpi).
+        maven_image: nginx image used for the Maven caching proxy.
+        pypi_cache_size_gb: Maximum size of the cached Python packages.
+        maven_cache_size_gb: Maximum size of the cached Maven artifacts.
+        index_ttl: Time in seconds to cache PyPI package indices for.
+        start_timeout: Time in seconds to wait for the proxies to start.
+    """
+    os.makedirs(config_dir, exist_ok=True)
+    nginx_config_path = os.path.abspath(os.path.join(config_dir, "maven-proxy.conf"))
+    with open(nginx_config_path, "w") as f:
+        f.write(MAVEN_PROXY_NGINX_CONFIG.format(port=MAVEN_PROXY_PORT, max_size_gb=maven_cache_size_gb))
+
+    pypi_ip = _start_container(
+        f"{name_prefix}-pypi",
+        [
+            "--volume",
+            f"{name_prefix}-pypi-cache:/var/cache/proxpi",
+            "--env",
+            "PROXPI_CACHE_DIR=/var/cache/proxpi",
+            "--env",
+            f"PROXPI_CACHE_SIZE={int(pypi_cache_size_gb * 1024**3)}",
+            "--env",
+            f"PROXPI_INDEX_TTL={index_ttl}",
+            pypi_image,
+        ],
+    )
+    maven_ip = _start_container(
+        f"{name_prefix}-maven",
+        [
+            "--volume",
+            f"{name_prefix}-maven-cache:/var/cache/nginx/maven",
+            "--volume",
+            f"{nginx_config_path}:/etc/nginx/conf.d/default.conf:ro",
+            maven_image,
+        ],
+    )
+
+    proxy = PackageProxy(
+        pypi_url=f"http://{pypi_ip}:{PYPI_PROXY_PORT}/index/",
+        maven_url=f"http://{maven_ip}:{MAVEN_PROXY_PORT}/maven2/",
+    )
+    _wait_until_ready(proxy.pypi_url, timeout=start_timeout)
+    _wait_until_ready(proxy.maven_url, timeout=start_timeout)
+    logging.info(f"Package proxies are running: PyPI at {proxy.pypi_url}, Maven at {proxy.maven_url}.")
+    return proxy
+
+
+def stop_package_proxy(name_prefix: str = "envsetup-proxy") -> None:
+    """Stop and remove the proxy containers; cached packages are kept in their volumes."""
+    for name in (f"{name_prefix}-pypi", f"{name_prefix}-maven"):
+        try:
+            _docker("rm", "-f", name)
+        except subprocess.CalledProcessError as e:
+            logging.error(f"Failed to stop package proxy container {name}: {e.stderr}")
@@ -3,15 +3,21 @@ import json
 import logging
 import os
 import tempfile
-from typing import Any, Dict, List
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, Iterator, List, Optional
 
 import jsonlines
 from dotenv import load_dotenv
-from huggingface_hub import hf_hub_download, list_repo_tree, upload_file  # type: ignore[import-untyped]
+from huggingface_hub import snapshot_download, upload_file  # type: ignore[import-untyped]
 from tqdm import tqdm  # type: ignore[import-untyped]
 
+from env_setup_utils.progress_events import ProgressEventWriter
+
 load_dotenv()
 
+TRAJECTORIES_DATASET = "envsetup-dl4c-2025/env-setup-trajectories"
+
 
 def parse_script_from_trajectory(trajectory: List[Dict[str, Any]]) -> str:
     """Processes a given trajectory into a final bash script.
@@ -62,49 +68,202 @@ def parse_script_from_trajectory(trajectory: List[Dict[str, Any]]) -> str:
     return "\n".join(format_command(command) for command in commands)
 
 
+def get_script_record(trajectory_file: str, trajectory: List[Dict[str, Any]]) -> Dict[str, str]:
+    """Builds a scripts.jsonl record from a trajectory stored as `<owner>__<name>@<revision>.jsonl`."""
+    repository, revision = os.path.basename(trajectory_file[: -len(".jsonl")]).split("@")
+    return {
+        "repository": repository.replace("__", "/"),
+        "revision": revision,
+        "script": parse_script_from_trajectory(trajectory),
+    }
+
+
+def read_last_message(trajectory_file: str, block_size: int = 1 << 16) -> Optional[Dict[str, Any]]:
+    """Reads only the last message of a trajectory (the commands_history node), going backwards from the end.
+
+    Returns None for an empty trajectory; raises `json.JSONDecodeError` if the last line is incomplete.
+    """
+    with open(trajectory_file, "rb") as f:
+        position = f.seek(0, os.SEEK_END)
+        tail = b""
+        # read blocks until the start of the last line (or of the file) is reached
+        while position > 0 and b"\n" not in tail.rstrip(b"\n"):
+            read_size = min(block_size, position)
+            position -= read_size
+            f.seek(position)
+            tail = f.read(read_size) + tail
+    last_line = tail.rstrip(b"\n").rsplit(b"\n", 1)[-1]
+    if not last_line.strip():
+        return None
+    return json.loads(last_line)
+
+
+def process_trajectory_file(trajectory_file: str) -> Optional[Dict[str, str]]:
+    try:
+        last_message = read_last_message(trajectory_file)
+    except json.JSONDecodeError as e:
+        logging.warning(f"Skipping trajectory {trajectory_file} with a broken last message: {e}")
+        return None
+    return get_script_record(trajectory_file, [last_message] if last_message is not None else [])
+
+
+def process_trajectory_files(
+    trajectory_files: List[str], num_workers: Optional[int] = None
+) -> Iterator[Dict[str, str]]:
+    """Processes trajectory files into scripts.jsonl records with a pool of processes, keeping the order of files."""
+    num_workers = num_workers or os.cpu_count() or 1
+    records: Iterator[Optional[Dict[str, str]]]
+    if num_workers == 1 or len(trajectory_files) < 2:
+        records = map(process_trajectory_file, trajectory_files)
+        yield from (record for record in records if record is not None)
+        return
+    chunksize = max(1, len(trajectory_files) // (num_workers * 4))
+    with ProcessPoolExecutor(max_workers=num_workers) as executor:
+        records = executor.map(process_trajectory_file, trajectory_files, chunksize=chunksize)
+        yield from (record for record in tqdm(records, total=len(trajectory_files)) if record is not None)
+
+
+def process_local_trajectories(
+    trajectories_dir: str,
+    output_file: str,
+    follow: bool = False,
+    poll_interval: float = 5.0,
+    num_workers: Optional[int] = None,
+) -> int:
+    """Processes trajectories from a local directory into a local scripts.jsonl file, returns the number of scripts.
+
+    With `follow=True`, the directory is watched while inference is still running: each trajectory is
+    converted as soon as it ends with a commands_history node and appended to `output_file` right away,
+    so that evaluation can pick it up. Watching stops once `<trajectories_dir>.done` exists; the
+    remaining (unfinished) trajectories are processed then.
+    """
+    done_marker = f"{trajectories_dir.rstrip(os.sep)}.done"
+    processed = set()
+    num_scripts = 0
+    progress_events = ProgressEventWriter.from_env("processing")
+    os.makedirs(os.path.dirname(os.path.abspath(output_file)), exist_ok=True)
+    with jsonlines.open(output_file, "w", flush=follow) as writer:
+        while True:
+            # check the marker before listing, so that trajectories finished right before it are not missed
+            is_done = not follow or os.path.exists(done_marker)
+            trajectory_files = sorted(os.listdir(trajectories_dir)) if os.path.exists(trajectories_dir) else []
+            pending = [name for name in trajectory_files if name.endswith(".jsonl") and name not in processed]
+
+            if is_done:
+                paths = [os.path.join(trajectories_dir, name) for name in pending]
+                progress_events.total(num_scripts + len(paths))
+                for record in process_trajectory_files(paths, num_workers=num_workers):
+                    writer.write(record)
+                    progress_events.finished(record["repository"], record["revision"])
+                    num_scripts += 1
+                progress_events.close()
+                return num_scripts
+
+            for trajectory_file in pending:
+                try:
+                    last_message = read_last_message(os.path.join(trajectories_dir, trajectory_file))
+                except json.JSONDecodeError:
+                    # the agent is in the middle of writing a message
+                    continue
+                if last_message is None or last_message.get("node") != "commands_history":
+                    continue
+                record = get_script_record(trajectory_file, [last_message])
+                writer.write(record)
+                progress_events.finished(record["repository"], record["revision"])
+                processed.add(trajectory_file)
+                num_scripts += 1
+                logging.info(f"Processed trajectory {trajectory_file} ({num_scripts} in total).")
+            time.sleep(poll_interval)
+
+
+def process_hf_trajectories(
+    input_trajectories_dir: str,
+    output_file: Optional[str] = None,
+    num_workers: Optional[int] = None,
+    num_download_workers: int = 16,
+) -> None:
+    """Processes trajectories from the HF trajectories dataset and uploads scripts.jsonl next to them."""
+    with tempfile.TemporaryDirectory() as temp_dir:
+        # a single snapshot download fetches all trajectories concurrently
+        snapshot_download(
+            repo_id=TRAJECTORIES_DATASET,
+            repo_type="dataset",
+            allow_patterns=f"{input_trajectories_dir}/trajectories/*.jsonl",
+            local_dir=temp_dir,
+            max_workers=num_download_workers,
+        )
+
+        output_file = output_file or f"{temp_dir}/scripts.jsonl"
+        num_scripts = process_local_trajectories(
+            os.path.join(temp_dir, input_trajectories_dir, "trajectories"), output_file, num_workers=num_workers
+        )
+        logging.info(f"Wrote {num_scripts} scripts to {output_file}.")
+
+        upload_scripts(output_file, input_trajectories_dir)
+
+
+def upload_scripts(scripts_file: str, path_in_repo: str) -> None:
+    upload_file(
+        path_in_repo=os.path.join(path_in_repo, "scripts.jsonl"),
+        path_or_fileobj=scripts_file,
+        repo_id=TRAJECTORIES_DATASET,
+        repo_type="dataset",
+    )
+
+
 if __name__ == "__main__":
-    TRAJECTORIES_DATASET = "envsetup-dl4c-2025/env-setup-trajectories"
+    logging.basicConfig(level=logging.INFO)
 
     parser = argparse.ArgumentParser()
     parser.add_argument(
         "--input-trajectories-dir",
-        required=True,
         type=str,
-        help="The directory in the HF trajectories dataset that contains the trajectories to be processed.",
+        help="The directory in the HF trajectories dataset that contains the trajectories to be processed. "
+        "With --local-trajectories-dir, scripts.jsonl is uploaded there at the end.",
+    )
+    parser.add_argument(
+        "--local-trajectories-dir",
+        type=str,
+        help="Local directory with trajectories to process instead of the HF trajectories dataset.",
+    )
+    parser.add_argument(
+        "--output-file",
+        type=str,
+        help="Local path to write scripts.jsonl to; required with --local-trajectories-dir.",
+    )
+    parser.add_argument(
+        "--follow",
+        action="store_true",
+        help="Keep processing new trajectories from --local-trajectories-dir until <dir>.done appears.",
+    )
+    parser.add_argument("--poll-interval", type=float, default=5.0, help="Seconds between checks in --follow mode.")
+    parser.add_argument(
+        "--num-workers", type=int, default=None, help="Processes for parsing trajectories (default: number of CPUs)."
+    )
+    parser.add_argument(
+        "--num-download-workers", type=int, default=16, help="Concurrent downloads from the HF trajectories dataset."
     )
     args = parser.parse_args()
 
-    scripts = []
-    with tempfile.TemporaryDirectory() as temp_dir:
-        for trajectory_file in tqdm(
-            list_repo_tree(
-                TRAJECTORIES_DATASET, os.path.join(args.input_trajectories_dir, "trajectories"), repo_type="dataset"
-            )
-        ):
-            file_path = hf_hub_download(
-                repo_id=TRAJECTORIES_DATASET,
-                filename=trajectory_file.path,
-                repo_type="dataset",
-                local_dir=temp_dir,
-            )
-
-            with jsonlines.open(file_path, "r") as reader:
-                trajectory = [line for line in reader]
-            repository, revision = os.path.basename(trajectory_file.path[: -len(".jsonl")]).split("@")
-            scripts.append(
-                {
-                    "repository": repository.replace("__", "/"),
-                    "revision": revision,
-                    "script": parse_script_from_trajectory(trajectory),
-                }
-            )
-
-        with jsonlines.open(f"{temp_dir}/scripts.jsonl", "w") as writer:
-            writer.write_all(scripts)
-
-        upload_file(
-            path_in_repo=os.path.join(args.input_trajectories_dir, "scripts.jsonl"),
-            path_or_fileobj=f"{temp_dir}/scripts.jsonl",
-            repo_id=TRAJECTORIES_DATASET,
-            repo_type="dataset",
+    if args.local_trajectories_dir:
+        if not args.output_file:
+            parser.error("--output-file is required with --local-trajectories-dir.")
+        num_scripts = process_local_trajectories(
+            args.local_trajectories_dir,
+            args.output_file,
+            follow=args.follow,
+            poll_interval=args.poll_interval,
+            num_workers=args.num_workers,
+        )
+        logging.info(f"Wrote {num_scripts} scripts to {args.output_file}.")
+        if args.input_trajectories_dir:
+            upload_scripts(args.output_file, args.input_trajectories_dir)
+    elif args.input_trajectories_dir:
+        process_hf_trajectories(
+            args.input_trajectories_dir,
+            args.output_file,
+            num_workers=args.num_workers,
+            num_download_workers=args.num_download_workers,
         )
+    else:
+        parser.error("Either --input-trajectories-dir or --local-trajectories-dir is required.")
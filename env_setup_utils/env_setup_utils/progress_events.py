@@ -0,0 +1,141 @@
+import json
+import math
+import os
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+PROGRESS_FILE_ENV = "ENVSETUP_PROGRESS_FILE"
+"""Environment variable with the path to write progress events to."""
+
+
+class ProgressEventWriter:
+    """Writes structured progress events of a stage as JSON lines to a side channel file.
+
+    Every event has `time`, `stage` and `event` fields; per-datapoint events (`queued`, `started`, `finished`,
+    `failed`) also have `repository` and `revision`, `finished` and `failed` have `duration` in seconds if it is
+    meaningful for the stage.
+    `total` announces the number of datapoints once it is known. Stages can emit their own events as well, e.g.,
+    inference emits `agent_started` once the agent of a datapoint starts (after its container is up).
+    Without a path, events are dropped.
+    """
+
+    def __init__(self, stage: str, path: Optional[str] = None):
+        self.stage = stage
+        self.path = path
+        self._file = None
+        if path:
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+            self._file = open(path, "a", buffering=1)
+
+    @classmethod
+    def from_env(cls, stage: str) -> "ProgressEventWriter":
+        return cls(stage, os.environ.get(PROGRESS_FILE_ENV))
+
+    def emit(self, event: str, **fields: Any) -> None:
+        if self._file is None:
+            return
+        self._file.write(json.dumps({"time": time.time(), "stage": self.stage, "event": event, **fields}) + "\n")
+
+    def total(self, total: int) -> None:
+        self.emit("total", total=total)
+
+    def queued(self, repository: str, revision: str) -> None:
+        self.emit("queued", repository=repository, revision=revision)
+
+    def started(self, repository: str, revision: str) -> None:
+        self.emit("started", repository=repository, revision=revision)
+
+    def finished(self, repository: str, revision: str, duration: Optional[float] = None, **fields: Any) -> None:
+        self.emit("finished", repository=repository, revision=revision, duration=duration, **fields)
+
+    def failed(self, repository: str, revision: str, duration: float, error: str) -> None:
+        self.emit("failed", repository=repository, revision=revision, duration=duration, error=error)
+
+    def close(self) -> None:
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+
+class ProgressTracker:
+    """Aggregates progress events of a stage into counts, throughput, ETA and latency percentiles."""
+
+    def __init__(self):
+        self.total: Optional[int] = None
+        self.queued = 0
+        self.running = 0
+        self.finished = 0
+        self.failed = 0
+        self.durations: List[float] = []
+        self.start_time: Optional[float] = None
+        self.last_time: Optional[float] = None
+
+    def update(self, event: Dict[str, Any]) -> None:
+        if self.start_time is None:
+            self.start_time = event["time"]
+        self.last_time = event["time"]
+        kind = event["event"]
+        if kind == "total":
+            self.total = event["total"]
+        elif kind == "queued":
+            self.queued += 1
+        elif kind == "started":
+            self.running += 1
+        elif kind in ("finished", "failed"):
+            self.running = max(0, self.running - 1)
+            if event.get("duration") is not None:
+                self.durations.append(event["duration"])
+            if kind == "finished":
+                self.finished += 1
+            else:
+                self.failed += 1
+
+    @property
+    def done(self) -> int:
+        return self.finished + self.failed
+
+    @property
+    def expected_total(self) -> Optional[int]:
+        """Announced total, or the number of queued datapoints while the input is still being read."""
+        return self.total if self.total is not None else (self.queued or None)
+
+    @property
+    def elapsed(self) -> float:
+        """Seconds between the first and the last event."""
+        if self.start_time is None or self.last_time is None:
+            return 0.0
+        return self.last_time - self.start_time
+
+    def throughput(self, now: Optional[float] = None) -> float:
+        """Completed datapoints per second since the first event."""
+        now = now if now is not None else time.time()
+        if self.start_time is None or now <= self.start_time:
+            return 0.0
+        return self.done / (now - self.start_time)
+
+    def eta(self, now: Optional[float] = None) -> Optional[float]:
+        """Seconds until all datapoints are done at the current throughput."""
+        throughput = self.throughput(now)
+        if self.expected_total is None or throughput == 0:
+            return None
+        return max(0, self.expected_total - self.done) / throughput
+
+    def percentile(self, q: float) -> Optional[float]:
+        """Latency percentile (nearest rank) over completed datapoints, `q` in [0, 100]."""
+        if not self.durations:
+            return None
+        durations = sorted(self.durations)
+        return durations[max(0, math.ceil(q / 100 * len(durations)) - 1)]
+
+
+def read_progress_events(path: str, position: int = 0) -> Tuple[List[Dict[str, Any]], int]:
+    """Read complete events written after `position`; returns them with the position to continue from."""
+    if not os.path.exists(path):
+        return [], position
+    with open(path, "rb") as f:
+        f.seek(position)
+        data = f.read()
+    # the last line might still be incomplete, it is read again next time
+    complete = data[: data.rfind(b"\n") + 1]
+    events = [json.loads(line) for line in complete.splitlines() if line.strip()]
+    return events, position + len(complete)
@@ -1,27 +1,130 @@
+import contextlib
+import fcntl
+import glob
+import json
 import logging
 import os
 import shutil
+import subprocess
 import tarfile
-from typing import Literal
+import time
+from typing import Callable, Dict, Iterator, Literal, Optional, Sequence, Tuple
 
 import git
-from huggingface_hub import hf_hub_download  # type: ignore[import-untyped]
+from huggingface_hub import hf_hub_url, try_to_load_from_cache  # type: ignore[import-untyped]
+from huggingface_hub.utils import (  # type: ignore[import-untyped]
+    EntryNotFoundError,
+    RepositoryNotFoundError,
+    build_hf_headers,
+    get_session,
+    hf_raise_for_status,
+)
+
+ArchiveType = Literal["zip", "tar.gz", "tar.zst"]
+
+RepoSource = Literal["local", "hf_cache", "hf", "github"]
+"""Where repositories can be obtained from:
+
+* `local`: archives stored in a local directory (e.g., the output of `collect_gh_repos.py`);
+* `hf_cache`: archives already present in the local HuggingFace cache (no network access);
+* `hf`: archives downloaded from the HuggingFace dataset;
+* `github`: repositories cloned from GitHub.
+"""
+
+ARCHIVE_DECOMPRESSORS = {
+    "tar.gz": ["pigz", "-dc"],
+    "tar.zst": ["zstd", "-dcq"],
+}
+"""External tools used for decompressing archives in a separate process when available."""
+
+GITHUB_NOT_FOUND_MESSAGES = (
+    "Repository not found",
+    "terminal prompts disabled",
+    "did not match any",
+    "reference is not a tree",
+)
+"""Git errors meaning that the repository or revision doesn't exist (or is private), as opposed to network errors."""
 
 
 class RepoDownloader:
-    def __init__(self, output_dir: str, hf_name: str, language: str):
+    def __init__(
+        self,
+        output_dir: str,
+        hf_name: str,
+        language: str,
+        archive_types: Sequence[Literal["tar.gz", "tar.zst"]] = ("tar.gz", "tar.zst"),
+        sources: Sequence[RepoSource] = ("github", "hf"),
+        local_archives_dir: Optional[str] = None,
+        source_timeouts: Optional[Dict[str, float]] = None,
+        failures_cache_path: Optional[str] = None,
+        failures_ttl: Optional[float] = 7 * 24 * 60 * 60,
+        copy_on_write: bool = False,
+    ):
+        """
+        Args:
+            output_dir: Directory where the repositories are stored.
+            hf_name: HuggingFace dataset with repositories archives.
+            language: Language of repositories; defines the path to archives inside HuggingFace dataset.
+            archive_types: Archive extensions to look for, in order.
+            sources: Sources to obtain repositories from, in order; the first successful one is used.
+            local_archives_dir: Directory with archives for `local` source.
+            source_timeouts: Timeouts in seconds for network sources. For `github`, it limits the whole clone;
+              for `hf`, it limits the whole download of an archive.
+            failures_cache_path: JSONLines file to persist definitive failures (the repository or revision is not
+              found in the source) to; these are skipped in subsequent attempts. Transient failures (timeouts,
+              network or extraction errors) are never remembered. When not set, failures are only remembered in memory.
+            failures_ttl: Time in seconds after which a remembered failure is retried; None to never retry.
+            copy_on_write: Set to True to download each repository@revision once into a base checkout that is only
+              read from to make copies, and give each run its own copy of it. Copies are made with reflinks where
+              the filesystem supports them, so they share data with the base checkout until modified; otherwise each
+              copy takes the full size of the repository on disk, and a warning is logged once.
+        """
         self.hf_name = hf_name
         self.output_dir = output_dir
         self.language = language
+        self.archive_types = archive_types
+
+        unknown_sources = set(sources) - set(self._get_source_handlers())
+        if unknown_sources:
+            raise ValueError(f"Unknown repository sources: {unknown_sources}.")
+        if "local" in sources and local_archives_dir is None:
+            raise ValueError("`local_archives_dir` is required to use `local` source.")
+        self.sources = sources
+        self.local_archives_dir = local_archives_dir
+        self.source_timeouts = source_timeouts or {}
+        self.copy_on_write = copy_on_write
+        # reflink copies are tried until one fails, plain copies are made from then on
+        self._reflinks_available = True
 
-    def get_repo_archive_path(self, repo_name: str, commit_sha: str, archive_type: Literal["zip", "tar.gz"]):
+        self.failures_cache_path = failures_cache_path
+        self.failures_ttl = failures_ttl
+        # (source key, repository, revision) -> time the failure was recorded at
+        self._known_failures: Dict[Tuple[str, str, str], float] = {}
+        if failures_cache_path is not None and os.path.exists(failures_cache_path):
+            with open(failures_cache_path, "r") as f:
+                for line in f:
+                    if line.strip():
+                        failure = json.loads(line)
+                        key = (failure["source"], failure["repository"], failure["revision"])
+                        self._known_failures[key] = max(self._known_failures.get(key, 0), failure.get("timestamp", 0))
+
+    def get_repo_archive_path(self, repo_name: str, commit_sha: str, archive_type: ArchiveType):
         return os.path.join(
             self.output_dir,
             f"{self.get_repo_dir_name(repo_name, commit_sha)}.{archive_type}",
         )
 
-    def get_repo_dir_path(self, repo_name: str, commit_sha: str) -> str:
-        return os.path.join(self.output_dir, self.get_repo_dir_name(repo_name, commit_sha))
+    def get_repo_dir_path(self, repo_name: str, commit_sha: str, run_id: Optional[str] = None) -> str:
+        """Returns the path to the repository checkout for the given run (or the default one when `run_id` is None).
+
+        The directory name is always `<owner>__<name>@<revision>`, regardless of the run.
+        """
+        run_dir = self.output_dir if run_id is None else os.path.join(self.output_dir, "runs", run_id)
+        return os.path.join(run_dir, self.get_repo_dir_name(repo_name, commit_sha))
+
+    def get_base_repo_dir_path(self, repo_name: str, commit_sha: str) -> str:
+        """Returns the path to the shared base checkout used when `copy_on_write` is enabled."""
+        return os.path.join(self.output_dir, "base", self.get_repo_dir_name(repo_name, commit_sha))
 
     def get_repo_dir_name(self, repo_name: str, commit_sha: str) -> str:
         return f"{repo_name.replace('/', '__')}@{commit_sha}"
@@ -33,90 +136,246 @@ class RepoDownloader:
         repo.git.checkout(commit_sha)
         return None
 
-    def _download_hf(self, repo_name: str, commit_sha: str) -> bool:
-        try:
-            logging.debug(f"Downloading {repo_name} from Huggingface...")
-            download_path = hf_hub_download(
-                repo_id=self.hf_name,
-                filename=f"repos/{self.language}/{repo_name.replace('/', '__')}.tar.gz",
-                repo_type="dataset",
-                local_dir=self.output_dir,
-            )
-        except Exception as e:
-            logging.error(f"Failed to download repository '{repo_name}' at commit '{commit_sha}' from HuggingFace.")
-            logging.exception(e)
-            return False
+    def _get_hf_archive_filename(self, repo_name: str, archive_type: str) -> str:
+        return f"repos/{self.language}/{repo_name.replace('/', '__')}.{archive_type}"
 
-        local_path = self.get_repo_archive_path(repo_name, commit_sha, "tar.gz")
-        try:
-            if os.path.exists(local_path):
-                if os.path.isdir(local_path):
-                    shutil.rmtree(local_path)
-                else:
-                    os.remove(local_path)
-            shutil.move(download_path, local_path)
-        except Exception as e:
-            logging.error("Failed to move downloaded archive.")
-            logging.exception(e)
-            return False
+    @staticmethod
+    @contextlib.contextmanager
+    def _open_archive_stream(archive_path: str, archive_type: str) -> Iterator[tarfile.TarFile]:
+        """Opens the archive as a sequential tar stream.
+
+        Decompression is offloaded to an external tool (pigz/zstd) when it is available, so that it runs
+        in parallel with extraction; otherwise, it falls back to in-process decompression.
+        """
+        decompressor = ARCHIVE_DECOMPRESSORS.get(archive_type)
+        if decompressor is not None and shutil.which(decompressor[0]):
+            process = subprocess.Popen([*decompressor, archive_path], stdout=subprocess.PIPE)
+            assert process.stdout is not None
+            try:
+                with tarfile.open(fileobj=process.stdout, mode="r|") as tar:
+                    yield tar
+            finally:
+                process.stdout.close()
+                return_code = process.wait()
+            if return_code != 0:
+                raise RuntimeError(f"{decompressor[0]} failed to decompress {archive_path}.")
+            return
+
+        if archive_type == "tar.gz":
+            with tarfile.open(archive_path, mode="r|gz") as tar:
+                yield tar
+        elif archive_type == "tar.zst":
+            try:
+                import zstandard  # type: ignore[import-untyped, import-not-found]
+            except ImportError as e:
+                raise ImportError("Extracting .tar.zst archives requires either `zstd` or `zstandard` package.") from e
+
+            with open(archive_path, "rb") as f, zstandard.ZstdDecompressor().stream_reader(f) as reader:
+                with tarfile.open(fileobj=reader, mode="r|") as tar:
+                    yield tar
+        else:
+            raise ValueError(f"Unsupported archive type: {archive_type}.")
+
+    @staticmethod
+    def _extract_archive(archive_path: str, archive_type: str, target_dir: str) -> None:
+        """Extracts the archive in a single pass, placing the contents of its top-level directory into `target_dir`."""
+
+        def _strip_top_level_dir(tar: tarfile.TarFile) -> Iterator[tarfile.TarInfo]:
+            for member in tar:
+                _, _, member_path = member.name.partition("/")
+                if not member_path or os.path.isabs(member_path) or ".." in member_path.split("/"):
+                    continue
+                member.name = member_path
+                if member.islnk():
+                    member.linkname = member.linkname.partition("/")[2]
+                yield member
 
-        logging.debug(f"Extracting {repo_name}...")
-        with tarfile.open(local_path, "r:gz") as tar:
-            tar.extractall(path=self.output_dir)
+        with RepoDownloader._open_archive_stream(archive_path, archive_type) as tar:
+            tar.extractall(path=target_dir, members=_strip_top_level_dir(tar))
 
+    def _extract_and_checkout(
+        self, archive_path: str, archive_type: str, repo_name: str, commit_sha: str, repo_dir: str, remove_archive: bool
+    ) -> bool:
         try:
-            if os.path.exists(os.path.join(self.output_dir, os.path.basename(download_path))) and os.path.isdir(
-                os.path.join(self.output_dir, os.path.basename(download_path))
-            ):
-                if os.path.exists(self.get_repo_dir_path(repo_name=repo_name, commit_sha=commit_sha)):
-                    if os.path.isdir(self.get_repo_dir_path(repo_name=repo_name, commit_sha=commit_sha)):
-                        shutil.rmtree(self.get_repo_dir_path(repo_name=repo_name, commit_sha=commit_sha))
-                    else:
-                        os.remove(self.get_repo_dir_path(repo_name=repo_name, commit_sha=commit_sha))
-                os.rename(
-                    os.path.join(self.output_dir, os.path.basename(download_path)),
-                    self.get_repo_dir_path(repo_name=repo_name, commit_sha=commit_sha),
-                )
+            if os.path.exists(repo_dir):
+                if os.path.isdir(repo_dir):
+                    shutil.rmtree(repo_dir)
+                else:
+                    os.remove(repo_dir)
+
+            logging.debug(f"Extracting {repo_name}...")
+            self._extract_archive(archive_path, archive_type, repo_dir)
         except Exception as e:
-            logging.error(f"Failed to move downloaded archive to {self.get_repo_dir_name(repo_name, commit_sha)}.")
+            logging.error(f"Failed to extract archive to {repo_dir}.")
             logging.exception(e)
+            shutil.rmtree(repo_dir, ignore_errors=True)
             return False
+        finally:
+            if remove_archive and os.path.exists(archive_path):
+                os.remove(archive_path)
 
         try:
             logging.debug(f"Checkouting {repo_name} to commit {commit_sha}...")
-            repo = git.Repo(self.get_repo_dir_path(repo_name=repo_name, commit_sha=commit_sha))
+            repo = git.Repo(repo_dir)
             self._prepare_downloaded_repository(repo=repo, commit_sha=commit_sha)
         except Exception as e:
             logging.error(f"Failed to checkout repository '{repo_name}' to commit '{commit_sha}'.")
             logging.exception(e)
+            shutil.rmtree(repo_dir, ignore_errors=True)
+            return False
+        return True
+
+    def _download_local(self, repo_name: str, commit_sha: str, repo_dir: str) -> bool:
+        assert self.local_archives_dir is not None
+        for archive_type in self.archive_types:
+            archive_path = os.path.join(self.local_archives_dir, f"{repo_name.replace('/', '__')}.{archive_type}")
+            if os.path.exists(archive_path):
+                return self._extract_and_checkout(
+                    archive_path,
+                    archive_type,
+                    repo_name=repo_name,
+                    commit_sha=commit_sha,
+                    repo_dir=repo_dir,
+                    remove_archive=False,
+                )
+
+        logging.debug(f"Repository '{repo_name}' is not found in {self.local_archives_dir}.")
+        self._record_failure("local", repo_name=repo_name, commit_sha=commit_sha)
+        return False
+
+    def _download_hf_cache(self, repo_name: str, commit_sha: str, repo_dir: str) -> bool:
+        for archive_type in self.archive_types:
+            archive_path = try_to_load_from_cache(
+                repo_id=self.hf_name,
+                filename=self._get_hf_archive_filename(repo_name, archive_type),
+                repo_type="dataset",
+            )
+            if isinstance(archive_path, str):
+                return self._extract_and_checkout(
+                    archive_path,
+                    archive_type,
+                    repo_name=repo_name,
+                    commit_sha=commit_sha,
+                    repo_dir=repo_dir,
+                    remove_archive=False,
+                )
+
+        logging.debug(f"Repository '{repo_name}' is not found in HuggingFace cache.")
+        return False
+
+    def _download_hf_archive(self, repo_name: str, archive_type: str, archive_path: str) -> None:
+        """Downloads the archive from HuggingFace dataset; `hf` timeout limits the whole transfer."""
+        timeout = self.source_timeouts.get("hf")
+        deadline = None if timeout is None else time.monotonic() + timeout
+        url = hf_hub_url(self.hf_name, self._get_hf_archive_filename(repo_name, archive_type), repo_type="dataset")
+        try:
+            with get_session().get(url, headers=build_hf_headers(), stream=True, timeout=timeout) as response:
+                hf_raise_for_status(response)
+                with open(archive_path, "wb") as f:
+                    for chunk in response.iter_content(chunk_size=1 << 20):
+                        if deadline is not None and time.monotonic() > deadline:
+                            raise TimeoutError(f"Downloading {url} took longer than {timeout} seconds.")
+                        f.write(chunk)
+        except BaseException:
+            with contextlib.suppress(FileNotFoundError):
+                os.remove(archive_path)
+            raise
+
+    def _download_hf(self, repo_name: str, commit_sha: str, repo_dir: str) -> bool:
+        download_path, archive_type = None, None
+        is_not_found = True
+        for archive_type in self.archive_types:
             try:
-                if os.path.exists(local_path):
-                    os.remove(local_path)
-                shutil.rmtree(os.path.join(self.output_dir, f"repos/{self.language}"))
+                logging.debug(f"Downloading {repo_name} ({archive_type}) from Huggingface...")
+                archive_path = self.get_repo_archive_path(repo_name, commit_sha, archive_type)
+                self._download_hf_archive(repo_name, archive_type, archive_path)
+                download_path = archive_path
+                break
+            except (EntryNotFoundError, RepositoryNotFoundError) as e:
+                logging.debug(f"{repo_name} ({archive_type}) is not found on HuggingFace: {e}")
             except Exception as e:
-                logging.warning(f"Couldn't clean remaining files for {repo_name}@{commit_sha} downloaded from HF.")
-                logging.exception(e)
+                is_not_found = False
+                logging.debug(f"Couldn't download {repo_name} ({archive_type}) from HuggingFace: {e}")
 
+        if download_path is None or archive_type is None:
+            logging.error(f"Failed to download repository '{repo_name}' at commit '{commit_sha}' from HuggingFace.")
+            if is_not_found:
+                self._record_failure("hf", repo_name=repo_name, commit_sha=commit_sha)
             return False
-        return True
 
-    def _download_github(self, repo_name: str, commit_sha: str) -> bool:
+        return self._extract_and_checkout(
+            download_path,
+            archive_type,
+            repo_name=repo_name,
+            commit_sha=commit_sha,
+            repo_dir=repo_dir,
+            remove_archive=True,
+        )
+
+    def _download_github(self, repo_name: str, commit_sha: str, repo_dir: str) -> bool:
         try:
-            repo = git.Repo.clone_from(
-                f"https://github.com/{repo_name}", self.get_repo_dir_path(repo_name=repo_name, commit_sha=commit_sha)
+            # don't hang on credentials prompt for missing/private repositories
+            git.Git().clone(
+                f"https://github.com/{repo_name}",
+                repo_dir,
+                env={"GIT_TERMINAL_PROMPT": "0"},
+                kill_after_timeout=self.source_timeouts.get("github"),
             )
+            repo = git.Repo(repo_dir)
             self._prepare_downloaded_repository(repo=repo, commit_sha=commit_sha)
             return True
         except Exception as e:
             logging.error(f"Failed to download repository '{repo_name}' at commit '{commit_sha}' from GitHub.")
             logging.exception(e)
+            shutil.rmtree(repo_dir, ignore_errors=True)
+            if isinstance(e, git.GitCommandError) and any(
+                message in str(e.stderr) for message in GITHUB_NOT_FOUND_MESSAGES
+            ):
+                self._record_failure("github", repo_name=repo_name, commit_sha=commit_sha)
+            return False
+
+    def _get_source_handlers(self) -> Dict[str, Callable[[str, str, str], bool]]:
+        return {
+            "local": self._download_local,
+            "hf_cache": self._download_hf_cache,
+            "hf": self._download_hf,
+            "github": self._download_github,
+        }
+
+    def _get_source_key(self, source: str) -> str:
+        """Identifies the source together with its configuration, e.g., `hf:<dataset>`."""
+        if source in ("hf", "hf_cache"):
+            return f"{source}:{self.hf_name}"
+        if source == "local":
+            assert self.local_archives_dir is not None
+            return f"local:{os.path.abspath(self.local_archives_dir)}"
+        return source
+
+    def _is_known_failure(self, source: str, repo_name: str, commit_sha: str) -> bool:
+        recorded_at = self._known_failures.get((self._get_source_key(source), repo_name, commit_sha))
+        if recorded_at is None:
             return False
+        return self.failures_ttl is None or time.time() - recorded_at < self.failures_ttl
+
+    def _record_failure(self, source: str, repo_name: str, commit_sha: str) -> None:
+        """Remembers that the repository or revision is not found in the source."""
+        source_key, timestamp = self._get_source_key(source), time.time()
+        self._known_failures[(source_key, repo_name, commit_sha)] = timestamp
+        if self.failures_cache_path is not None:
+            os.makedirs(os.path.dirname(os.path.abspath(self.failures_cache_path)), exist_ok=True)
+            with open(self.failures_cache_path, "a") as f:
+                failure = {
+                    "source": source_key,
+                    "repository": repo_name,
+                    "revision": commit_sha,
+                    "timestamp": timestamp,
+                }
+                f.write(json.dumps(failure) + "\n")
 
-    def download(self, repo_name: str, commit_sha: str) -> bool:
-        exists = os.path.exists(self.get_repo_dir_path(repo_name, commit_sha))
-        if exists:
+    def _download_to(self, repo_name: str, commit_sha: str, repo_dir: str) -> bool:
+        if os.path.exists(repo_dir):
             try:
-                repo = git.Repo(self.get_repo_dir_path(repo_name=repo_name, commit_sha=commit_sha))
+                repo = git.Repo(repo_dir)
                 self._prepare_downloaded_repository(repo=repo, commit_sha=commit_sha)
                 return True
             except Exception as e:
@@ -125,23 +384,118 @@ class RepoDownloader:
                 )
                 logging.exception(e)
                 try:
-                    shutil.rmtree(self.get_repo_dir_path(repo_name=repo_name, commit_sha=commit_sha))
+                    shutil.rmtree(repo_dir)
                 except Exception as e:
                     logging.error(f"Couldn't clean already present repository '{repo_name}.")
                     logging.exception(e)
                     return False
 
-        os.makedirs(self.output_dir, exist_ok=True)
+        os.makedirs(os.path.dirname(repo_dir), exist_ok=True)
+
+        source_handlers = self._get_source_handlers()
+        for source in self.sources:
+            if self._is_known_failure(source, repo_name=repo_name, commit_sha=commit_sha):
+                logging.debug(f"Skipping {source} for {repo_name}@{commit_sha}: it is known to fail.")
+                continue
+
+            if source_handlers[source](repo_name, commit_sha, repo_dir):
+                return True
+
+        return False
 
-        is_downloaded_from_github = self._download_github(repo_name=repo_name, commit_sha=commit_sha)
-        if is_downloaded_from_github:
+    def _copy_tree(self, src: str, dst: str) -> None:
+        """Copies a directory, sharing data blocks via reflinks when the filesystem supports it."""
+        if self._reflinks_available:
+            try:
+                subprocess.run(["cp", "-a", "--reflink=always", src, dst], check=True, capture_output=True)
+                return
+            except (OSError, subprocess.CalledProcessError) as e:
+                # e.g., a filesystem without reflinks or cp without --reflink support
+                shutil.rmtree(dst, ignore_errors=True)
+                self._reflinks_available = False
+                reason = (
+                    e.stderr.decode(errors="replace").strip() if isinstance(e, subprocess.CalledProcessError) else e
+                )
+                logging.warning(
+                    f"Reflinks are not available in {self.output_dir} ({reason}): each run gets a full copy of "
+                    "the repository, which takes its whole size on disk."
+                )
+        shutil.copytree(src, dst, symlinks=True)
+
+    @contextlib.contextmanager
+    def _lock_base_checkout(self, repo_name: str, commit_sha: str) -> Iterator[None]:
+        """Serializes operations on the base checkout of the repository@revision, possibly from different processes.
+
+        The lock is blocking: call it from a worker thread in async code."""
+        base_dir = self.get_base_repo_dir_path(repo_name, commit_sha)
+        os.makedirs(os.path.dirname(base_dir), exist_ok=True)
+        with open(f"{base_dir}.lock", "w") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _ensure_base_checkout(self, repo_name: str, commit_sha: str) -> bool:
+        """Downloads the base checkout unless it is complete already; must be called under `_lock_base_checkout`."""
+        base_dir = self.get_base_repo_dir_path(repo_name, commit_sha)
+        complete_marker = f"{base_dir}.complete"
+        if os.path.exists(complete_marker):
             return True
+        shutil.rmtree(base_dir, ignore_errors=True)
+        if not self._download_to(repo_name, commit_sha, base_dir):
+            return False
+        open(complete_marker, "w").close()
+        return True
 
-        is_downloaded_from_hf = self._download_hf(repo_name=repo_name, commit_sha=commit_sha)
-        return is_downloaded_from_hf
+    def _clear_unused_base_checkout(self, repo_name: str, commit_sha: str) -> None:
+        """Removes the base checkout of the repository@revision unless some run still has a copy of it."""
+        base_dir = self.get_base_repo_dir_path(repo_name, commit_sha)
+        if not os.path.exists(base_dir) and not os.path.exists(f"{base_dir}.complete"):
+            return
+        with self._lock_base_checkout(repo_name, commit_sha):
+            # run copies are only made under the lock, so none can appear while it is held
+            run_dirs_pattern = os.path.join(glob.escape(self.output_dir), "runs", "*")
+            if glob.glob(os.path.join(run_dirs_pattern, glob.escape(self.get_repo_dir_name(repo_name, commit_sha)))):
+                return
+            with contextlib.suppress(FileNotFoundError):
+                os.remove(f"{base_dir}.complete")
+            shutil.rmtree(base_dir, ignore_errors=True)
+
+    def download(self, repo_name: str, commit_sha: str, run_id: Optional[str] = None) -> bool:
+        repo_dir = self.get_repo_dir_path(repo_name, commit_sha, run_id=run_id)
+        if not self.copy_on_write:
+            return self._download_to(repo_name, commit_sha, repo_dir)
+
+        if os.path.exists(repo_dir):
+            try:
+                repo = git.Repo(repo_dir)
+                self._prepare_downloaded_repository(repo=repo, commit_sha=commit_sha)
+                return True
+            except Exception as e:
+                logging.error(f"Failed to reset run copy of '{repo_name}@{commit_sha}'. Will copy it again.")
+                logging.exception(e)
+                shutil.rmtree(repo_dir, ignore_errors=True)
+
+        # concurrent runs of the same repository@revision wait for a single download
+        with self._lock_base_checkout(repo_name, commit_sha):
+            if not self._ensure_base_checkout(repo_name, commit_sha):
+                return False
+
+            try:
+                os.makedirs(os.path.dirname(repo_dir), exist_ok=True)
+                self._copy_tree(self.get_base_repo_dir_path(repo_name, commit_sha), repo_dir)
+            except Exception as e:
+                logging.error(f"Failed to copy base checkout of '{repo_name}@{commit_sha}' to {repo_dir}.")
+                logging.exception(e)
+                shutil.rmtree(repo_dir, ignore_errors=True)
+                return False
+        return True
 
-    def clear_repo(self, repo_name: str, commit_sha: str):
-        for archive_type in ["zip", "tar.gz"]:
+    def clear_repo(self, repo_name: str, commit_sha: str, run_id: Optional[str] = None):
+        """Removes the repository checkout for the given run; with copy-on-write checkouts, the base checkout
+        is removed as well once no other run has a copy of it."""
+        for archive_type in ["zip", "tar.gz", "tar.zst"]:
             archive_path = self.get_repo_archive_path(
                 repo_name=repo_name,
                 commit_sha=commit_sha,
@@ -150,6 +504,10 @@ class RepoDownloader:
             if os.path.exists(archive_path):
                 os.remove(archive_path)
 
-        repo_dir = self.get_repo_dir_path(repo_name, commit_sha)
+        repo_dir = self.get_repo_dir_path(repo_name, commit_sha, run_id=run_id)
         if os.path.exists(repo_dir):
             shutil.rmtree(repo_dir, ignore_errors=True)
+        if run_id is not None:
+            with contextlib.suppress(OSError):
+                os.rmdir(os.path.dirname(repo_dir))
+            self._clear_unused_base_checkout(repo_name, commit_sha)
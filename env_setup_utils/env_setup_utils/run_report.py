@@ -0,0 +1,401 @@
+import argparse
+import csv
+import glob
+import html
+import math
+import os
+from collections import Counter, defaultdict
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+import jsonlines
+
+from env_setup_utils.progress_events import read_progress_events
+
+NODE_KINDS = {"agent": "llm", "tools": "bash"}
+"""How time spent in trajectory nodes is attributed: LLM calls happen in `agent` nodes, bash commands in `tools`."""
+
+REPORT_TEMPLATE = """<!DOCTYPE html>
+<html lang="en">
+<head>
+    <meta charset="UTF-8">
+    <title>Run report: {title}</title>
+    <style>
+        body {{ font-family: -apple-system, "Segoe UI", Roboto, sans-serif; margin: 2em auto; max-width: 1100px; }}
+        table {{ border-collapse: collapse; margin-bottom: 2em; }}
+        th, td {{ border: 1px solid #ddd; padding: 4px 10px; text-align: right; }}
+        th {{ background: #f5f5f5; }}
+        td:first-child, th:first-child {{ text-align: left; }}
+        .charts {{ display: flex; flex-wrap: wrap; gap: 1em; }}
+        svg text {{ font-size: 11px; }}
+    </style>
+</head>
+<body>
+    <h1>Run report: {title}</h1>
+    <p>Generated at {generated_at}. Per-repository data is in <code>repositories.csv</code> next to this file.</p>
+    <h2>Summary</h2>
+    {summary}
+    <h2>Node latencies</h2>
+    <div class="charts">{node_histograms}</div>
+    {node_table}
+    <h2>LLM vs. bash time</h2>
+    {time_split}
+    <h2>Tool calls</h2>
+    {tool_calls}
+    <h2>Throughput</h2>
+    <div class="charts">{throughput}</div>
+    <h2>Slowest repositories</h2>
+    {slowest}
+</body>
+</html>
+"""
+
+
+def parse_timestamp(timestamp: str) -> float:
+    return datetime.fromisoformat(timestamp).timestamp()
+
+
+def analyze_trajectory(
+    trajectory_file: str, trajectory: List[Dict[str, Any]], start_time: Optional[float] = None
+) -> Tuple[Dict[str, Any], List[Dict]]:
+    """Per-repository statistics of a trajectory stored as `<owner>__<name>@<revision>.jsonl` and its node latencies.
+
+    Nodes are logged when they complete, so the latency of a node is the time since the previous one. The latency
+    of the first node (usually the first LLM call) is measured from `start_time`, the time the agent started
+    (`agent_started` progress event of inference); without it, the first node has no reference point and is skipped.
+    """
+    repository, revision = os.path.basename(trajectory_file[: -len(".jsonl")]).split("@")
+    repository = repository.replace("__", "/")
+    stats: Dict[str, Any] = {
+        "repository": repository,
+        "revision": revision,
+        "nodes": len(trajectory),
+        "tool_calls": 0,
+        "llm_time": 0.0,
+        "bash_time": 0.0,
+        "other_time": 0.0,
+        "start_time": start_time,
+        "end_time": None,
+        "finished": bool(trajectory) and trajectory[-1].get("node") == "commands_history",
+    }
+    tool_calls: Counter = Counter()
+    nodes = []
+    previous_time = start_time
+    for entry in trajectory:
+        if entry.get("node") == "agent":
+            for message in entry.get("messages", []):
+                for tool_call in message.get("message_content", {}).get("tool_calls") or []:
+                    tool_calls[tool_call["name"]] += 1
+        if "timestamp" not in entry:
+            continue
+        current_time = parse_timestamp(entry["timestamp"])
+        if stats["start_time"] is None:
+            stats["start_time"] = current_time
+        stats["end_time"] = current_time
+        if previous_time is not None and entry.get("node") != "commands_history":
+            duration = current_time - previous_time
+            stats[f"{NODE_KINDS.get(entry.get('node', ''), 'other')}_time"] += duration
+            nodes.append(
+                {"repository": repository, "revision": revision, "node": entry.get("node"), "duration": duration}
+            )
+        previous_time = current_time
+
+    stats["tool_calls"] = sum(tool_calls.values())
+    stats["tool_calls_by_name"] = dict(tool_calls)
+    stats["total_time"] = (stats["end_time"] - stats["start_time"]) if stats["start_time"] is not None else None
+    return stats, nodes
+
+
+def load_jsonl(path: str) -> List[Dict[str, Any]]:
+    with jsonlines.open(path) as reader:
+        return [line for line in reader]
+
+
+def load_progress_events(paths: Sequence[str]) -> List[Dict[str, Any]]:
+    events = []
+    for path in paths:
+        events.extend(read_progress_events(path)[0])
+    return events
+
+
+def build_report_data(
+    trajectories_dir: str,
+    evaluation_results: Optional[str] = None,
+    progress_files: Sequence[str] = (),
+    bucket_seconds: float = 600,
+) -> Dict[str, Any]:
+    """Aggregate trajectories, evaluation results and progress events of a run into per-repository rows,
+    node latencies, tool call counts and throughput per time bucket."""
+    events = load_progress_events(progress_files)
+    # a retried datapoint rewrites its trajectory, so the latest start is the one it belongs to
+    agent_start_times = {
+        (event["repository"], event["revision"]): event["time"]
+        for event in events
+        if event["stage"] == "inference" and event["event"] == "agent_started"
+    }
+
+    repositories: Dict[Tuple[str, str], Dict[str, Any]] = {}
+    nodes: List[Dict[str, Any]] = []
+    tool_calls: Counter = Counter()
+    for trajectory_file in sorted(glob.glob(os.path.join(trajectories_dir, "*.jsonl"))):
+        repository, revision = os.path.basename(trajectory_file[: -len(".jsonl")]).split("@")
+        start_time = agent_start_times.get((repository.replace("__", "/"), revision))
+        try:
+            stats, trajectory_nodes = analyze_trajectory(trajectory_file, load_jsonl(trajectory_file), start_time)
+        except (ValueError, jsonlines.InvalidLineError):
+            # the last message of a running trajectory might be incomplete
+            continue
+        tool_calls.update(stats.pop("tool_calls_by_name"))
+        repositories[(stats["repository"], stats["revision"])] = stats
+        nodes.extend(trajectory_nodes)
+
+    for event in events:
+        if event["stage"] == "inference" and event["event"] in ("finished", "failed"):
+            row = repositories.get((event["repository"], event["revision"]))
+            if row is not None:
+                row["container_restarts"] = event.get("container_restarts")
+                row["inference_status"] = event["event"]
+
+    if evaluation_results:
+        for result in load_jsonl(evaluation_results):
+            key = (result["repo_name"], result["commit_sha"])
+            row = repositories.setdefault(key, {"repository": key[0], "revision": key[1]})
+            row["exit_code"] = result.get("exit_code")
+            row["issues_count"] = result.get("issues_count")
+            row["evaluation_time"] = result.get("execution_time")
+            row["evaluation_cached"] = result.get("cached", False)
+
+    # completions per time bucket: trajectories by their last node, other stages by their progress events
+    completion_times: Dict[str, List[float]] = defaultdict(list)
+    for row in repositories.values():
+        if row.get("finished"):
+            completion_times["inference"].append(row["end_time"])
+    for event in events:
+        if event["event"] in ("finished", "failed") and event["stage"] != "inference":
+            completion_times[event["stage"]].append(event["time"])
+    throughput = []
+    for stage, times in completion_times.items():
+        start_time = min(times)
+        buckets = Counter(int((t - start_time) // bucket_seconds) for t in times)
+        for bucket in range(max(buckets) + 1):
+            throughput.append(
+                {"stage": stage, "bucket_start": start_time + bucket * bucket_seconds, "completed": buckets[bucket]}
+            )
+
+    return {
+        "repositories": list(repositories.values()),
+        "nodes": nodes,
+        "tool_calls": [{"tool": name, "count": count} for name, count in tool_calls.most_common()],
+        "throughput": throughput,
+        "bucket_seconds": bucket_seconds,
+    }
+
+
+def percentile(values: Sequence[float], q: float) -> Optional[float]:
+    """Nearest-rank percentile, `q` in [0, 100]."""
+    if not values:
+        return None
+    values = sorted(values)
+    return values[max(0, math.ceil(q / 100 * len(values)) - 1)]
+
+
+def write_csv(path: str, rows: List[Dict[str, Any]]) -> None:
+    fieldnames: List[str] = []
+    for row in rows:
+        fieldnames.extend(key for key in row if key not in fieldnames)
+    with open(path, "w", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=fieldnames)
+        writer.writeheader()
+        writer.writerows(rows)
+
+
+def format_value(value: Any) -> str:
+    if value is None:
+        return ""
+    if isinstance(value, float):
+        return f"{value:.1f}"
+    return html.escape(str(value))
+
+
+def html_table(rows: List[Dict[str, Any]], columns: Sequence[str]) -> str:
+    if not rows:
+        return "<p>No data.</p>"
+    header = "".join(f"<th>{html.escape(column)}</th>" for column in columns)
+    body = "".join(
+        "<tr>" + "".join(f"<td>{format_value(row.get(column))}</td>" for column in columns) + "</tr>" for row in rows
+    )
+    return f"<table><tr>{header}</tr>{body}</table>"
+
+
+def svg_bar_chart(title: str, labels: Sequence[str], values: Sequence[float], width: int = 520) -> str:
+    """Horizontal bar chart as inline SVG, so that the report has no external dependencies."""
+    bar_height, label_width, value_width = 16, 170, 60
+    height = 24 + bar_height * len(labels)
+    scale = (width - label_width - value_width) / max(max(values, default=0), 1e-9)
+    bars = []
+    for i, (label, value) in enumerate(zip(labels, values)):
+        y = 20 + i * bar_height
+        bar_width = value * scale
+        # truncated before escaping, so that an entity is never cut in half
+        bars.append(
+            f'<text x="{label_width - 4}" y="{y + 12}" text-anchor="end">{html.escape(str(label)[:28])}</text>'
+            f'<rect x="{label_width}" y="{y + 2}" width="{bar_width:.1f}" height="{bar_height - 4}" fill="#4c78a8"/>'
+            f'<text x="{label_width + bar_width + 4:.1f}" y="{y + 12}">{format_value(value)}</text>'
+        )
+    return (
+        f'<svg width="{width}" height="{height}" xmlns="http://www.w3.org/2000/svg">'
+        f'<text x="0" y="12" font-weight="bold">{html.escape(title)}</text>{"".join(bars)}</svg>'
+    )
+
+
+def histogram(values: Sequence[float], num_bins: int = 12) -> Tuple[List[str], List[int]]:
+    """Bins with log-spaced edges, latencies span from milliseconds to the bash timeout."""
+    low, high = max(min(values), 0.01), max(max(values), 0.01)
+    if high <= low:
+        return [f"{low:.2f}s"], [len(values)]
+    edges = [low * (high / low) ** (i / num_bins) for i in range(num_bins + 1)]
+    counts = [0] * num_bins
+    for value in values:
+        position = math.log(max(value, low) / low) / math.log(high / low) * num_bins
+        counts[min(int(position), num_bins - 1)] += 1
+    return [f"{edges[i]:.2f}-{edges[i + 1]:.2f}s" for i in range(num_bins)], counts
+
+
+def render_report(data: Dict[str, Any], title: str, top_n: int = 20) -> str:
+    repositories = data["repositories"]
+    trajectories = [row for row in repositories if row.get("total_time") is not None]
+    evaluated = [row for row in repositories if row.get("exit_code") is not None]
+    llm_time = sum(row["llm_time"] for row in trajectories)
+    bash_time = sum(row["bash_time"] for row in trajectories)
+    summary = {
+        "trajectories": len(trajectories),
+        "finished trajectories": sum(bool(row.get("finished")) for row in trajectories),
+        "tool calls": sum(row["tool_calls"] for row in trajectories),
+        "container restarts": sum(row.get("container_restarts") or 0 for row in trajectories),
+        "LLM time, hours": llm_time / 3600,
+        "bash time, hours": bash_time / 3600,
+        "evaluated": len(evaluated),
+        "evaluated successfully": sum(row["exit_code"] == 0 and not row.get("issues_count") for row in evaluated),
+    }
+
+    durations_by_node: Dict[str, List[float]] = defaultdict(list)
+    for node in data["nodes"]:
+        durations_by_node[node["node"]].append(node["duration"])
+    node_rows = [
+        {
+            "node": node,
+            "count": len(durations),
+            "mean, s": sum(durations) / len(durations),
+            "p50, s": percentile(durations, 50),
+            "p90, s": percentile(durations, 90),
+            "p99, s": percentile(durations, 99),
+            "max, s": max(durations),
+        }
+        for node, durations in sorted(durations_by_node.items())
+    ]
+    node_histograms = "".join(
+        svg_bar_chart(f"{node} latency (count)", *histogram(durations)) for node, durations in durations_by_node.items()
+    )
+
+    time_split = svg_bar_chart(
+        "Total time, hours",
+        ["LLM (agent nodes)", "bash (tools nodes)", "other nodes"],
+        [llm_time / 3600, bash_time / 3600, sum(row["other_time"] for row in trajectories) / 3600],
+    )
+
+    tool_calls = svg_bar_chart(
+        "Tool calls", [row["tool"] for row in data["tool_calls"]], [row["count"] for row in data["tool_calls"]]
+    )
+
+    throughput_by_stage: Dict[str, List[Dict[str, Any]]] = defaultdict(list)
+    for row in data["throughput"]:
+        throughput_by_stage[row["stage"]].append(row)
+    throughput = "".join(
+        svg_bar_chart(
+            f"{stage}: completed per {data['bucket_seconds'] / 60:g} minutes",
+            [datetime.fromtimestamp(row["bucket_start"]).strftime("%m-%d %H:%M") for row in rows],
+            [row["completed"] for row in rows],
+        )
+        for stage, rows in throughput_by_stage.items()
+    )
+
+    slowest = sorted(
+        repositories, key=lambda row: (row.get("total_time") or 0) + (row.get("evaluation_time") or 0), reverse=True
+    )[:top_n]
+    return REPORT_TEMPLATE.format(
+        title=html.escape(title),
+        generated_at=datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+        summary=html_table([{"metric": key, "value": value} for key, value in summary.items()], ["metric", "value"]),
+        node_histograms=node_histograms,
+        node_table=html_table(node_rows, list(node_rows[0]) if node_rows else []),
+        time_split=time_split,
+        tool_calls=tool_calls,
+        throughput=throughput or "<p>No data.</p>",
+        slowest=html_table(
+            slowest,
+            [
+                "repository",
+                "revision",
+                "total_time",
+                "llm_time",
+                "bash_time",
+                "tool_calls",
+                "container_restarts",
+                "evaluation_time",
+                "exit_code",
+                "issues_count",
+            ],
+        ),
+    )
+
+
+def generate_run_report(
+    trajectories_dir: str,
+    output_dir: str,
+    evaluation_results: Optional[str] = None,
+    progress_files: Iterable[str] = (),
+    bucket_seconds: float = 600,
+    title: Optional[str] = None,
+) -> str:
+    """Write `report.html` with CSVs of per-repository stats, node latencies, tool calls and throughput
+    to `output_dir`; returns the path to the report."""
+    data = build_report_data(trajectories_dir, evaluation_results, list(progress_files), bucket_seconds)
+    os.makedirs(output_dir, exist_ok=True)
+    write_csv(os.path.join(output_dir, "repositories.csv"), data["repositories"])
+    write_csv(os.path.join(output_dir, "nodes.csv"), data["nodes"])
+    write_csv(os.path.join(output_dir, "tool_calls.csv"), data["tool_calls"])
+    write_csv(os.path.join(output_dir, "throughput.csv"), data["throughput"])
+    report_path = os.path.join(output_dir, "report.html")
+    with open(report_path, "w") as f:
+        f.write(render_report(data, title or os.path.basename(os.path.normpath(trajectories_dir))))
+    return report_path
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate an offline HTML/CSV performance report for a run.")
+    parser.add_argument("--trajectories-dir", required=True, help="Local directory with trajectory JSONL files.")
+    parser.add_argument("--evaluation-results", help="Evaluation results.jsonl.")
+    parser.add_argument(
+        "--progress-files",
+        nargs="*",
+        default=[],
+        help="Progress event files of the pipeline stages (*.progress.jsonl).",
+    )
+    parser.add_argument("--output-dir", required=True, help="Directory to write report.html and CSVs to.")
+    parser.add_argument("--bucket-minutes", type=float, default=10, help="Time bucket for throughput over time.")
+    parser.add_argument("--title", help="Report title, the trajectories directory name by default.")
+    args = parser.parse_args()
+
+    report_path = generate_run_report(
+        args.trajectories_dir,
+        args.output_dir,
+        evaluation_results=args.evaluation_results,
+        progress_files=args.progress_files,
+        bucket_seconds=args.bucket_minutes * 60,
+        title=args.title,
+    )
+    print(f"Report has been saved to {report_path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+"""Benchmark of reading local data sources: rows/sec of `LocalFileDataSource` for each supported format.
+
+Usage: python scripts/benchmark_data_sources.py --num-rows 1000000 [--columns repository revision]
+
+Throughput depends on the CPU and on versions of the parsing libraries, which are printed along with the results;
+it is measured on synthetic rows on a single core, so compare the formats within one run rather than across machines.
+"""
+
+import argparse
+import csv
+import gzip
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+from typing import Any, Dict, List, Optional
+
+import jsonlines
+
+from env_setup_utils.data_sources import LocalFileDataSource
+
+
+def generate_rows(num_rows: int) -> List[Dict[str, Any]]:
+    """Rows shaped like repository lists and script tables."""
+    return [
+        {
+            "repository": f"owner{i % 1000}/name{i}",
+            "revision": f"{i:040x}",
+            "script": f"#!/bin/bash\npip install -e .\npip install -r requirements-{i % 7}.txt\n",
+            "stars": i % 5000,
+        }
+        for i in range(num_rows)
+    ]
+
+
+def write_files(rows: List[Dict[str, Any]], output_dir: str) -> Dict[str, str]:
+    import pyarrow as pa  # type: ignore[import-untyped, import-not-found]
+    import pyarrow.parquet as pq  # type: ignore[import-untyped, import-not-found]
+    import zstandard  # type: ignore[import-untyped, import-not-found]
+
+    paths = {fmt: os.path.join(output_dir, f"data{fmt}") for fmt in (".jsonl", ".jsonl.gz", ".jsonl.zst", ".csv")}
+    with jsonlines.open(paths[".jsonl"], "w") as jsonl_writer:
+        jsonl_writer.write_all(rows)
+    with open(paths[".jsonl"], "rb") as src, gzip.open(paths[".jsonl.gz"], "wb", compresslevel=6) as dst:
+        dst.write(src.read())
+    with open(paths[".jsonl"], "rb") as src, open(paths[".jsonl.zst"], "wb") as dst:
+        zstandard.ZstdCompressor(level=3).copy_stream(src, dst)
+    with open(paths[".csv"], "w", newline="") as f:
+        csv_writer = csv.DictWriter(f, fieldnames=list(rows[0]))
+        csv_writer.writeheader()
+        csv_writer.writerows(rows)
+
+    table = pa.Table.from_pylist(rows)
+    paths[".parquet"] = os.path.join(output_dir, "data.parquet")
+    pq.write_table(table, paths[".parquet"], compression="zstd")
+    paths[".arrow"] = os.path.join(output_dir, "data.arrow")
+    with pa.ipc.new_file(paths[".arrow"], table.schema) as arrow_writer:
+        arrow_writer.write_table(table, max_chunksize=10_000)
+    return paths
+
+
+def benchmark(path: str, columns: Optional[List[str]]) -> float:
+    """Returns rows per second."""
+    start_time = time.perf_counter()
+    num_rows = sum(1 for _ in LocalFileDataSource(path, columns=columns))
+    return num_rows / (time.perf_counter() - start_time)
+
+
+def benchmark_json_baseline(path: str) -> float:
+    """`jsonlines` with the standard `json` module, as `LocalFileDataSource` used to read JSONLines."""
+    start_time = time.perf_counter()
+    with jsonlines.open(path, loads=json.loads) as reader:
+        num_rows = sum(1 for _ in reader)
+    return num_rows / (time.perf_counter() - start_time)
+
+
+def get_environment() -> str:
+    versions = [f"python {platform.python_version()}"]
+    for package in ("orjson", "pyarrow", "zstandard"):
+        module = sys.modules.get(package)
+        versions.append(f"{package} {getattr(module, '__version__', 'not installed')}")
+    return f"{platform.processor() or platform.machine()}, {os.cpu_count()} CPUs; {', '.join(versions)}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark reading local data sources in different formats.")
+    parser.add_argument("--num-rows", type=int, default=1_000_000)
+    parser.add_argument("--columns", nargs="*", help="Columns to read; all columns by default.")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as output_dir:
+        paths = write_files(generate_rows(args.num_rows), output_dir)
+        print(f"{'format':<20}{'size, MB':>10}{'rows/sec':>14}")
+        print(f"{'.jsonl (json)':<20}{os.path.getsize(paths['.jsonl']) / 2**20:>10.1f}", end="")
+        print(f"{benchmark_json_baseline(paths['.jsonl']):>14,.0f}")
+        for fmt, path in paths.items():
+            print(f"{fmt:<20}{os.path.getsize(path) / 2**20:>10.1f}{benchmark(path, args.columns):>14,.0f}")
+        print(get_environment())
+
+
+if __name__ == "__main__":
+    main()
@@ -1,17 +1,15 @@
+import asyncio
 import logging
 import os
-import queue
 import subprocess
-import threading
-import time
 from collections import deque
 from dataclasses import dataclass
 from pathlib import Path
 from typing import Optional
-import re
 
 import hydra
 import yaml
+from huggingface_hub import CommitOperationAdd, HfApi
 from hydra.core.config_store import ConfigStore
 from omegaconf import DictConfig, OmegaConf
 from rich.align import Align
@@ -19,7 +17,7 @@ from rich.box import DOUBLE, ROUNDED
 from rich.console import Console
 from rich.logging import RichHandler
 from rich.panel import Panel
-from rich.progress import BarColumn, Progress, SpinnerColumn, TextColumn, TimeElapsedColumn
+from rich.progress import BarColumn, Progress, SpinnerColumn, TaskID, TextColumn, TimeElapsedColumn
 from rich.rule import Rule
 from rich.table import Table
 from rich.markup import escape
@@ -31,6 +29,9 @@ import wandb
 from analysis.scripts_viewer import generate_scripts_html_from_hf
 from analysis.traj_viewer import generate_trajectories_html_from_hf
 from analysis.view_logs import generate_logs_html_from_hf
+from env_setup_utils.package_proxy import start_package_proxy, stop_package_proxy
+from env_setup_utils.progress_events import PROGRESS_FILE_ENV, ProgressTracker, read_progress_events
+from env_setup_utils.run_report import generate_run_report
 
 install(show_locals=True, width=120, word_wrap=True)
 
@@ -46,10 +47,6 @@ STEP_STYLES = {"inference": "blue", "processing": "green", "evaluation": "yellow
 
 STEP_EMOJIS = {"inference": "🤖", "processing": "🔄", "evaluation": "📊"}
 
-# Global fancy output setting
-FANCY_OUTPUT = False
-
-
 @dataclass
 class PipelineConfig:
     tmp_dir: str
@@ -61,6 +58,9 @@ class PipelineConfig:
     skip_inference: bool = False
     skip_processing: bool = False
     skip_evaluation: bool = False
+    pipeline_mode: str = "sequential"
+    artifacts: str = "hf"
+    upload_artifacts: bool = True
     data_path: str = str(Path.home() / "data_path")
     fancy_output: bool = True
 
@@ -89,99 +89,6 @@ def create_step_header(step: str, number: int, style: str) -> Panel:
     )
 
 
-def stream_subprocess_output(
-    process: subprocess.Popen, description: str, progress: Progress, style: str = "blue"
-) -> None:
-    """Stream subprocess output in a nicely formatted way"""
-    global FANCY_OUTPUT
-    output_queue = queue.Queue()
-    output_lines = deque(maxlen=15)
-    task_id = progress.add_task(description, total=None)
-    last_update = time.time()
-    update_interval = 0.5  # Update every 0.5 seconds
-
-    def reader(pipe, queue):
-        try:
-            with pipe:
-                for line in iter(pipe.readline, ""):
-                    queue.put(line.strip())
-        finally:
-            queue.put(None)
-
-    stdout_thread = threading.Thread(target=reader, args=(process.stdout, output_queue))
-    stderr_thread = threading.Thread(target=reader, args=(process.stderr, output_queue))
-    stdout_thread.daemon = True
-    stderr_thread.daemon = True
-    stdout_thread.start()
-    stderr_thread.start()
-
-    # Create initial panel if using fancy output
-    if progress.console.is_interactive and FANCY_OUTPUT:
-        panel = Panel(
-            "",
-            title=f"[bold]{description}[/bold]",
-            border_style=style,
-            box=ROUNDED,
-            title_align="center",
-            padding=(1, 2),
-            subtitle="🔄 Live Output",
-            subtitle_align="right",
-        )
-        progress.console.print(panel)
-
-    while stdout_thread.is_alive() or stderr_thread.is_alive() or not output_queue.empty():
-        try:
-            line = output_queue.get(timeout=0.1)
-            if line is None:
-                continue
-            output_lines.append(line)
-
-            # Update output based on mode
-            current_time = time.time()
-            if current_time - last_update >= update_interval:
-                if progress.console.is_interactive and FANCY_OUTPUT:
-                    progress.console.print(Panel(
-                        "\n".join(output_lines),
-                        title=f"[bold]{description}[/bold]",
-                        border_style=style,
-                        box=ROUNDED,
-                        title_align="center",
-                        padding=(1, 2),
-                        subtitle="🔄 Live Output",
-                        subtitle_align="right",
-                    ))
-                else:
-                    # Simple output mode
-                    for line in output_lines:
-                        progress.console.print(escape(line))
-                    output_lines.clear()
-                last_update = current_time
-
-        except queue.Empty:
-            continue
-
-    # Print final state
-    if output_lines:
-        if progress.console.is_interactive and FANCY_OUTPUT:
-            progress.console.print(Panel(
-                "\n".join(output_lines),
-                title=f"[bold]{description}[/bold]",
-                border_style=style,
-                box=ROUNDED,
-                title_align="center",
-                padding=(1, 2),
-                subtitle="✅ Complete",
-                subtitle_align="right",
-            ))
-        else:
-            # Simple output mode
-            for line in output_lines:
-                progress.console.print(escape(line))
-
-    process.wait()
-    progress.remove_task(task_id)
-
-
 def create_config_files(cfg: DictConfig, base_config: dict, file_name: str) -> None:
     tmp_path = Path(cfg.tmp_dir)
     tmp_path.mkdir(parents=True, exist_ok=True)
@@ -197,70 +104,204 @@ def create_config_files(cfg: DictConfig, base_config: dict, file_name: str) -> N
         yaml.safe_dump(evaluation_config, f)
 
 
-def run_command_with_progress(command: str, description: str, progress: Progress, style: str = "blue", data_path: str = None, count_pattern: str = None) -> None:
+@dataclass
+class ConsoleOutputConfig:
+    # how often (in seconds) buffered subprocess output is rendered to the console
+    render_interval: float = 0.5
+    # lines per second shown on the console for each command; the rest only goes to the log file
+    max_lines_per_second: int = 100
+    # directory to save full outputs of commands to
+    log_dir: Optional[str] = None
+
+
+def format_duration(seconds: Optional[float]) -> str:
+    if seconds is None:
+        return "?"
+    if seconds < 60:
+        return f"{seconds:.1f}s"
+    minutes, seconds = divmod(int(seconds), 60)
+    hours, minutes = divmod(minutes, 60)
+    return f"{hours}h{minutes:02d}m" if hours else f"{minutes}m{seconds:02d}s"
+
+
+def format_progress(tracker: ProgressTracker) -> str:
+    total = tracker.expected_total
+    parts = [f"{tracker.done}/{total if total is not None else '?'}"]
+    if tracker.failed:
+        parts.append(f"{tracker.failed} failed")
+    parts.append(f"{tracker.throughput() * 60:.1f}/min")
+    if tracker.durations:
+        parts.append(f"p50 {format_duration(tracker.percentile(50))}")
+    parts.append(f"ETA {format_duration(tracker.eta())}")
+    return ", ".join(parts)
+
+
+class OutputPump:
+    """Reads a subprocess output in large chunks, saves all of it to a log file and renders it to the console in
+    batches, at most `max_lines_per_second` lines per second; excess lines are only counted on the console.
+
+    Progress is taken from structured events the command writes to `progress_path` (see `ProgressEventWriter`).
+    """
+
+    def __init__(
+        self,
+        progress: Progress,
+        task_id: TaskID,
+        description: str,
+        style: str,
+        output_config: ConsoleOutputConfig,
+        log_path: Optional[str] = None,
+        progress_path: Optional[str] = None,
+    ):
+        self.progress = progress
+        self.task_id = task_id
+        self.description = description
+        self.style = style
+        self.output_config = output_config
+        self.log_path = log_path
+        self.progress_path = progress_path
+        self.progress_position = 0
+        self.tracker = ProgressTracker()
+        self.max_lines = max(1, int(output_config.max_lines_per_second * output_config.render_interval))
+        self.lines: deque[str] = deque(maxlen=self.max_lines)
+        self.num_omitted = 0
+
+    def add_lines(self, text: str) -> None:
+        lines = text.splitlines()
+        self.num_omitted += max(0, len(self.lines) + len(lines) - self.max_lines)
+        self.lines.extend(lines)
+
+    def render(self) -> None:
+        if self.num_omitted:
+            self.progress.console.print(
+                f"[dim]... {self.num_omitted} lines omitted"
+                + (f", full output in {escape(self.log_path)}" if self.log_path else "")
+                + " ...[/dim]"
+            )
+            self.num_omitted = 0
+        if self.lines:
+            # a single print per batch: rendering line by line is what makes the console CPU-bound
+            self.progress.console.print(escape("\n".join(self.lines)), highlight=False)
+            self.lines.clear()
+        if self.progress_path:
+            events, self.progress_position = read_progress_events(self.progress_path, self.progress_position)
+            for event in events:
+                self.tracker.update(event)
+            if self.tracker.start_time is not None:
+                self.progress.update(
+                    self.task_id,
+                    total=self.tracker.expected_total,
+                    completed=self.tracker.done,
+                    description=f"[{self.style}]{self.description} ({format_progress(self.tracker)})",
+                )
+
+    def summary(self) -> Optional[str]:
+        """Per-stage throughput and latency percentiles, once the command is done."""
+        if self.tracker.start_time is None:
+            return None
+        tracker = self.tracker
+        return (
+            f"{self.description.rstrip('.')}: {tracker.finished} finished, {tracker.failed} failed"
+            f" in {format_duration(tracker.elapsed)}"
+            f" ({tracker.throughput(tracker.last_time) * 60:.1f}/min);"
+            f" latency p50 {format_duration(tracker.percentile(50))},"
+            f" p90 {format_duration(tracker.percentile(90))}, p99 {format_duration(tracker.percentile(99))}"
+        )
+
+    async def run(self, stream: asyncio.StreamReader) -> None:
+        log_file = open(self.log_path, "ab") if self.log_path else None
+        renderer = asyncio.create_task(self._render_periodically())
+        remainder = b""
+        try:
+            while chunk := await stream.read(1 << 16):
+                if log_file is not None:
+                    log_file.write(chunk)
+                # only complete lines are rendered, the rest waits for the next chunk
+                complete, newline, remainder = (remainder + chunk).rpartition(b"\n")
+                if newline:
+                    self.add_lines(complete.decode("utf-8", errors="replace"))
+            if remainder:
+                self.add_lines(remainder.decode("utf-8", errors="replace"))
+        finally:
+            renderer.cancel()
+            self.render()
+            if log_file is not None:
+                log_file.close()
+
+    async def _render_periodically(self) -> None:
+        while True:
+            await asyncio.sleep(self.output_config.render_interval)
+            self.render()
+
+
+async def run_command_async(
+    command: str,
+    description: str,
+    progress: Progress,
+    style: str = "blue",
+    data_path: Optional[str] = None,
+    output_config: Optional[ConsoleOutputConfig] = None,
+    log_name: Optional[str] = None,
+) -> None:
+    output_config = output_config or ConsoleOutputConfig()
     progress.console.print(Panel(
         f"[bold]Running command:[/bold]\n{command}",
         style=style,
         box=ROUNDED,
         padding=(1, 2)
     ))
-    
+
     env = os.environ.copy()
-    env["DATA_ROOT"] = data_path
-    
-    process = subprocess.Popen(
+    if data_path is not None:
+        env["DATA_ROOT"] = data_path
+
+    log_path = None
+    progress_path = None
+    if output_config.log_dir and log_name:
+        os.makedirs(output_config.log_dir, exist_ok=True)
+        log_path = os.path.join(output_config.log_dir, f"{log_name}.log")
+        # structured progress events go through a side channel instead of being parsed from the output
+        progress_path = os.path.join(output_config.log_dir, f"{log_name}.progress.jsonl")
+        Path(progress_path).unlink(missing_ok=True)
+        env[PROGRESS_FILE_ENV] = progress_path
+
+    # stderr is merged into stdout, so a single stream is read for each command
+    process = await asyncio.create_subprocess_shell(
         command,
-        shell=True,
-        text=True,
         cwd=WORKSPACE_DIR,
         env=env,
-        stdout=subprocess.PIPE,
-        stderr=subprocess.PIPE,
-        bufsize=1,
-        universal_newlines=True,
+        stdout=asyncio.subprocess.PIPE,
+        stderr=asyncio.subprocess.STDOUT,
     )
-    
+
     task_id = progress.add_task(f"[{style}]{description}", total=None)
-    count = 0
-    pattern = re.compile(count_pattern, re.IGNORECASE) if count_pattern else None
-    
-    def reader(pipe, queue):
-        try:
-            with pipe:
-                for line in iter(pipe.readline, ""):
-                    queue.put(line.strip())
-        finally:
-            queue.put(None)
-    
-    output_queue = queue.Queue()
-    stdout_thread = threading.Thread(target=reader, args=(process.stdout, output_queue))
-    stderr_thread = threading.Thread(target=reader, args=(process.stderr, output_queue))
-    stdout_thread.daemon = True
-    stderr_thread.daemon = True
-    stdout_thread.start()
-    stderr_thread.start()
-    
-    while stdout_thread.is_alive() or stderr_thread.is_alive() or not output_queue.empty():
-        try:
-            line = output_queue.get(timeout=0.1)
-            if line is None:
-                continue
-            progress.console.print(escape(line))
-            
-            if pattern and pattern.search(line):
-                count += 1
-                progress.update(task_id, description=f"[{style}]{description} (Repositories: {count})")
-                
-        except queue.Empty:
-            continue
-    
-    process.wait()
-    progress.remove_task(task_id)
-    
+    pump = OutputPump(progress, task_id, description, style, output_config, log_path, progress_path)
+    assert process.stdout is not None
+    try:
+        await pump.run(process.stdout)
+        await process.wait()
+    finally:
+        progress.remove_task(task_id)
+    summary = pump.summary()
+    if summary:
+        progress.console.print(Panel(escape(summary), style=style, box=ROUNDED))
+
     if process.returncode != 0:
         raise RuntimeError(f"Command failed with return code {process.returncode}")
 
 
+def run_command_with_progress(
+    command: str,
+    description: str,
+    progress: Progress,
+    style: str = "blue",
+    data_path: Optional[str] = None,
+    output_config: Optional[ConsoleOutputConfig] = None,
+    log_name: Optional[str] = None,
+) -> None:
+    asyncio.run(run_command_async(command, description, progress, style, data_path, output_config, log_name))
+
+
 def get_relative_config_path(tmp_dir: str, script_path: str) -> str:
     """Calculate relative path from script to config directory"""
     tmp_path = Path(tmp_dir)
@@ -280,13 +321,13 @@ def create_artifact_table(title: str, repo_id: str, artifacts: list[tuple[str, s
     return table
 
 
-def create_summary_table(artifacts: list[tuple[str, str, str]]) -> Table:
-    """Create a summary table showing all HuggingFace artifacts"""
+def create_summary_table(artifacts: list[tuple[str, str, str]], uploaded: bool = True) -> Table:
+    """Create a summary table showing all HuggingFace (or local) artifacts"""
     table = Table(
         title="🗂️  Pipeline Artifacts Summary",
         box=ROUNDED,
         title_style="bold magenta",
-        caption="All artifacts have been uploaded to HuggingFace 🤗",
+        caption="All artifacts have been uploaded to HuggingFace 🤗" if uploaded else "Artifacts are kept locally 💾",
         caption_style="dim",
     )
     table.add_column("Stage", style="bold")
@@ -299,6 +340,180 @@ def create_summary_table(artifacts: list[tuple[str, str, str]]) -> Table:
     return table
 
 
+@dataclass
+class StreamingStage:
+    name: str
+    command: str
+    description: str
+    style: str
+    # file or directory the stage writes to; `<output_path>.done` is created once the stage exits
+    output_path: Optional[str] = None
+    skip: bool = False
+
+
+def run_streaming_stages(
+    stages: list[StreamingStage], progress: Progress, data_path: str, output_config: ConsoleOutputConfig
+) -> None:
+    """Run pipeline stages concurrently, each consuming the output of the previous one while it is being written.
+
+    A stage learns that its input is complete from the `.done` marker created when the previous stage exits
+    (successfully or not), so a failed stage does not leave the next ones waiting forever.
+    """
+    for stage in stages:
+        if stage.output_path is not None:
+            Path(f"{stage.output_path}.done").unlink(missing_ok=True)
+
+    async def run_stage(stage: StreamingStage) -> None:
+        try:
+            await run_command_async(
+                stage.command,
+                stage.description,
+                progress,
+                style=stage.style,
+                data_path=data_path,
+                output_config=output_config,
+                log_name=stage.name,
+            )
+        finally:
+            if stage.output_path is not None:
+                Path(stage.output_path).parent.mkdir(parents=True, exist_ok=True)
+                Path(f"{stage.output_path}.done").touch()
+
+    async def run_stages() -> None:
+        coroutines = []
+        for stage in stages:
+            if stage.skip:
+                # the output of a skipped stage is expected to be there already
+                if stage.output_path is not None:
+                    Path(f"{stage.output_path}.done").touch()
+                continue
+            coroutines.append(run_stage(stage))
+        # all stages run to completion even if one fails, the first error is raised afterwards
+        for result in await asyncio.gather(*coroutines, return_exceptions=True):
+            if isinstance(result, BaseException):
+                raise result
+
+    asyncio.run(run_stages())
+
+
+def upload_artifacts(base_config: dict, local_paths: dict[str, str], config_file: str) -> None:
+    """Upload local artifacts of all stages to HuggingFace, in a single commit per repository."""
+    inference_hf = base_config["inference"]["hf"]
+    evaluation_hf = base_config["evaluation"]["output"]["hf"]
+    operations: dict[str, list[CommitOperationAdd]] = {}
+    if "Inference" in local_paths:
+        trajectories_dir = local_paths["Inference"]
+        operations.setdefault(inference_hf["repo_id"], []).extend(
+            CommitOperationAdd(
+                path_in_repo=f"{inference_hf['path_in_repo']}/trajectories/{name}",
+                path_or_fileobj=os.path.join(trajectories_dir, name),
+            )
+            for name in sorted(os.listdir(trajectories_dir))
+            if name.endswith(".jsonl")
+        )
+        operations[inference_hf["repo_id"]].append(
+            CommitOperationAdd(path_in_repo=f"{inference_hf['path_in_repo']}/config.yaml", path_or_fileobj=config_file)
+        )
+        try:
+            commit_hash = subprocess.check_output(["git", "rev-parse", "HEAD"], cwd=WORKSPACE_DIR).strip()
+            operations[inference_hf["repo_id"]].append(
+                CommitOperationAdd(
+                    path_in_repo=f"{inference_hf['path_in_repo']}/commit_hash.txt", path_or_fileobj=commit_hash
+                )
+            )
+        except subprocess.CalledProcessError:
+            logger.error("Couldn't access the current commit to upload it.")
+    if "Processing" in local_paths:
+        operations.setdefault(inference_hf["repo_id"], []).append(
+            CommitOperationAdd(
+                path_in_repo=f"{inference_hf['path_in_repo']}/scripts.jsonl", path_or_fileobj=local_paths["Processing"]
+            )
+        )
+    if "Evaluation" in local_paths:
+        operations.setdefault(evaluation_hf["repo_id"], []).append(
+            CommitOperationAdd(
+                path_in_repo=f"{evaluation_hf['path_in_repo']}/results.jsonl", path_or_fileobj=local_paths["Evaluation"]
+            )
+        )
+
+    hf_api = HfApi()
+    for repo_id, repo_operations in operations.items():
+        hf_api.create_commit(
+            repo_id=repo_id,
+            repo_type="dataset",
+            operations=repo_operations,
+            commit_message=f"Upload artifacts of {inference_hf['path_in_repo']}",
+        )
+        logger.info(f"Uploaded {len(repo_operations)} files to {repo_id}.")
+
+
+def report_inference(cfg: DictConfig, base_config: dict, artifacts: list, console: Console) -> None:
+    console.print(Panel("🔍 Generating trajectories visualization...", style="blue", box=ROUNDED))
+    traj_html = generate_trajectories_html_from_hf(
+        traj_dir=f"{cfg.run_name}/trajectories",
+        repo_id=base_config["inference"]["hf"]["repo_id"],
+        no_cache=True,
+    )
+    if cfg.use_wandb:
+        wandb_run = wandb.init(
+            project=cfg.wandb_project,
+            job_type="inference",
+            name=f"{cfg.tag} inference",
+            config=base_config["inference"],
+        )
+        wandb.log({"trajectories_viewer": wandb.Html(traj_html)})
+        wandb_run.finish()
+
+    # Track artifact
+    artifacts.append(("Inference", base_config["inference"]["hf"]["repo_id"], f"{cfg.run_name}/trajectories"))
+    console.print(Rule(style="bright_black"))
+
+
+def report_processing(cfg: DictConfig, base_config: dict, artifacts: list, console: Console) -> None:
+    console.print(Panel("📝 Generating scripts visualization...", style="green", box=ROUNDED))
+    scripts_html = generate_scripts_html_from_hf(
+        scripts_file=f"{cfg.run_name}/scripts.jsonl",
+        repo_id=base_config["inference"]["hf"]["repo_id"],
+        no_cache=True,
+    )
+    if cfg.use_wandb:
+        wandb_run = wandb.init(
+            project=cfg.wandb_project,
+            job_type="scripts",
+            name=f"{cfg.tag} scripts",
+        )
+        wandb.log({"scripts_viewer": wandb.Html(scripts_html)})
+        wandb_run.finish()
+
+    # Track artifact
+    artifacts.append(("Processing", base_config["inference"]["hf"]["repo_id"], f"{cfg.run_name}/scripts.jsonl"))
+    console.print(Rule(style="bright_black"))
+
+
+def report_evaluation(cfg: DictConfig, base_config: dict, artifacts: list, console: Console) -> None:
+    console.print(Panel("📊 Generating evaluation visualization...", style="yellow", box=ROUNDED))
+    eval_html = generate_logs_html_from_hf(
+        logs_file=f"{cfg.run_name}/results.jsonl",
+        repo_id=base_config["evaluation"]["output"]["hf"]["repo_id"],
+        no_cache=True,
+    )
+    if cfg.use_wandb:
+        wandb_run = wandb.init(
+            project=str(cfg.wandb_project),
+            job_type="evaluation",
+            name=f"{cfg.tag} eval",
+            config=base_config["evaluation"],
+        )
+        wandb.log({"evaluation_viewer": wandb.Html(eval_html)})
+        wandb_run.finish()
+
+    # Track artifact
+    artifacts.append(
+        ("Evaluation", base_config["evaluation"]["output"]["hf"]["repo_id"], f"{cfg.run_name}/results.jsonl")
+    )
+    console.print(Rule(style="bright_black"))
+
+
 @hydra.main(version_base=None, config_path="conf", config_name="defaults")
 def main(cfg: DictConfig) -> None:
     console = Console()
@@ -334,121 +549,203 @@ def main(cfg: DictConfig) -> None:
     # Load base configuration
     base_config = OmegaConf.to_container(cfg, resolve=True)
 
-    # Create separate config files
-    create_config_files(cfg, base_config, file_name)
+    # In streaming mode and with local artifacts, stages hand over their outputs through local files
+    streaming = cfg.pipeline_mode == "streaming"
+    local_artifacts = cfg.artifacts == "local"
+    trajectories_dir = os.path.abspath(base_config["inference"]["logging_dir"])
+    scripts_file = os.path.abspath(cfg.scripts_processing.output_file)
+    results_file = os.path.join(
+        os.path.abspath(base_config["evaluation"]["operation"]["dirs"]["json_results"]), "results.jsonl"
+    )
+    if cfg.pipeline_mode not in ("sequential", "streaming"):
+        raise ValueError(f"Unknown pipeline mode: {cfg.pipeline_mode}; supported are: 'sequential' and 'streaming'.")
+    if cfg.artifacts not in ("hf", "local"):
+        raise ValueError(f"Unknown artifacts mode: {cfg.artifacts}; supported are: 'hf' and 'local'.")
+    if streaming or local_artifacts:
+        base_config["evaluation"]["input"].update(
+            {"use_scripts": True, "mode": "local", "local": scripts_file, "follow": streaming}
+        )
+    if local_artifacts:
+        # nothing is uploaded by the stages themselves, see `upload_artifacts`
+        base_config["inference"]["hf"]["upload"] = False
+        base_config["evaluation"]["output"]["mode"] = "local"
+
+    # Proxies are stopped even if a stage fails or the pipeline is interrupted, unless they are kept running
+    try:
+        # Optionally route package downloads of all containers through local caching proxies
+        if cfg.package_proxy.enabled:
+            console.print(Panel("📦 Starting package proxies...", style="cyan", box=ROUNDED))
+            proxy = start_package_proxy(
+                config_dir=os.path.join(cfg.data_path, "package_proxy"),
+                name_prefix=cfg.package_proxy.name_prefix,
+                pypi_image=cfg.package_proxy.pypi_image,
+                maven_image=cfg.package_proxy.maven_image,
+                pypi_cache_size_gb=cfg.package_proxy.pypi_cache_size_gb,
+                maven_cache_size_gb=cfg.package_proxy.maven_cache_size_gb,
+                index_ttl=cfg.package_proxy.index_ttl,
+            )
+            for step in ("inference", "evaluation"):
+                docker_config = base_config[step]["docker"]
+                # explicitly configured variables take precedence over the proxy
+                docker_config["env_vars"] = {**proxy.get_env_vars(), **(docker_config.get("env_vars") or {})}
+            if base_config["inference"]["docker"]["command"] is None:
+                base_config["inference"]["docker"]["command"] = (
+                    f"{proxy.get_setup_command()}; while true; do sleep 1000; done"
+                )
+
+        # Create separate config files
+        create_config_files(cfg, base_config, file_name)
 
-    with Progress(
-        SpinnerColumn(),
-        TextColumn("[progress.description]{task.description}"),
-        BarColumn(complete_style="green", finished_style="bright_green"),
-        TimeElapsedColumn(),
-        console=console,
-    ) as progress:
         # Calculate relative paths for each script
         inference_config_path = get_relative_config_path(cfg.tmp_dir, "inference/run_inference.py")
         eval_config_path = get_relative_config_path(cfg.tmp_dir, "evaluation/main.py")
 
-        # Step 1: Run Inference
-        if not cfg.skip_inference:
-            if cfg.use_wandb:
-                wandb_run = wandb.init(
-                    project=cfg.wandb_project,
-                    job_type="inference",
-                    name=f"{cfg.tag} inference",
-                    config=base_config["inference"],
+        inference_command = f"poetry -C inference run python inference/run_inference.py --config-path {inference_config_path} --config-name {file_name}"
+        processing_command = f"poetry -C env_setup_utils run python env_setup_utils/env_setup_utils/process_trajectories_to_scripts.py --input-trajectories-dir {cfg.run_name}"
+        evaluation_command = f"poetry -C evaluation run python evaluation/main.py --config-path {eval_config_path} --config-name {file_name}_eval"
+        if streaming or local_artifacts:
+            processing_command = f"poetry -C env_setup_utils run python env_setup_utils/env_setup_utils/process_trajectories_to_scripts.py --local-trajectories-dir {trajectories_dir} --output-file {scripts_file}"
+            if streaming:
+                processing_command += f" --follow --poll-interval {cfg.scripts_processing.poll_interval}"
+            if not local_artifacts:
+                processing_command += f" --input-trajectories-dir {cfg.run_name}"
+        # With local artifacts, visualizations are generated once everything is uploaded at the end
+        report_after_each_step = not streaming and not local_artifacts
+
+        output_config = ConsoleOutputConfig(**OmegaConf.to_container(cfg.console_output, resolve=True))
+
+        with Progress(
+            SpinnerColumn(),
+            TextColumn("[progress.description]{task.description}"),
+            BarColumn(complete_style="green", finished_style="bright_green"),
+            TimeElapsedColumn(),
+            console=console,
+        ) as progress:
+            if streaming:
+                console.print(create_step_header("Inference → Processing → Evaluation (streaming)", 1, "magenta"))
+                run_streaming_stages(
+                    [
+                        StreamingStage(
+                            name="inference",
+                            command=inference_command,
+                            description="Running inference...",
+                            style="blue",
+                            output_path=trajectories_dir,
+                            skip=cfg.skip_inference,
+                        ),
+                        StreamingStage(
+                            name="processing",
+                            command=processing_command,
+                            description="Processing trajectories...",
+                            style="green",
+                            output_path=scripts_file,
+                            skip=cfg.skip_processing,
+                        ),
+                        StreamingStage(
+                            name="evaluation",
+                            command=evaluation_command,
+                            description="Running evaluation...",
+                            style="yellow",
+                            skip=cfg.skip_evaluation,
+                        ),
+                    ],
+                    progress,
+                    data_path=cfg.data_path,
+                    output_config=output_config,
                 )
-            console.print(create_step_header("Inference", 1, "blue"))
-            run_command_with_progress(
-                f"poetry -C inference run python inference/run_inference.py --config-path {inference_config_path} --config-name {file_name}",
-                "Running inference...",
-                progress,
-                style="blue",
-                data_path=cfg.data_path
-            )
-
-            console.print(Panel("🔍 Generating trajectories visualization...", style="blue", box=ROUNDED))
-            traj_html = generate_trajectories_html_from_hf(
-                traj_dir=f"{cfg.run_name}/trajectories",
-                repo_id=base_config["inference"]["hf"]["repo_id"],
-                no_cache=True,
-            )
-            if cfg.use_wandb:
-                wandb.log({"trajectories_viewer": wandb.Html(traj_html)})
-                wandb_run.finish()
-
-            # Track artifact
-            artifacts.append(("Inference", base_config["inference"]["hf"]["repo_id"], f"{cfg.run_name}/trajectories"))
-            console.print(Rule(style="bright_black"))
-
-        # Step 2: Process Trajectories
-        if not cfg.skip_processing:
-            if cfg.use_wandb:
-                wandb_run = wandb.init(
-                    project=cfg.wandb_project,
-                    job_type="scripts",
-                    name=f"{cfg.tag} scripts",
-                )
-            console.print(create_step_header("Processing", 2, "green"))
-            run_command_with_progress(
-                f"poetry -C env_setup_utils run python env_setup_utils/env_setup_utils/process_trajectories_to_scripts.py --input-trajectories-dir {cfg.run_name}",
-                "Processing trajectories...",
-                progress,
-                style="green",
-                data_path=cfg.data_path
-            )
-            console.print(Panel("📝 Generating scripts visualization...", style="green", box=ROUNDED))
-            scripts_html = generate_scripts_html_from_hf(
-                scripts_file=f"{cfg.run_name}/scripts.jsonl",
-                repo_id=base_config["inference"]["hf"]["repo_id"],
-                no_cache=True,
-            )
-            if cfg.use_wandb:
-                wandb.log({"scripts_viewer": wandb.Html(scripts_html)})
-                wandb_run.finish()
-
-            # Track artifact
-            artifacts.append(("Processing", base_config["inference"]["hf"]["repo_id"], f"{cfg.run_name}/scripts.jsonl"))
-            console.print(Rule(style="bright_black"))
-
-        # Step 3: Evaluation
-        if not cfg.skip_evaluation:
-            if cfg.use_wandb:
-                wandb_run = wandb.init(
-                    project=str(cfg.wandb_project),
-                    job_type="evaluation",
-                    name=f"{cfg.tag} eval",
-                    config=base_config["evaluation"],
+                console.print(Rule(style="bright_black"))
+            else:
+                # Step 1: Run Inference
+                if not cfg.skip_inference:
+                    console.print(create_step_header("Inference", 1, "blue"))
+                    run_command_with_progress(
+                        inference_command,
+                        "Running inference...",
+                        progress,
+                        style="blue",
+                        data_path=cfg.data_path,
+                        output_config=output_config,
+                        log_name="inference",
+                    )
+                    if report_after_each_step:
+                        report_inference(cfg, base_config, artifacts, console)
+
+                # Step 2: Process Trajectories
+                if not cfg.skip_processing:
+                    console.print(create_step_header("Processing", 2, "green"))
+                    run_command_with_progress(
+                        processing_command,
+                        "Processing trajectories...",
+                        progress,
+                        style="green",
+                        data_path=cfg.data_path,
+                        output_config=output_config,
+                        log_name="processing",
+                    )
+                    if report_after_each_step:
+                        report_processing(cfg, base_config, artifacts, console)
+
+                # Step 3: Evaluation
+                if not cfg.skip_evaluation:
+                    console.print(create_step_header("Evaluation", 3, "yellow"))
+                    run_command_with_progress(
+                        evaluation_command,
+                        "Running evaluation...",
+                        progress,
+                        style="yellow",
+                        data_path=cfg.data_path,
+                        output_config=output_config,
+                        log_name="evaluation",
+                    )
+                    if report_after_each_step:
+                        report_evaluation(cfg, base_config, artifacts, console)
+
+            if local_artifacts:
+                local_paths = {
+                    "Inference": (cfg.skip_inference, trajectories_dir),
+                    "Processing": (cfg.skip_processing, scripts_file),
+                    "Evaluation": (cfg.skip_evaluation, results_file),
+                }
+                if cfg.upload_artifacts:
+                    console.print(Panel("☁️ Uploading artifacts to HuggingFace...", style="cyan", box=ROUNDED))
+                    upload_artifacts(
+                        base_config,
+                        {stage: path for stage, (skip, path) in local_paths.items() if not skip},
+                        config_file=str(Path(cfg.tmp_dir) / f"{file_name}.yaml"),
+                    )
+                else:
+                    artifacts.extend((stage, "local", path) for stage, (skip, path) in local_paths.items() if not skip)
+
+            if not report_after_each_step and (not local_artifacts or cfg.upload_artifacts):
+                if not cfg.skip_inference:
+                    report_inference(cfg, base_config, artifacts, console)
+                if not cfg.skip_processing:
+                    report_processing(cfg, base_config, artifacts, console)
+                if not cfg.skip_evaluation:
+                    report_evaluation(cfg, base_config, artifacts, console)
+
+            if cfg.run_report.enabled and os.path.isdir(trajectories_dir):
+                progress_files = [
+                    os.path.join(cfg.console_output.log_dir, f"{stage}.progress.jsonl")
+                    for stage in ("inference", "processing", "evaluation")
+                ]
+                report_path = generate_run_report(
+                    trajectories_dir,
+                    cfg.run_report.output_dir,
+                    evaluation_results=results_file if os.path.exists(results_file) else None,
+                    progress_files=[path for path in progress_files if os.path.exists(path)],
+                    bucket_seconds=cfg.run_report.bucket_minutes * 60,
+                    title=cfg.run_name,
                 )
-            console.print(create_step_header("Evaluation", 3, "yellow"))
-            run_command_with_progress(
-                f"poetry -C evaluation run python evaluation/main.py --config-path {eval_config_path} --config-name {file_name}_eval",
-                "Running evaluation...",
-                progress,
-                style="yellow",
-                data_path=cfg.data_path,
-                count_pattern=r"Found\s\d+\sissues"  # Add pattern for counting repositories
-            )
-
-            console.print(Panel("📊 Generating evaluation visualization...", style="yellow", box=ROUNDED))
-            eval_html = generate_logs_html_from_hf(
-                logs_file=f"{cfg.run_name}/results.jsonl",
-                repo_id=base_config["evaluation"]["output"]["hf"]["repo_id"],
-                no_cache=True,
-            )
-            if cfg.use_wandb:
-                wandb.log({"evaluation_viewer": wandb.Html(eval_html)})
-                wandb_run.finish()
-
-            # Track artifact
-            artifacts.append(
-                ("Evaluation", base_config["evaluation"]["output"]["hf"]["repo_id"], f"{cfg.run_name}/results.jsonl")
-            )
-            console.print(Rule(style="bright_black"))
+                console.print(Panel(f"📈 Run report has been saved to {report_path}", style="cyan", box=ROUNDED))
+    finally:
+        if cfg.package_proxy.enabled and not cfg.package_proxy.keep_running:
+            stop_package_proxy(cfg.package_proxy.name_prefix)
 
     # Print artifacts summary table
     if artifacts:
         console.print("\n")
-        console.print(create_summary_table(artifacts))
+        console.print(create_summary_table(artifacts, uploaded=not local_artifacts or cfg.upload_artifacts))
         console.print("\n")
 
     # Print completion message
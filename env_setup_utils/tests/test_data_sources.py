@@ -0,0 +1,158 @@
+import csv
+import gzip
+
+import jsonlines
+import pytest
+
+from env_setup_utils.data_sources import BaseDataSource, HFDataSource, LocalFileDataSource
+
+
+class ListDataSource(BaseDataSource):
+    def __init__(self, rows):
+        self.rows = rows
+        self.num_read = 0
+
+    def __iter__(self):
+        for row in self.rows:
+            self.num_read += 1
+            yield row
+
+
+def _rows(n: int):
+    return [{"repository": f"owner/name{i}", "revision": "sha"} for i in range(n)]
+
+
+@pytest.mark.parametrize("streaming", [False, True])
+def test_hf_data_source(tmp_path, streaming):
+    pytest.importorskip("datasets")
+    dataset_dir = tmp_path / "dataset"
+    dataset_dir.mkdir()
+    rows = [{"repository": f"owner/name{i}", "revision": "sha", "readme": "..."} for i in range(5)]
+    with jsonlines.open(dataset_dir / "data.jsonl", "w") as writer:
+        writer.write_all(rows)
+
+    data_source = HFDataSource(
+        str(dataset_dir),
+        configs=["default"],
+        split="train",
+        cache_dir=str(tmp_path / "cache"),
+        streaming=streaming,
+        columns=["repository", "revision"],
+        batch_size=2,
+    )
+    assert list(data_source) == [{"repository": row["repository"], "revision": row["revision"]} for row in rows]
+
+
+def test_filter_head_dedupe():
+    source = ListDataSource(_rows(3) + _rows(10))
+
+    assert [row["repository"] for row in source.dedupe().filter(lambda row: row["repository"] != "owner/name1")] == [
+        "owner/name0",
+        "owner/name2",
+    ] + [f"owner/name{i}" for i in range(3, 10)]
+
+    source.num_read = 0
+    assert len(list(source.head(2))) == 2
+    # the underlying data source is read lazily
+    assert source.num_read == 2
+
+
+def test_shard_sample():
+    source = ListDataSource(_rows(1000))
+
+    shards = [list(source.shard(num_shards=4, index=i)) for i in range(4)]
+    assert sorted(row["repository"] for shard in shards for row in shard) == sorted(
+        row["repository"] for row in _rows(1000)
+    )
+    assert all(150 < len(shard) < 350 for shard in shards)
+    # assignment does not depend on the order of rows
+    assert list(ListDataSource(_rows(1000)[::-1]).shard(num_shards=4, index=0)) == shards[0][::-1]
+
+    sample = list(source.sample(0.1, seed=1))
+    assert 50 < len(sample) < 150
+    assert sample == list(source.sample(0.1, seed=1))
+    assert sample != list(source.sample(0.1, seed=2))
+
+    with pytest.raises(ValueError):
+        source.shard(num_shards=4, index=4)
+
+
+def test_exclude(tmp_path):
+    source = ListDataSource(_rows(5))
+    manifest = tmp_path / "scripts.jsonl"
+    # a missing manifest excludes nothing
+    assert len(list(source.exclude(str(manifest)))) == 5
+
+    with jsonlines.open(manifest, "w") as writer:
+        writer.write_all([{"repository": "owner/name1", "revision": "sha", "script": ""}])
+    excluded = source.exclude(str(manifest)).exclude([{"repository": "owner/name3", "revision": "sha"}])
+    assert [row["repository"] for row in excluded] == ["owner/name0", "owner/name2", "owner/name4"]
+
+
+def _write_local_file(path, rows) -> None:
+    name = str(path)
+    if name.endswith((".parquet", ".arrow")):
+        pa = pytest.importorskip("pyarrow")
+        pq = pytest.importorskip("pyarrow.parquet")
+        table = pa.Table.from_pylist(rows)
+        if name.endswith(".parquet"):
+            pq.write_table(table, name, row_group_size=2)
+        else:
+            with pa.ipc.new_file(name, table.schema) as writer:
+                writer.write_table(table, max_chunksize=2)
+        return
+
+    plain_path = name.rsplit(".", 1)[0] if name.endswith((".gz", ".zst")) else name
+    if plain_path.endswith(".jsonl"):
+        with jsonlines.open(plain_path, "w") as writer:
+            writer.write_all(rows)
+    else:
+        with open(plain_path, "w", newline="") as f:
+            writer = csv.DictWriter(f, fieldnames=list(rows[0]))
+            writer.writeheader()
+            writer.writerows(rows)
+    if name.endswith(".gz"):
+        with open(plain_path, "rb") as src, gzip.open(name, "wb") as dst:
+            dst.write(src.read())
+    elif name.endswith(".zst"):
+        zstandard = pytest.importorskip("zstandard")
+        with open(plain_path, "rb") as src, open(name, "wb") as dst:
+            zstandard.ZstdCompressor().copy_stream(src, dst)
+
+
+@pytest.mark.parametrize(
+    "file_name",
+    ["data.jsonl", "data.jsonl.gz", "data.jsonl.zst", "data.csv", "data.csv.gz", "data.parquet", "data.arrow"],
+)
+def test_local_file_data_source(tmp_path, file_name):
+    rows = [{"repository": f"owner/name{i}", "revision": "sha", "script": "pip install ."} for i in range(5)]
+    _write_local_file(tmp_path / file_name, rows)
+
+    assert list(LocalFileDataSource(str(tmp_path / file_name))) == rows
+    assert list(LocalFileDataSource(str(tmp_path / file_name), columns=["repository"], batch_size=2)) == [
+        {"repository": row["repository"]} for row in rows
+    ]
+
+
+@pytest.mark.parametrize("file_name", ["data.jsonl", "data.csv.gz", "data.parquet", "data.arrow"])
+def test_local_file_data_source_missing_column(tmp_path, file_name):
+    _write_local_file(tmp_path / file_name, _rows(3))
+
+    with pytest.raises(KeyError, match="expected to have column 'script'"):
+        list(LocalFileDataSource(str(tmp_path / file_name), columns=["repository", "script"]))
+
+
+def test_local_file_data_source_unsupported_format():
+    with pytest.raises(ValueError):
+        LocalFileDataSource("data.txt")
+
+
+def test_select_map():
+    source = ListDataSource([{"repo_name": "owner/name", "commit_sha": "sha", "stars": 1}])
+
+    selected = source.select({"repository": "repo_name", "revision": "commit_sha"})
+    assert list(selected.map(lambda row: {**row, "key": f"{row['repository']}@{row['revision']}"})) == [
+        {"repository": "owner/name", "revision": "sha", "key": "owner/name@sha"}
+    ]
+    with pytest.raises(KeyError, match="script"):
+        list(source.select({"script": "script"}))
@@ -0,0 +1,43 @@
+import os
+import subprocess
+import xml.etree.ElementTree as ET
+
+from env_setup_utils.package_proxy import MAVEN_PROXY_NGINX_CONFIG, PackageProxy
+
+
+def _proxy() -> PackageProxy:
+    return PackageProxy(pypi_url="http://172.17.0.2:5000/index/", maven_url="http://172.17.0.3:8080/maven2/")
+
+
+def test_env_vars():
+    env_vars = _proxy().get_env_vars()
+
+    assert env_vars["PIP_INDEX_URL"] == "http://172.17.0.2:5000/index/"
+    assert env_vars["PIP_TRUSTED_HOST"] == "172.17.0.2"
+    assert env_vars["UV_INDEX_URL"] == "http://172.17.0.2:5000/index/"
+    assert env_vars["ENVSETUP_MAVEN_MIRROR"] == "http://172.17.0.3:8080/maven2/"
+
+
+def test_setup_command(tmp_path):
+    command = _proxy().get_setup_command()
+    # the inference container command is formatted with the repository name and revision
+    assert command.format(repository="owner/name", repository_dir="name", revision="sha") == command
+
+    env = {**os.environ, "HOME": str(tmp_path)}
+    subprocess.run(["bash", "-c", command], env=env, check=True)
+    mirror = ET.parse(tmp_path / ".m2" / "settings.xml").getroot().find("mirrors/mirror")
+    assert mirror.findtext("mirrorOf") == "central"
+    assert mirror.findtext("url") == "http://172.17.0.3:8080/maven2/"
+
+    # existing settings are left as is
+    (tmp_path / ".m2" / "settings.xml").write_text("<settings/>")
+    subprocess.run(["bash", "-c", command], env=env, check=True)
+    assert (tmp_path / ".m2" / "settings.xml").read_text() == "<settings/>"
+
+
+def test_nginx_config():
+    config = MAVEN_PROXY_NGINX_CONFIG.format(port=8080, max_size_gb=10)
+
+    assert "listen 8080;" in config
+    assert "max_size=10g" in config
+    assert "location /maven2/ {" in config
@@ -0,0 +1,91 @@
+import json
+import threading
+import time
+from typing import Any, Dict, List
+
+import jsonlines
+import pytest
+
+from env_setup_utils.process_trajectories_to_scripts import process_local_trajectories, read_last_message
+
+
+def _write_trajectory(path, finished: bool) -> None:
+    messages: List[Dict[str, Any]] = [{"node": "agent", "messages": []}]
+    if finished:
+        messages.append({"node": "commands_history", "commands": [{"command": "pip install .", "exit_code": 0}]})
+    with jsonlines.open(path, "w") as writer:
+        writer.write_all(messages)
+
+
+def _read_scripts(path):
+    with jsonlines.open(path) as reader:
+        return [line for line in reader]
+
+
+def test_process_local_trajectories(tmp_path):
+    trajectories_dir = tmp_path / "trajectories"
+    trajectories_dir.mkdir()
+    _write_trajectory(trajectories_dir / "owner__name@sha.jsonl", finished=True)
+    output_file = tmp_path / "scripts.jsonl"
+
+    assert process_local_trajectories(str(trajectories_dir), str(output_file)) == 1
+    assert _read_scripts(output_file) == [{"repository": "owner/name", "revision": "sha", "script": "pip install ."}]
+
+
+@pytest.mark.parametrize("num_workers", [1, 2])
+def test_process_local_trajectories_workers(tmp_path, num_workers):
+    trajectories_dir = tmp_path / "trajectories"
+    trajectories_dir.mkdir()
+    for i in range(5):
+        _write_trajectory(trajectories_dir / f"owner__name{i}@sha.jsonl", finished=True)
+    output_file = tmp_path / "scripts.jsonl"
+
+    assert process_local_trajectories(str(trajectories_dir), str(output_file), num_workers=num_workers) == 5
+    assert [script["repository"] for script in _read_scripts(output_file)] == [f"owner/name{i}" for i in range(5)]
+
+
+def test_read_last_message(tmp_path):
+    path = tmp_path / "owner__name@sha.jsonl"
+    path.write_text("")
+    assert read_last_message(str(path)) is None
+
+    commands = [{"command": f"echo {i}", "exit_code": 0} for i in range(100)]
+    _write_trajectory(path, finished=True)
+    with jsonlines.open(path, "a") as writer:
+        writer.write({"node": "commands_history", "commands": commands})
+    # the last line spans several blocks
+    assert read_last_message(str(path), block_size=16) == {"node": "commands_history", "commands": commands}
+
+    with open(path, "a") as f:
+        f.write('{"node": "ag')
+    with pytest.raises(json.JSONDecodeError):
+        read_last_message(str(path), block_size=16)
+
+
+def test_process_local_trajectories_follow(tmp_path):
+    trajectories_dir = tmp_path / "trajectories"
+    trajectories_dir.mkdir()
+    _write_trajectory(trajectories_dir / "owner__finished@sha.jsonl", finished=True)
+    _write_trajectory(trajectories_dir / "owner__running@sha.jsonl", finished=False)
+    # a message that is being written at the moment
+    with open(trajectories_dir / "owner__writing@sha.jsonl", "w") as f:
+        f.write(json.dumps({"node": "agent"})[:5])
+    output_file = tmp_path / "scripts.jsonl"
+
+    thread = threading.Thread(
+        target=process_local_trajectories,
+        args=(str(trajectories_dir), str(output_file)),
+        kwargs={"follow": True, "poll_interval": 0.01},
+    )
+    thread.start()
+    time.sleep(0.5)
+    # finished trajectories are processed right away, the rest wait for inference to finish
+    assert [script["repository"] for script in _read_scripts(output_file)] == ["owner/finished"]
+    assert thread.is_alive()
+
+    (tmp_path / "trajectories.done").touch()
+    thread.join(timeout=5)
+    assert not thread.is_alive()
+    scripts = _read_scripts(output_file)
+    assert [script["repository"] for script in scripts] == ["owner/finished", "owner/running"]
+    assert scripts[1]["script"] == ""
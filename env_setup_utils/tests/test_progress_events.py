@@ -0,0 +1,46 @@
+import pytest
+
+from env_setup_utils.progress_events import ProgressEventWriter, ProgressTracker, read_progress_events
+
+
+def test_progress_events(tmp_path):
+    path = str(tmp_path / "progress.jsonl")
+    writer = ProgressEventWriter("evaluation", path)
+    writer.total(3)
+    for i in range(3):
+        writer.started(f"owner/name{i}", "sha")
+    writer.finished("owner/name0", "sha", duration=10.0, exit_code=0)
+    writer.failed("owner/name1", "sha", duration=30.0, error="RuntimeError()")
+
+    events, position = read_progress_events(path)
+    assert [event["event"] for event in events] == ["total"] + ["started"] * 3 + ["finished", "failed"]
+    assert events[4]["stage"] == "evaluation" and events[4]["exit_code"] == 0
+
+    tracker = ProgressTracker()
+    assert tracker.elapsed == 0.0
+    for event in events:
+        tracker.update(event)
+    assert (tracker.expected_total, tracker.done, tracker.failed, tracker.running) == (3, 2, 1, 1)
+    assert tracker.percentile(50) == 10.0
+    assert tracker.percentile(99) == 30.0
+    # two datapoints done in 10 seconds, one left
+    assert tracker.throughput(now=tracker.start_time + 10) == pytest.approx(0.2)
+    assert tracker.eta(now=tracker.start_time + 10) == pytest.approx(5)
+    assert tracker.elapsed == tracker.last_time - tracker.start_time
+
+    # an event being written is read once it is complete
+    writer.close()
+    with open(path, "a") as f:
+        f.write('{"time": 0, "event": "fin')
+    assert read_progress_events(path, position) == ([], position)
+    with open(path, "a") as f:
+        f.write('ished"}\n')
+    events, _ = read_progress_events(path, position)
+    assert len(events) == 1 and events[0]["event"] == "finished"
+
+
+def test_progress_events_without_path(tmp_path):
+    writer = ProgressEventWriter("inference")
+    writer.total(1)
+    writer.close()
+    assert read_progress_events(str(tmp_path / "missing.jsonl")) == ([], 0)
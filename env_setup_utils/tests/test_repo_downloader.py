@@ -0,0 +1,156 @@
+import gzip
+import io
+import json
+import os
+import tarfile
+
+import git
+import pytest
+
+from env_setup_utils.repo_downloader import RepoDownloader
+
+
+def _write_archive(path: str, archive_type: str) -> None:
+    buffer = io.BytesIO()
+    with tarfile.open(fileobj=buffer, mode="w") as tar:
+        for name, contents in [("owner__name.tar.gz/README.md", b"# readme"), ("owner__name.tar.gz/src/a.py", b"")]:
+            info = tarfile.TarInfo(name)
+            info.size = len(contents)
+            tar.addfile(info, io.BytesIO(contents))
+
+    if archive_type == "tar.gz":
+        with open(path, "wb") as f:
+            f.write(gzip.compress(buffer.getvalue()))
+    else:
+        zstandard = pytest.importorskip("zstandard")
+        with open(path, "wb") as f:
+            f.write(zstandard.ZstdCompressor().compress(buffer.getvalue()))
+
+
+@pytest.mark.parametrize("archive_type", ["tar.gz", "tar.zst"])
+def test_extract_archive_strips_top_level_dir(tmp_path, archive_type: str):
+    archive_path = str(tmp_path / f"owner__name.{archive_type}")
+    _write_archive(archive_path, archive_type)
+    target_dir = str(tmp_path / "owner__name@sha")
+
+    RepoDownloader._extract_archive(archive_path, archive_type, target_dir)
+
+    with open(os.path.join(target_dir, "README.md"), "rb") as f:
+        assert f.read() == b"# readme"
+    assert os.path.isfile(os.path.join(target_dir, "src", "a.py"))
+
+
+def _write_repo_archive(archives_dir: str, repo_name: str) -> str:
+    repo_dir = os.path.join(archives_dir, "src", repo_name.replace("/", "__"))
+    repo = git.Repo.init(repo_dir)
+    with open(os.path.join(repo_dir, "README.md"), "w") as f:
+        f.write("# readme")
+    repo.index.add(["README.md"])
+    commit = repo.index.commit("init", author=git.Actor("a", "a@a"), committer=git.Actor("a", "a@a"))
+
+    archive_path = os.path.join(archives_dir, f"{repo_name.replace('/', '__')}.tar.gz")
+    with tarfile.open(archive_path, "w:gz") as tar:
+        tar.add(repo_dir, arcname=os.path.basename(archive_path))
+    return commit.hexsha
+
+
+def test_download_from_local_archives(tmp_path):
+    commit_sha = _write_repo_archive(str(tmp_path / "archives"), "owner/name")
+    repo_downloader = RepoDownloader(
+        output_dir=str(tmp_path / "repos"),
+        hf_name="unused",
+        language="python",
+        sources=["local"],
+        local_archives_dir=str(tmp_path / "archives"),
+    )
+
+    assert repo_downloader.download("owner/name", commit_sha)
+    assert os.path.isfile(os.path.join(repo_downloader.get_repo_dir_path("owner/name", commit_sha), "README.md"))
+    # local archives are kept
+    assert os.path.exists(tmp_path / "archives" / "owner__name.tar.gz")
+
+
+def test_download_skips_known_failures(tmp_path):
+    failures_cache_path = str(tmp_path / "failures.jsonl")
+    kwargs = dict(
+        output_dir=str(tmp_path / "repos"),
+        hf_name="unused",
+        language="python",
+        sources=["local"],
+        local_archives_dir=str(tmp_path / "archives"),
+        failures_cache_path=failures_cache_path,
+    )
+    assert not RepoDownloader(**kwargs).download("owner/missing", "sha")
+
+    with open(failures_cache_path) as f:
+        failure = json.loads(f.readline())
+    assert failure.pop("timestamp") > 0
+    source_key = f"local:{tmp_path / 'archives'}"
+    assert failure == {"source": source_key, "repository": "owner/missing", "revision": "sha"}
+
+    repo_downloader = RepoDownloader(**kwargs)
+    assert (source_key, "owner/missing", "sha") in repo_downloader._known_failures
+    commit_sha = _write_repo_archive(str(tmp_path / "archives"), "owner/missing")
+    assert not repo_downloader.download("owner/missing", "sha")
+    # failures are not shared with a different archives directory
+    assert not RepoDownloader(**{**kwargs, "local_archives_dir": str(tmp_path / "other")}).download(
+        "owner/missing", "sha"
+    )
+    # and are retried once expired
+    assert RepoDownloader(**kwargs, failures_ttl=0).download("owner/missing", commit_sha)
+
+
+def test_download_does_not_remember_transient_failures(tmp_path):
+    failures_cache_path = str(tmp_path / "failures.jsonl")
+    os.makedirs(tmp_path / "archives")
+    with open(tmp_path / "archives" / "owner__name.tar.gz", "wb") as f:
+        f.write(b"corrupted")
+    repo_downloader = RepoDownloader(
+        output_dir=str(tmp_path / "repos"),
+        hf_name="unused",
+        language="python",
+        sources=["local"],
+        local_archives_dir=str(tmp_path / "archives"),
+        failures_cache_path=failures_cache_path,
+    )
+
+    assert not repo_downloader.download("owner/name", "sha")
+    assert not repo_downloader._known_failures
+    assert not os.path.exists(failures_cache_path)
+
+
+def test_copy_on_write_runs_share_base_checkout(tmp_path, caplog):
+    commit_sha = _write_repo_archive(str(tmp_path / "archives"), "owner/name")
+    repo_downloader = RepoDownloader(
+        output_dir=str(tmp_path / "repos"),
+        hf_name="unused",
+        language="python",
+        sources=["local"],
+        local_archives_dir=str(tmp_path / "archives"),
+        copy_on_write=True,
+    )
+
+    assert repo_downloader.download("owner/name", commit_sha, run_id="first")
+    os.remove(tmp_path / "archives" / "owner__name.tar.gz")
+    assert repo_downloader.download("owner/name", commit_sha, run_id="second")
+
+    first_dir = repo_downloader.get_repo_dir_path("owner/name", commit_sha, run_id="first")
+    second_dir = repo_downloader.get_repo_dir_path("owner/name", commit_sha, run_id="second")
+    assert os.path.basename(first_dir) == os.path.basename(second_dir) == f"owner__name@{commit_sha}"
+    with open(os.path.join(first_dir, "README.md"), "w") as f:
+        f.write("changed")
+    with open(os.path.join(second_dir, "README.md")) as f:
+        assert f.read() == "# readme"
+    # a filesystem without reflinks is reported once, not for every copy
+    assert sum("Reflinks are not available" in record.message for record in caplog.records) <= 1
+
+    base_dir = repo_downloader.get_base_repo_dir_path("owner/name", commit_sha)
+    repo_downloader.clear_repo("owner/name", commit_sha, run_id="first")
+    assert not os.path.exists(first_dir)
+    # the base checkout is kept while the second run uses it
+    with open(os.path.join(base_dir, "README.md")) as f:
+        assert f.read() == "# readme"
+
+    repo_downloader.clear_repo("owner/name", commit_sha, run_id="second")
+    assert not os.path.exists(second_dir)
+    assert not os.path.exists(base_dir)
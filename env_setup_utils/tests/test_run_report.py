@@ -0,0 +1,93 @@
+import csv
+from datetime import datetime
+
+import jsonlines
+import pytest
+
+from env_setup_utils.progress_events import ProgressEventWriter
+from env_setup_utils.run_report import build_report_data, generate_run_report, histogram, svg_bar_chart
+
+
+def _tool_call(name: str) -> dict:
+    return {"message_content": {"content": "", "tool_calls": [{"name": name, "args": {}}]}}
+
+
+def _write_trajectory(path, start_minute: int) -> None:
+    timestamp = "2025-01-01T10:{:02d}:{:02d}"
+    with jsonlines.open(path, "w") as writer:
+        writer.write_all(
+            [
+                {"node": "agent", "timestamp": timestamp.format(start_minute, 0), "messages": [_tool_call("execute")]},
+                {"node": "tools", "timestamp": timestamp.format(start_minute, 30), "messages": []},
+                {"node": "agent", "timestamp": timestamp.format(start_minute, 40), "messages": [_tool_call("submit")]},
+                {"node": "commands_history", "timestamp": timestamp.format(start_minute, 41), "commands": []},
+            ]
+        )
+
+
+def _read_csv(path):
+    with open(path) as f:
+        return list(csv.DictReader(f))
+
+
+def test_run_report(tmp_path):
+    trajectories_dir = tmp_path / "trajectories"
+    trajectories_dir.mkdir()
+    _write_trajectory(trajectories_dir / "owner__name0@sha.jsonl", start_minute=0)
+    _write_trajectory(trajectories_dir / "owner__name1@sha.jsonl", start_minute=15)
+    # a trajectory that is being written is skipped
+    (trajectories_dir / "owner__running@sha.jsonl").write_text('{"node": "ag')
+
+    results_path = tmp_path / "results.jsonl"
+    with jsonlines.open(results_path, "w") as writer:
+        writer.write({"repo_name": "owner/name0", "commit_sha": "sha", "exit_code": 0, "execution_time": 120.0})
+    progress_path = str(tmp_path / "inference.progress.jsonl")
+    progress_events = ProgressEventWriter("inference", progress_path)
+    progress_events.finished("owner/name1", "sha", duration=45.0, container_restarts=2)
+    progress_events.close()
+    with jsonlines.open(progress_path, "a") as writer:
+        agent_started_at = datetime.fromisoformat("2025-01-01T09:59:50").timestamp()
+        writer.write(
+            {
+                "time": agent_started_at,
+                "stage": "inference",
+                "event": "agent_started",
+                "repository": "owner/name0",
+                "revision": "sha",
+            }
+        )
+
+    data = build_report_data(str(trajectories_dir), str(results_path), [progress_path], bucket_seconds=600)
+    repositories = {row["repository"]: row for row in data["repositories"]}
+    assert set(repositories) == {"owner/name0", "owner/name1"}
+    # the first LLM call is measured from the start of the agent
+    assert repositories["owner/name0"]["llm_time"] == pytest.approx(20)
+    assert repositories["owner/name1"]["llm_time"] == pytest.approx(10)
+    assert repositories["owner/name0"]["bash_time"] == pytest.approx(30)
+    assert repositories["owner/name0"]["tool_calls"] == 2
+    assert repositories["owner/name0"]["exit_code"] == 0
+    assert repositories["owner/name1"]["container_restarts"] == 2
+    assert [node["node"] for node in data["nodes"]] == ["agent", "tools", "agent", "tools", "agent"]
+    assert data["tool_calls"] == [{"tool": "execute", "count": 2}, {"tool": "submit", "count": 2}]
+    # trajectories finished at 10:00:41 and 10:15:41
+    assert [row["completed"] for row in data["throughput"]] == [1, 1]
+
+    report_path = generate_run_report(
+        str(trajectories_dir), str(tmp_path / "report"), str(results_path), [progress_path], title="test"
+    )
+    report = open(report_path).read()
+    assert "Run report: test" in report and "<svg" in report and "owner/name0" in report
+    assert len(_read_csv(tmp_path / "report" / "repositories.csv")) == 2
+    assert len(_read_csv(tmp_path / "report" / "nodes.csv")) == 5
+
+
+def test_histogram():
+    labels, counts = histogram([0.1, 1.0, 10.0, 100.0], num_bins=3)
+    assert counts == [1, 1, 2]
+    assert labels[0] == "0.10-1.00s"
+    assert histogram([5.0, 5.0]) == (["5.00s"], [2])
+
+
+def test_svg_bar_chart_truncates_labels_before_escaping():
+    svg = svg_bar_chart("Nodes", ["a" * 27 + "&b"], [1.0])
+    assert ">" + "a" * 27 + "&amp;</text>" in svg
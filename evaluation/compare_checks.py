@@ -0,0 +1,56 @@
+"""Benchmark the import-resolution check against pyright.
+
+Expects evaluation results (`results.jsonl` or a results store directory) obtained with `python_check: both`, where every repository
+is checked by both tools in the same environment, and reports how well the counts agree and how much time each takes.
+Run it on a sample of the evaluated repositories to validate `python_check: imports` for them.
+
+Usage: python compare_checks.py path/to/results.jsonl|path/to/results/store
+"""
+
+import argparse
+import os
+
+import pandas as pd
+
+from src.results_store import ResultsStore
+
+
+def compare_checks(results: pd.DataFrame) -> dict:
+    results = results.loc[results["import_check"].notna() & results["pyright_time"].notna()]
+    pyright_count = results["issues_count"].astype(int)
+    imports_count = results["import_check"].map(lambda x: x["issues_count"]).astype(int)
+    pyright_time = results["pyright_time"].astype(float)
+    imports_time = results["import_check"].map(lambda x: x["time"]).astype(float)
+
+    return {
+        "repositories": len(results),
+        "exact_match": (pyright_count == imports_count).mean(),
+        # evaluation success is `issues_count == 0`, so this is the agreement that matters the most
+        "success_match": ((pyright_count == 0) == (imports_count == 0)).mean(),
+        "mean_abs_diff": (pyright_count - imports_count).abs().mean(),
+        "spearman": pyright_count.rank().corr(imports_count.rank()),
+        "pyright_time_median": pyright_time.median(),
+        "import_check_time_median": imports_time.median(),
+        "pyright_time_total": pyright_time.sum(),
+        "import_check_time_total": imports_time.sum(),
+        "speedup": pyright_time.sum() / max(imports_time.sum(), 1e-9),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument(
+        "results", help="results.jsonl or results store from an evaluation run with `python_check: both`."
+    )
+    args = parser.parse_args()
+
+    if os.path.isdir(args.results):
+        results = pd.DataFrame(ResultsStore.iter_records(args.results))
+    else:
+        results = pd.read_json(args.results, orient="records", lines=True)
+    for key, value in compare_checks(results).items():
+        print(f"{key}: {value:.3f}" if isinstance(value, float) else f"{key}: {value}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,27 +1,43 @@
+import asyncio
+import fcntl
+import gzip
+import hashlib
+import io
 import shutil
 import stat
+import tarfile
+import tempfile
 import time
-from typing import Optional
+from collections import deque
+import uuid
+from typing import IO, Any, AsyncIterator, Awaitable, Callable, Dict, Iterable, Iterator, List, Optional, Set, Tuple
 
+import aiohttp
 import hydra
 import jsonlines
-import requests.exceptions
-from docker import from_env  # type: ignore[import-untyped]
-from docker.errors import DockerException, APIError, ImageNotFound, ContainerError  # type: ignore[import-untyped]
+from aiodocker import Docker
+from aiodocker.containers import DockerContainer
+from aiodocker.exceptions import DockerError
 from huggingface_hub import hf_hub_download, upload_file  # type: ignore[import-untyped]
-from omegaconf import DictConfig
+from omegaconf import DictConfig, OmegaConf
 from dotenv import load_dotenv
 import os
 from hydra.utils import to_absolute_path
-from tqdm.contrib.concurrent import process_map
-import pandas as pd
+from tqdm.asyncio import tqdm_asyncio
+from env_setup_utils.data_sources import BaseDataSource, LocalFileDataSource
+from env_setup_utils.progress_events import ProgressEventWriter
 from env_setup_utils.repo_downloader import RepoDownloader
+from src.evaluation_cache import EvaluationCache
+from src.results_store import ResultsStore
 import json
-from itertools import repeat
 import logging
 from pathlib import Path
 
 
+# Build scripts print this prefix followed by a phase name (e.g. `bootstrap`, `check`) when the phase starts
+PHASE_MARKER = "::phase::"
+
+
 class ScriptExceptionError(Exception):
     def __init__(self, message: str):
         super().__init__(message)
@@ -31,6 +47,54 @@ class ScriptExceptionError(Exception):
         return f"Error executing agent script: {self.message}"
 
 
+class ContainerCreationTimeoutError(Exception):
+    pass
+
+
+class LogCapture:
+    """Tees container output to a gzip-compressed file, keeping only a bounded head and tail of it in memory."""
+
+    def __init__(self, path: str, inline_size: int):
+        self.path = path
+        self.head_size = inline_size // 2
+        self.tail_size = inline_size - self.head_size
+        self.head: List[str] = []
+        self.head_len = 0
+        self.tail: deque[str] = deque()
+        self.tail_len = 0
+        self.total_len = 0
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.file = gzip.open(path, "wt", encoding="utf-8")
+
+    def write(self, text: str) -> None:
+        self.file.write(text)
+        self.total_len += len(text)
+
+        if self.head_len < self.head_size:
+            chunk = text[: self.head_size - self.head_len]
+            self.head.append(chunk)
+            self.head_len += len(chunk)
+            text = text[len(chunk) :]
+
+        if text and self.tail_size > 0:
+            self.tail.append(text)
+            self.tail_len += len(text)
+            while self.tail_len - len(self.tail[0]) >= self.tail_size:
+                self.tail_len -= len(self.tail.popleft())
+
+    def close(self) -> None:
+        self.file.close()
+
+    def inline(self) -> str:
+        """Head and tail of the log, with a note on how much was omitted in between."""
+        head = "".join(self.head)
+        tail = "".join(self.tail)[-self.tail_size :] if self.tail_size > 0 else ""
+        omitted = self.total_len - len(head) - len(tail)
+        if omitted <= 0:
+            return head + tail
+        return f"{head}\n... [{omitted} characters omitted, full log in {self.path}] ...\n{tail}"
+
+
 def read_script(script_name: str) -> str:
     """Read a bash script from the scripts directory."""
     script_path = Path(__file__).parent / "scripts" / script_name
@@ -38,6 +102,65 @@ def read_script(script_name: str) -> str:
         return f.read()
 
 
+CHECK_IMPORTS_CONTAINER_PATH = "/tmp/envsetup-eval/check_imports.py"
+"""Where the import checker is mounted in containers; it is kept out of the project, so that it neither overwrites
+project files nor gets analyzed by pyright."""
+
+
+def get_binds(cfg: DictConfig, repo_path: str) -> List[str]:
+    """Bind mounts of an evaluation container: the repository and, for `imports` and `both` Python checks,
+    the import checker."""
+    binds = [f"{os.path.abspath(repo_path)}:/data/project:rw"]
+    if cfg.language == "python" and cfg.get("python_check", "pyright") in ("imports", "both"):
+        check_imports_path = (Path(__file__).parent / "scripts" / "check_imports.py").resolve()
+        binds.append(f"{check_imports_path}:{CHECK_IMPORTS_CONTAINER_PATH}:ro")
+    return binds
+
+
+def get_bootstrap_script(cfg: DictConfig, bootstrap_script: Optional[str] = None) -> str:
+    """The script to evaluate: the given one or the default baseline script for the language."""
+    if bootstrap_script is not None:
+        return bootstrap_script
+    return read_script("python_baseline.sh") if cfg.language == "python" else read_script("jvm_baseline.sh")
+
+
+def get_script_hash(bootstrap_script: str) -> str:
+    return hashlib.sha256(bootstrap_script.encode("utf-8")).hexdigest()
+
+
+def get_result_name(repo_name: str, commit_sha: str, script_hash: str) -> str:
+    """Unique file name for a (repository, revision, script) evaluation."""
+    return f"{repo_name.replace('/', '__')}@{commit_sha}-{script_hash[:16]}"
+
+
+def get_evaluation_salt(cfg: DictConfig) -> str:
+    """Everything besides the image, repository, revision and bootstrap script that affects evaluation results."""
+    salt: List[Any] = [cfg.language, cfg.get("python_check", "pyright")]
+    # container environment: variables (e.g. package proxies) and shared dependency caches
+    docker_cfg: Dict[str, Any] = OmegaConf.to_container(cfg.docker, resolve=True)  # type: ignore[assignment]
+    salt.extend([docker_cfg.get("env_vars") or {}, docker_cfg.get("dependency_caches") or {}])
+    for script_name in (f"{cfg.language}_build.sh", "check_imports.py"):
+        if (Path(__file__).parent / "scripts" / script_name).exists():
+            salt.append(read_script(script_name))
+    return json.dumps(salt, sort_keys=True)
+
+
+def get_infrastructure_exit_codes(cfg: DictConfig) -> List[int]:
+    """Exit codes of infrastructure failures (timeouts, docker errors, failed downloads), which are not a property
+    of the script: they are neither cached nor considered processed on resume."""
+    return [
+        cfg.exit_codes.timeout,
+        cfg.exit_codes.docker_failure,
+        cfg.exit_codes.create_container_failure,
+        cfg.exit_codes.unknown_failure,
+        cfg.exit_codes.download_failure,
+    ]
+
+
+def is_cacheable(cfg: DictConfig, json_result: Dict[str, Any]) -> bool:
+    return json_result["exit_code"] not in get_infrastructure_exit_codes(cfg)
+
+
 def remove_bad_commands(script: str) -> str:
     lines = script.split("\n")
     res = []
@@ -54,44 +177,22 @@ def remove_bad_commands(script: str) -> str:
         res.append(line)
     return "\n".join(res)
 
-def run_opensource(
+def prepare_repository(
     repo_downloader: RepoDownloader,
     repo_name: str,
     commit_sha: str,
     cfg: DictConfig,
-    bootstrap_script: Optional[str] = None,
-):
-    json_result = {
-        "exit_code": None,
-        "execution_time": 0.0,
-        "repo_name": repo_name,
-        "commit_sha": commit_sha,
-        "container_logs": None,
-        "issues_count": 0,
-    }
-
-    logging.info(f"Processing {repo_name}@{commit_sha}")
-
-    if bootstrap_script is None:
-        bootstrap_script = (
-            read_script("python_baseline.sh")
-            if cfg.language == "python"
-            else read_script("jvm_baseline.sh")
-        )
-        logging.info(f"Using default bootstrap script for {cfg.language}")
-
-    bootstrap_script = remove_bad_commands(bootstrap_script)
-    logging.info('removed maven/gradle build commands')
-
-    # Prepare a repository
+    bootstrap_script: Optional[str],
+    run_id: Optional[str] = None,
+) -> Optional[str]:
+    """Download a repository and write build/bootstrap scripts into it. Returns None if download failed."""
     logging.info(f"Downloading repository {repo_name}")
-    is_downloaded = repo_downloader.download(repo_name, commit_sha)
+    is_downloaded = repo_downloader.download(repo_name, commit_sha, run_id=run_id)
     if not is_downloaded:
         logging.error(f"Failed to download repository {repo_name}")
-        json_result["exit_code"] = cfg.exit_codes.download_failure
-        return json_result
+        return None
 
-    repo_path = repo_downloader.get_repo_dir_path(repo_name, commit_sha)
+    repo_path = repo_downloader.get_repo_dir_path(repo_name, commit_sha, run_id=run_id)
     logging.info(f"Repository downloaded to {repo_path}")
 
     # Select appropriate build script based on language
@@ -134,76 +235,188 @@ def run_opensource(
             | stat.S_IXOTH,
         )
 
-    # Setup a docker client
-    logging.info("Setting up Docker client")
-    docker_client = from_env(timeout=cfg.docker.create_container_timeout)
+    return repo_path
 
-    # Prepare volumes
-    volumes = {
-        os.path.abspath(repo_path): {"bind": "/data/project", "mode": "rw"},
+
+async def follow_container(
+    container: DockerContainer,
+    repo_name: str,
+    commit_sha: str,
+    phase_starts: Dict[str, float],
+    log_capture: LogCapture,
+) -> int:
+    """Stream container logs until it exits, recording when build scripts report a new phase. Returns exit code."""
+    async for log in container.log(stdout=True, stderr=True, follow=True):
+        log_capture.write(log)
+        for log_line in log.splitlines():
+            log_line = log_line.strip()
+            if log_line.startswith(PHASE_MARKER):
+                phase_starts[log_line[len(PHASE_MARKER) :]] = time.time()
+            elif log_line:  # Only log non-empty lines
+                logging.info(f"[Docker] [{repo_name}@{commit_sha}] {log_line}")
+
+    container_result = await container.wait()
+    return container_result.get("StatusCode", 1)
+
+
+def get_phase_times(phase_starts: Dict[str, float], end_time: float) -> Dict[str, float]:
+    """Each phase reported by a build script lasts until the next one starts or the container stops."""
+    phases = sorted(phase_starts.items(), key=lambda item: item[1])
+    return {
+        phase: (phases[i + 1][1] if i + 1 < len(phases) else end_time) - phase_start
+        for i, (phase, phase_start) in enumerate(phases)
     }
 
+
+async def run_opensource(
+    docker_client: Docker,
+    image: str,
+    repo_downloader: RepoDownloader,
+    results_store: ResultsStore,
+    repo_name: str,
+    commit_sha: str,
+    cfg: DictConfig,
+    bootstrap_script: Optional[str] = None,
+    enqueued_at: Optional[float] = None,
+    evaluation_cache: Optional[EvaluationCache] = None,
+) -> Dict[str, Any]:
+    if bootstrap_script is None:
+        logging.info(f"Using default bootstrap script for {cfg.language}")
+    bootstrap_script = get_bootstrap_script(cfg, bootstrap_script)
+    script_hash = get_script_hash(bootstrap_script)
+
+    json_result: Dict[str, Any] = {
+        "exit_code": None,
+        "execution_time": 0.0,
+        "repo_name": repo_name,
+        "commit_sha": commit_sha,
+        "script_hash": script_hash,
+        "container_logs": None,
+        "issues_count": 0,
+        "phase_times": {},
+        "cached": False,
+    }
+
+    logging.info(f"Processing {repo_name}@{commit_sha}")
+    dequeued_at = time.time()
+    phase_times: Dict[str, float] = json_result["phase_times"]
+    phase_times["queue"] = dequeued_at - enqueued_at if enqueued_at is not None else 0.0
+
+    bootstrap_script = remove_bad_commands(bootstrap_script)
+    logging.info('removed maven/gradle build commands')
+
+    # Identical evaluations (same image, repository, revision and normalized script) are not run again
+    cache_key = None
+    if evaluation_cache is not None:
+        cache_key = evaluation_cache.get_key(repo_name, commit_sha, bootstrap_script)
+        cached_result = evaluation_cache.get(cache_key)
+        if cached_result is not None:
+            logging.info(f"Using cached evaluation result for {repo_name}@{commit_sha}")
+            for key, value in cached_result.items():
+                if key not in ("repo_name", "commit_sha", "script_hash"):
+                    json_result[key] = value
+            json_result["cached"] = True
+            # logs of the original run are not kept, only their inlined head and tail from the cached result
+            json_result["container_logs_path"] = None
+            results_store.append(json_result)
+            return json_result
+
+    # Prepare a repository; with copy-on-write checkouts, each evaluation gets its own copy.
+    # Downloading and extraction are blocking, so they run in a worker thread.
+    run_id = uuid.uuid4().hex if repo_downloader.copy_on_write else None
+    repo_path = await asyncio.to_thread(
+        prepare_repository, repo_downloader, repo_name, commit_sha, cfg, bootstrap_script, run_id
+    )
+    if repo_path is None:
+        json_result["exit_code"] = cfg.exit_codes.download_failure
+        results_store.append(json_result)
+        return json_result
+
+    # The container is named upfront so that it can be removed even if its creation timed out
+    container = docker_client.containers.container(f"envsetup-eval-{uuid.uuid4().hex}")
+    cache_mounts, cache_locks = get_cache_mounts(cfg)
     start_time = time.time()
-    container_result = None
+    phase_starts: Dict[str, float] = {}
+    log_capture: Optional[LogCapture] = None
 
     try:
         # Run the build script inside a Docker container
         logging.info(f"Starting Docker container for {repo_name}")
-        container = docker_client.containers.run(
-            image=cfg.docker.envsetup_image[cfg.language],
-            volumes=volumes,
-            entrypoint="/bin/bash",
-            command="-c '/data/project/build.sh'",
-            detach=True,
-        )
-
-        # Stream logs with a timeout
+        try:
+            await asyncio.wait_for(
+                docker_client.containers.run(
+                    config={
+                        "Image": image,
+                        "Entrypoint": ["/bin/bash"],
+                        "Cmd": ["-c", "/data/project/build.sh"],
+                        "Env": [
+                            f"EVAL_PYTHON_CHECK={cfg.get('python_check', 'pyright')}",
+                            *get_cache_env(cfg),
+                            *[f"{key}={value}" for key, value in (cfg.docker.get("env_vars") or {}).items()],
+                        ],
+                        "HostConfig": {
+                            "Binds": get_binds(cfg, repo_path),
+                            "Mounts": cache_mounts,
+                        },
+                    },
+                    name=container.id,
+                ),
+                timeout=cfg.docker.create_container_timeout,
+            )
+        except asyncio.TimeoutError as e:
+            raise ContainerCreationTimeoutError(
+                f"Container was not started in {cfg.docker.create_container_timeout} seconds"
+            ) from e
+
+        # Wall-clock deadline for the whole run, regardless of whether the container produces any output
         start_time = time.time()
-
-        for log in container.logs(stream=True, follow=True):
-            log_line = log.decode("utf-8").strip()
-            if log_line:  # Only log non-empty lines
-                logging.info(f"[Docker] {log_line}")
-
-            # Check for timeout
-            if time.time() - start_time > cfg.docker.container_timeout:
-                logging.warning("Docker container timeout reached.")
-                break
-
-        container_result = container.wait(timeout=cfg.docker.container_timeout)
-        exit_code = container_result.get("StatusCode", 1)
-        logging.info(f"Container finished with exit code {exit_code}")
+        phase_times["start"] = start_time - dequeued_at
+        log_capture = LogCapture(
+            os.path.join(
+                to_absolute_path(cfg.operation.dirs.container_logs),
+                f"{get_result_name(repo_name, commit_sha, script_hash)}.log.gz",
+            ),
+            inline_size=cfg.operation.get("inline_logs_size", 20000),
+        )
+        try:
+            exit_code = await asyncio.wait_for(
+                follow_container(container, repo_name, commit_sha, phase_starts, log_capture),
+                timeout=cfg.docker.container_timeout,
+            )
+        except asyncio.TimeoutError:
+            logging.warning(f"Docker container timeout reached for {repo_name}@{commit_sha}.")
+            exit_code = cfg.exit_codes.timeout
+        else:
+            logging.info(f"Container finished with exit code {exit_code}")
 
         json_result["exit_code"] = exit_code
-        json_result["container_logs"] = container.logs().decode("utf-8")
 
-        # Try to read the results file from the container
-        try:
-            results_path = os.path.join(repo_path, "build_output", "results.json")
-            if os.path.exists(results_path):
-                with open(results_path) as f:
-                    build_results = json.load(f)
-                    for key in build_results:
-                        json_result[key] = build_results[key]
-                    logging.info(
-                        f"Found {json_result.get('issues_count', '??')} issues"
-                    )
-            else:
-                logging.warning("results.json not found")
-        except (json.JSONDecodeError, FileNotFoundError) as e:
-            logging.error(f"Error reading results.json: {str(e)}")
-        container.remove()
-        logging.info("Container removed")
-
-    except requests.exceptions.ConnectionError as e:
-        logging.error("Connection timeout")
+        # Try to read the results file from the container; it is incomplete if the container was stopped
+        if exit_code != cfg.exit_codes.timeout:
+            try:
+                results_path = os.path.join(repo_path, "build_output", "results.json")
+                if os.path.exists(results_path):
+                    with open(results_path) as f:
+                        build_results = json.load(f)
+                        for key in build_results:
+                            json_result[key] = build_results[key]
+                        logging.info(
+                            f"Found {json_result.get('issues_count', '??')} issues"
+                        )
+                else:
+                    logging.warning("results.json not found")
+            except (json.JSONDecodeError, FileNotFoundError) as e:
+                logging.error(f"Error reading results.json: {str(e)}")
+
+    except aiohttp.ClientConnectionError as e:
+        logging.error("Connection error")
         json_result["exit_code"] = cfg.exit_codes.timeout
         json_result["container_logs"] = str(e)
-    except requests.exceptions.ReadTimeout as e:
+    except ContainerCreationTimeoutError as e:
         logging.error("Container creation timeout")
         json_result["exit_code"] = cfg.exit_codes.create_container_failure
         json_result["container_logs"] = str(e)
-    except (ContainerError, ImageNotFound, APIError, DockerException) as e:
+    except DockerError as e:
         logging.error(f"Docker error: {str(e)}")
         json_result["exit_code"] = cfg.exit_codes.docker_failure
         json_result["container_logs"] = str(e)
@@ -215,24 +428,339 @@ def run_opensource(
         end_time = time.time()
         execution_time = end_time - start_time
         json_result["execution_time"] = execution_time
+        phase_times.update(get_phase_times(phase_starts, end_time))
+        if log_capture is not None:
+            log_capture.close()
+            # keep the error message if one of the handlers above has set it
+            if json_result["container_logs"] is None:
+                json_result["container_logs"] = log_capture.inline()
+            json_result["container_logs_path"] = log_capture.path
         logging.info(f"Total execution time: {execution_time:.2f} seconds")
 
+        # Kill and remove the container on every path
+        try:
+            await asyncio.wait_for(container.delete(force=True), timeout=cfg.docker.create_container_timeout)
+            logging.info("Container removed")
+        except DockerError as e:
+            if e.status != 404:
+                logging.error(f"Failed to remove container {container.id}: {str(e)}")
+        except (asyncio.TimeoutError, aiohttp.ClientError) as e:
+            logging.error(f"Failed to remove container {container.id}: {str(e)}")
+        release_volume_locks(cache_locks)
+
     # Clear temporary repo data
     logging.info("Cleaning up repository data")
-    repo_downloader.clear_repo(repo_name, commit_sha)
+    await asyncio.to_thread(repo_downloader.clear_repo, repo_name, commit_sha, run_id=run_id)
 
-    json_path = os.path.join(
-        to_absolute_path(cfg.operation.dirs.json_results),
-        "results",
-        f"{repo_name.replace('/', '__')}.json",
+    if cache_key is not None and evaluation_cache is not None and is_cacheable(cfg, json_result):
+        evaluation_cache.put(cache_key, json_result)
+    results_store.append(json_result)
+
+    return json_result
+
+
+async def pull_image(docker_client: Docker, image: str) -> None:
+    """Pull the image once upfront instead of racing on it from every container."""
+    try:
+        await docker_client.images.inspect(image)
+        logging.info(f"Image '{image}' already exists locally.")
+    except DockerError as e:
+        if e.status != 404:
+            raise
+        logging.info(f"Pulling image '{image}'...")
+        await docker_client.images.pull(image)
+        logging.info(f"Image '{image}' pulled successfully.")
+
+
+async def ensure_eval_image(docker_client: Docker, cfg: DictConfig) -> str:
+    """Return the image to evaluate in, building the evaluation tools layer on top of the base image if needed.
+
+    The evaluation image is tagged by a hash of the base image id, the Dockerfile and tool versions,
+    so it is built once and rebuilt only when any of them changes.
+    """
+    base_image = cfg.docker.envsetup_image[cfg.language]
+    await pull_image(docker_client, base_image)
+
+    eval_image_cfg = cfg.docker.get("eval_image")
+    if not eval_image_cfg or not eval_image_cfg.enabled:
+        return base_image
+
+    dockerfile = read_script("eval_tools.Dockerfile")
+    build_args = {
+        "BASE_IMAGE": base_image,
+        "PYRIGHT_VERSION": str(eval_image_cfg.pyright_version) if cfg.language == "python" else "",
+    }
+    base_image_id = (await docker_client.images.inspect(base_image))["Id"]
+    key = hashlib.sha256(json.dumps([base_image_id, dockerfile, build_args]).encode("utf-8")).hexdigest()[:16]
+    tag = f"envsetup-eval-{cfg.language}:{key}"
+
+    try:
+        await docker_client.images.inspect(tag)
+        logging.info(f"Evaluation image '{tag}' already exists locally.")
+        return tag
+    except DockerError as e:
+        if e.status != 404:
+            raise
+
+    logging.info(f"Building evaluation image '{tag}' from '{base_image}'...")
+    context = io.BytesIO()
+    with tarfile.open(fileobj=context, mode="w:gz") as tar:
+        dockerfile_bytes = dockerfile.encode("utf-8")
+        info = tarfile.TarInfo("Dockerfile")
+        info.size = len(dockerfile_bytes)
+        tar.addfile(info, io.BytesIO(dockerfile_bytes))
+    context.seek(0)
+
+    build_log = await docker_client.images.build(
+        fileobj=context,
+        encoding="gzip",
+        tag=tag,
+        buildargs=build_args,
+        labels={"envsetup.base_image": base_image, "envsetup.base_image_id": base_image_id, **build_args},
     )
+    errors = [line["error"] for line in build_log if "error" in line]
+    if errors:
+        raise RuntimeError(f"Failed to build evaluation image '{tag}': {errors}")
+    logging.info(f"Evaluation image '{tag}' built successfully.")
+    return tag
 
-    os.makedirs(os.path.dirname(json_path), exist_ok=True)
 
-    with open(json_path, "w") as f:
-        json.dump(json_result, f)
+VOLUME_LOCKS_DIR = os.path.join(tempfile.gettempdir(), "envsetup-volume-locks")
+"""Host-wide lock files for dependency caches that can be used by one container at a time."""
 
-    return None
+
+def try_lock_volume(volume: str) -> Optional[IO[str]]:
+    """Lock a named volume for this process without waiting; returns the lock file to release or None if busy."""
+    os.makedirs(VOLUME_LOCKS_DIR, exist_ok=True)
+    lock_file = open(os.path.join(VOLUME_LOCKS_DIR, f"{volume}.lock"), "w")
+    try:
+        fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except BlockingIOError:
+        lock_file.close()
+        return None
+    return lock_file
+
+
+def release_volume_locks(locks: List[IO[str]]) -> None:
+    for lock_file in locks:
+        fcntl.flock(lock_file, fcntl.LOCK_UN)
+        lock_file.close()
+
+
+def get_cache_mounts(cfg: DictConfig) -> Tuple[List[Dict[str, str]], List[IO[str]]]:
+    """Named volumes with dependency caches (pip, poetry, maven, gradle, ...) shared by evaluation containers.
+
+    Caches with `exclusive: true` (e.g. Gradle's, whose cross-process locking does not work between containers)
+    are mounted into at most one container on the host at a time, other containers start with an empty cache
+    instead. Returns the mounts with the locks of exclusive caches, to be released once the container is removed.
+    """
+    mounts, locks = [], []
+    for volume, cache_cfg in (cfg.docker.get("dependency_caches") or {}).items():
+        if cache_cfg.get("exclusive", False):
+            lock_file = try_lock_volume(volume)
+            if lock_file is None:
+                continue
+            locks.append(lock_file)
+        mounts.append({"Type": "volume", "Source": volume, "Target": cache_cfg.path})
+    return mounts, locks
+
+
+def get_cache_env(cfg: DictConfig) -> List[str]:
+    """Environment variables making tools use shared caches safely, e.g. file locks for maven's local repository."""
+    return [
+        f"{key}={value}"
+        for cache_cfg in (cfg.docker.get("dependency_caches") or {}).values()
+        for key, value in (cache_cfg.get("env") or {}).items()
+    ]
+
+
+async def enforce_cache_size_caps(docker_client: Docker, image: str, cfg: DictConfig) -> None:
+    """Empty dependency cache volumes that outgrew their size cap.
+
+    Caches are emptied as a whole: removing single files could leave package managers' own indices inconsistent.
+    Volumes are global to the Docker host, so ones mounted by running containers (e.g., of another evaluation
+    or inference run) are skipped; they are checked again by the next run.
+    """
+
+    async def enforce_size_cap(volume: str, max_size_gb: float) -> None:
+        if await docker_client.containers.list(filters=json.dumps({"volume": [volume]})):
+            logging.info(f"Dependency cache {volume} is in use, not checking its size.")
+            return
+        max_size = int(max_size_gb * 1024**3)
+        container = await docker_client.containers.run(
+            config={
+                "Image": image,
+                "Entrypoint": ["/bin/bash"],
+                "Cmd": [
+                    "-c",
+                    f'size=$(du -sb /cache | cut -f1); echo "$size"; '
+                    f'if [ "$size" -gt {max_size} ]; then find /cache -mindepth 1 -delete; fi',
+                ],
+                "HostConfig": {"Mounts": [{"Type": "volume", "Source": volume, "Target": "/cache"}]},
+            }
+        )
+        try:
+            await container.wait()
+            size = int("".join(await container.log(stdout=True)).strip() or 0)
+            if size > max_size:
+                logging.warning(f"Dependency cache {volume} took {size / 1024**3:.1f}GB > {max_size_gb}GB, emptied it.")
+            else:
+                logging.info(f"Dependency cache {volume} takes {size / 1024**3:.1f}GB.")
+        finally:
+            await container.delete(force=True)
+
+    async def enforce_size_cap_locked(volume: str, max_size_gb: float, exclusive: bool) -> None:
+        # an exclusive cache might be about to be mounted by an evaluation container of another run
+        lock_file = try_lock_volume(volume) if exclusive else None
+        if exclusive and lock_file is None:
+            logging.info(f"Dependency cache {volume} is in use, not checking its size.")
+            return
+        try:
+            await enforce_size_cap(volume, max_size_gb)
+        finally:
+            release_volume_locks([lock_file] if lock_file is not None else [])
+
+    await asyncio.gather(
+        *[
+            enforce_size_cap_locked(volume, cache_cfg.max_size_gb, exclusive=cache_cfg.get("exclusive", False))
+            for volume, cache_cfg in (cfg.docker.get("dependency_caches") or {}).items()
+            if cache_cfg.get("max_size_gb") is not None
+        ]
+    )
+
+
+async def iter_repos(repos: Iterable[Tuple[str, str, Optional[str]]]) -> AsyncIterator[Tuple[str, str, Optional[str]]]:
+    """Read `repos` in a worker thread, so that reading (or waiting for) the input does not block the event loop."""
+    iterator = iter(repos)
+    while (repo := await asyncio.to_thread(next, iterator, None)) is not None:
+        yield repo
+
+
+class FollowedJsonlDataSource(BaseDataSource):
+    """JSONLines file that is still being written: yields records as they are appended to it,
+    until `<path>.done` appears."""
+
+    def __init__(self, path: str, poll_interval: float):
+        self._path = path
+        self._poll_interval = poll_interval
+
+    def __iter__(self) -> Iterator[Dict[str, Any]]:
+        position = 0
+        buffer = b""
+        while True:
+            # check the marker before reading, so that lines written right before it are not missed
+            is_done = os.path.exists(f"{self._path}.done")
+            if os.path.exists(self._path):
+                with open(self._path, "rb") as f:
+                    f.seek(position)
+                    buffer += f.read()
+                    position = f.tell()
+                # the last line might still be incomplete, it is kept until the rest of it is written
+                *lines, buffer = buffer.split(b"\n")
+                for line in lines:
+                    if line.strip():
+                        yield json.loads(line)
+            if is_done:
+                if buffer.strip():
+                    yield json.loads(buffer)
+                return
+            time.sleep(self._poll_interval)
+
+
+def select_repos(
+    data_source: BaseDataSource, cfg: DictConfig, processed_keys: Set[Tuple[str, str, str]]
+) -> BaseDataSource:
+    """Lazily drop duplicate and already processed (repository, revision, script hash) rows and apply
+    `input.selection` (the same sharding and sampling as in inference, by repository@revision)."""
+    key_columns = ("repository", "revision", "script_hash")
+    data_source = data_source.dedupe(keys=key_columns).exclude(
+        [dict(zip(key_columns, key)) for key in processed_keys], keys=key_columns
+    )
+    selection = cfg.input.get("selection") or {}
+    if selection.get("num_shards", 1) > 1:
+        data_source = data_source.shard(selection["num_shards"], selection.get("shard_index", 0))
+    if selection.get("sample_fraction") is not None:
+        data_source = data_source.sample(selection["sample_fraction"], seed=selection.get("seed", 0))
+    if selection.get("limit") is not None:
+        data_source = data_source.head(selection["limit"])
+    return data_source
+
+
+async def run_evaluation(
+    func: Callable[..., Awaitable[Dict[str, Any]]],
+    repo_downloader: RepoDownloader,
+    results_store: ResultsStore,
+    repos: AsyncIterator[Tuple[str, str, Optional[str]]],
+    cfg: DictConfig,
+) -> None:
+    """Run evaluation for (repository, revision, script) from `repos` as they come, from a single event loop.
+
+    At most `max_concurrent` containers run at once; `repos` is not consumed further while all slots are busy.
+    """
+    docker_client = Docker()
+    progress_events = ProgressEventWriter.from_env("evaluation")
+    try:
+        image = await ensure_eval_image(docker_client, cfg)
+        await enforce_cache_size_caps(docker_client, image, cfg)
+        evaluation_cache = None
+        if cfg.operation.dirs.get("eval_cache"):
+            image_id = (await docker_client.images.inspect(image))["Id"]
+            # rerunning evaluation on purpose should not reuse old results, but it refreshes them
+            evaluation_cache = EvaluationCache(
+                to_absolute_path(cfg.operation.dirs.eval_cache),
+                image_id=image_id,
+                salt=get_evaluation_salt(cfg),
+                refresh=cfg.operation.get("rewrite_results", False),
+            )
+
+        semaphore = asyncio.Semaphore(cfg.operation.max_concurrent)
+        progress = tqdm_asyncio(total=0)
+
+        async def run_one(repo_name: str, commit_sha: str, script: Optional[str], enqueued_at: float) -> None:
+            start_time = time.time()
+            progress_events.started(repo_name, commit_sha)
+            try:
+                result = await func(
+                    docker_client,
+                    image,
+                    repo_downloader,
+                    results_store,
+                    repo_name,
+                    commit_sha,
+                    cfg,
+                    script,
+                    enqueued_at=enqueued_at,
+                    evaluation_cache=evaluation_cache,
+                )
+                progress_events.finished(
+                    repo_name,
+                    commit_sha,
+                    duration=time.time() - start_time,
+                    exit_code=result.get("exit_code"),
+                    issues_count=result.get("issues_count"),
+                    cached=result.get("cached", False),
+                )
+            except Exception as e:
+                progress_events.failed(repo_name, commit_sha, duration=time.time() - start_time, error=repr(e))
+                raise
+            finally:
+                semaphore.release()
+                progress.update()
+
+        tasks = []
+        async for repo_name, commit_sha, script in repos:
+            progress.total += 1
+            progress.refresh()
+            progress_events.queued(repo_name, commit_sha)
+            enqueued_at = time.time()
+            await semaphore.acquire()
+            tasks.append(asyncio.create_task(run_one(repo_name, commit_sha, script, enqueued_at)))
+        progress_events.total(progress.total)
+        await asyncio.gather(*tasks)
+        progress.close()
+    finally:
+        progress_events.close()
+        await docker_client.close()
 
 
 # Dictionary of available evaluation tools
@@ -243,72 +771,81 @@ eval_tools = {
 
 @hydra.main(version_base=None, config_path="conf", config_name="config")
 def main(cfg: DictConfig) -> None:
-    # Draw the repos names&revisions to run a script on
-    if cfg.input.mode == "local":
-        repos = pd.read_json(
-            to_absolute_path(cfg.input.local), orient="records", lines=True
-        )
-    elif cfg.input.mode == "hf":
-        local_path = hf_hub_download(
-            repo_id=cfg.input.hf.repo_id,
-            repo_type="dataset",
-            filename=cfg.input.hf.path_in_repo,
-        )
-        repos = pd.read_json(to_absolute_path(local_path), orient="records", lines=True)
-    else:
-        raise ValueError("Unknown input source; supported are: 'local' and 'hf'.")
-    logging.info(f"Got {len(repos)} repos to process.")
-
     repo_name_col = cfg.input.columns.repo_name
     commit_sha_col = cfg.input.columns.commit_sha
     script_col = cfg.input.columns.script
 
-    # # only projectsyn/commodore
-    # repos = repos[repos[repo_name_col].str.startswith("aqlaboratory/openfold")]
-    # repos = repos.head(100)
-
-    assert (
-        repo_name_col in repos.columns
-    ), f"The input data is expected to have column {repo_name_col} with repository names, but it doesn't."
-    assert (
-        commit_sha_col in repos.columns
-    ), f"The input data is expected to have column {commit_sha_col} with revisions, but it doesn't."
-    if cfg.input.use_scripts:
-        assert (
-            script_col in repos.columns
-        ), f"The input data is expected to have column {script_col} with scripts, but it doesn't."
-
+    results_store_path = to_absolute_path(cfg.operation.dirs.results_store)
+    processed_keys: Set[Tuple[str, str, str]] = set()
     if not cfg.operation.rewrite_results:
         logging.info("Configured not to overwrite existing results.")
-        if os.path.exists(os.path.join(cfg.operation.dirs.json_results, "results")):
-            processed_repos = []
-            for file in os.listdir(
-                os.path.join(cfg.operation.dirs.json_results, "results")
-            ):
-                repo_name = file[: -len(".json")].replace("__", "/")
-                processed_repos.append({repo_name_col: repo_name})
-            processed_repos_df = pd.DataFrame(processed_repos)
-            logging.info(f"Got {len(processed_repos_df)} already processed repos.")
-            repos = repos.loc[
-                ~repos[repo_name_col].isin(processed_repos_df[repo_name_col])
-            ]
-            logging.info(f"Got {len(repos)} repos to process.")
-    else:
-        logging.info(
-            f"Configured to overwrite existing results. Removing {os.path.join(cfg.operation.dirs.json_results, 'results')}."
+        result_keys = ["repo_name", "commit_sha", "script_hash"]
+        processed = (
+            ResultsStore.load(results_store_path, columns=[*result_keys, "exit_code"])
+            .reindex(columns=[*result_keys, "exit_code"])
+            .dropna(subset=result_keys)
         )
-        if os.path.exists(os.path.join(cfg.operation.dirs.json_results, "results")):
-            shutil.rmtree(os.path.join(cfg.operation.dirs.json_results, "results"))
+        # infrastructure failures (e.g. failed downloads) are retried
+        processed = processed[~processed["exit_code"].isin(get_infrastructure_exit_codes(cfg))]
+        processed_keys = set(processed[result_keys].itertuples(index=False, name=None))
+        logging.info(f"Got {len(processed_keys)} already processed (repository, revision, script) keys.")
+    else:
+        logging.info(f"Configured to overwrite existing results. Removing {results_store_path}.")
+        if os.path.exists(results_store_path):
+            shutil.rmtree(results_store_path)
+        if os.path.exists(cfg.operation.dirs.container_logs):
+            shutil.rmtree(cfg.operation.dirs.container_logs)
+
+    # Draw the repos names&revisions to run a script on (read lazily, so memory does not grow with the input size)
+    columns = {"repository": repo_name_col, "revision": commit_sha_col}
+    if cfg.input.use_scripts:
+        columns["script"] = script_col
+    data_source: BaseDataSource
+    if cfg.input.mode == "local" and cfg.input.get("follow", False):
+        # the input file is still being written (e.g. by trajectories processing in the streaming pipeline)
+        input_path = to_absolute_path(cfg.input.local)
+        logging.info(f"Following {input_path} until {input_path}.done appears.")
+        data_source = FollowedJsonlDataSource(input_path, poll_interval=cfg.input.get("poll_interval", 5))
+    else:
+        if cfg.input.mode == "local":
+            input_path = to_absolute_path(cfg.input.local)
+        elif cfg.input.mode == "hf":
+            input_path = hf_hub_download(
+                repo_id=cfg.input.hf.repo_id,
+                repo_type="dataset",
+                filename=cfg.input.hf.path_in_repo,
+            )
+        else:
+            raise ValueError("Unknown input source; supported are: 'local' and 'hf'.")
+        data_source = LocalFileDataSource(input_path, columns=list(columns.values()))
+
+    # Evaluations are keyed by (repository, revision, script hash): identical scripts are evaluated once
+    data_source = data_source.select(columns).map(
+        lambda row: {**row, "script_hash": get_script_hash(get_bootstrap_script(cfg, row.get("script")))}
+    )
+    data_source = select_repos(data_source, cfg, processed_keys)
+    repos = iter_repos((row["repository"], row["revision"], row.get("script")) for row in data_source)
 
     # Create tmp dirs for operation
     os.makedirs(to_absolute_path(cfg.operation.dirs.repo_data), exist_ok=True)
     os.makedirs(to_absolute_path(cfg.operation.dirs.json_results), exist_ok=True)
 
     # Setup utils class for cloning repositories
+    repos_archives_cfg = cfg.input.repos_archives
     repo_downloader = RepoDownloader(
-        hf_name=cfg.input.repos_archives.repo_id,
+        hf_name=repos_archives_cfg.repo_id,
         output_dir=to_absolute_path(cfg.operation.dirs.repo_data),
         language=cfg.language,
+        sources=list(repos_archives_cfg.get("sources", ["github", "hf"])),
+        local_archives_dir=to_absolute_path(repos_archives_cfg.local_dir)
+        if repos_archives_cfg.get("local_dir")
+        else None,
+        source_timeouts=dict(repos_archives_cfg.get("timeouts") or {}),
+        failures_cache_path=to_absolute_path(repos_archives_cfg.failures_cache)
+        if repos_archives_cfg.get("failures_cache")
+        else None,
+        failures_ttl=repos_archives_cfg.get("failures_ttl", 7 * 24 * 60 * 60),
+        copy_on_write=repos_archives_cfg.get("copy_on_write", False),
     )
 
     # Select evaluation tool
@@ -318,27 +855,10 @@ def main(cfg: DictConfig) -> None:
             f"Supported tools are: {list(eval_tools.keys())}"
         )
 
-    # Run processes
+    # Run evaluation
     func = eval_tools[cfg.eval_tool]
-    if cfg.input.use_scripts:
-        process_map(
-            func,
-            repeat(repo_downloader),
-            repos[repo_name_col].to_list(),
-            repos[commit_sha_col].to_list(),
-            repeat(cfg),
-            repos[script_col].to_list(),
-            **cfg.operation.pool_config,
-        )
-    else:
-        process_map(
-            func,
-            repeat(repo_downloader),
-            repos[repo_name_col].to_list(),
-            repos[commit_sha_col].to_list(),
-            repeat(cfg),
-            **cfg.operation.pool_config,
-        )
+    with ResultsStore(results_store_path, flush_every=cfg.operation.get("results_flush_every", 50)) as results_store:
+        asyncio.run(run_evaluation(func, repo_downloader, results_store, repos, cfg))
 
     # Create local jsonl file with results
     jsonl_path = os.path.join(
@@ -347,17 +867,7 @@ def main(cfg: DictConfig) -> None:
     )
 
     with jsonlines.open(jsonl_path, "w") as writer:
-        for file in os.listdir(
-            os.path.join(to_absolute_path(cfg.operation.dirs.json_results), "results")
-        ):
-            with open(
-                os.path.join(
-                    to_absolute_path(cfg.operation.dirs.json_results), "results", file
-                ),
-                "r",
-            ) as f:
-                json_result = json.load(f)
-                writer.write(json_result)
+        writer.write_all(ResultsStore.iter_records(results_store_path))
 
     # Save to huggingface if necessary
     if cfg.output.mode == "hf":
@@ -0,0 +1,114 @@
+"""Fast import-resolution check, an approximation of pyright's `reportMissingImports` count.
+
+Collects absolute imports from all Python files of a project with `ast` and checks that each imported module
+can be found, without importing it, either in the project itself or by the current interpreter.
+
+Usage: python check_imports.py <project_dir>; a JSON report is printed to stdout.
+
+Runs inside evaluation containers with whatever Python the environment provides, so it sticks to the standard
+library and syntax supported by old Python 3 versions.
+"""
+
+import ast
+import importlib.machinery
+import importlib.util
+import json
+import os
+import sys
+import time
+
+EXCLUDED_DIRS = {"node_modules", "__pycache__", "build_output", "site-packages"}
+
+
+def iter_python_files(root):
+    for dirpath, dirnames, filenames in os.walk(root):
+        # same defaults as pyright: skip hidden directories, caches and virtual environments
+        dirnames[:] = [
+            d
+            for d in dirnames
+            if not d.startswith(".")
+            and d not in EXCLUDED_DIRS
+            and not os.path.exists(os.path.join(dirpath, d, "pyvenv.cfg"))
+        ]
+        for filename in filenames:
+            if filename.endswith((".py", ".pyi")):
+                yield os.path.join(dirpath, filename)
+
+
+def iter_imports(tree):
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Import):
+            for alias in node.names:
+                yield node.lineno, alias.name
+        elif isinstance(node, ast.ImportFrom) and node.level == 0 and node.module:
+            # `from a import b` only requires `a` to resolve, `b` might be an attribute
+            yield node.lineno, node.module
+
+
+def _find_top_level(name, search_paths):
+    spec = importlib.machinery.PathFinder.find_spec(name, search_paths)
+    if spec is not None:
+        return spec
+    try:
+        return importlib.util.find_spec(name)
+    except (ImportError, ValueError):
+        return None
+
+
+def is_resolvable(module, search_paths):
+    parts = module.split(".")
+    spec = _find_top_level(parts[0], search_paths)
+    for part in parts[1:]:
+        if spec is None:
+            return False
+        if spec.submodule_search_locations is None:
+            # plain modules may provide submodules dynamically (e.g. `os.path`), consider them resolved
+            return True
+        spec = importlib.machinery.PathFinder.find_spec(part, list(spec.submodule_search_locations))
+    return spec is not None
+
+
+def check_imports(root):
+    root = os.path.abspath(root)
+    this_file = os.path.abspath(__file__)
+    # pyright resolves absolute imports against the project root, `src` and the importing file directory
+    root_paths = [root, os.path.join(root, "src")]
+
+    diagnostics = []
+    files_checked = 0
+    parse_errors = 0
+    cache = {}
+    for path in iter_python_files(root):
+        if os.path.abspath(path) == this_file:
+            continue
+        try:
+            with open(path, "rb") as f:
+                tree = ast.parse(f.read(), filename=path)
+        except (SyntaxError, ValueError, OSError):
+            parse_errors += 1
+            continue
+        files_checked += 1
+
+        file_dir = os.path.dirname(path)
+        for line, module in iter_imports(tree):
+            key = (module, file_dir)
+            if key not in cache:
+                cache[key] = is_resolvable(module, root_paths + [file_dir])
+            if not cache[key]:
+                diagnostics.append({"file": os.path.relpath(path, root), "line": line, "module": module})
+
+    return {
+        "issues_count": len(diagnostics),
+        "files_checked": files_checked,
+        "parse_errors": parse_errors,
+        "diagnostics": diagnostics,
+    }
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 2:
+        sys.exit("Usage: python check_imports.py <project_dir>")
+    start_time = time.time()
+    report = check_imports(sys.argv[1])
+    report["time"] = time.time() - start_time
+    json.dump(report, sys.stdout)
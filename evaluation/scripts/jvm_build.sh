@@ -9,16 +9,36 @@ chmod -R 777 .
 # initial contents
 printf '{}\n' > build_output/results.json  
 
+# Use the local Maven proxy if the pipeline started one
+if [ -n "$ENVSETUP_MAVEN_MIRROR" ] && [ ! -f ~/.m2/settings.xml ]; then
+  mkdir -p ~/.m2
+  cat > ~/.m2/settings.xml <<EOF
+<settings>
+  <mirrors>
+    <mirror>
+      <id>envsetup-proxy</id>
+      <mirrorOf>central</mirrorOf>
+      <url>$ENVSETUP_MAVEN_MIRROR</url>
+    </mirror>
+  </mirrors>
+</settings>
+EOF
+fi
+
 # If a bootstrap script exists, run it first
 if [ -f "./bootstrap_script.sh" ]; then
   echo "Running bootstrap script..."
+  echo "::phase::bootstrap"
   source ./bootstrap_script.sh
 fi
 
+echo "::phase::check"
 echo "Running JVM build script..."
 
-# Install jq
-apt-get update -yqq && apt-get install -yqq jq
+# Install jq unless it is pre-installed in the evaluation image
+if ! command -v jq &> /dev/null; then
+    apt-get update -yqq && apt-get install -yqq jq
+fi
 # Initialize build issues count and diagnostic log
 issues="-1"
 diagnostic_log="[]"
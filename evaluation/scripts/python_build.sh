@@ -2,6 +2,9 @@
 
 set -e
 
+# Which check to run: pyright (full type check), imports (import resolution only) or both
+python_check="${EVAL_PYTHON_CHECK:-pyright}"
+
 # Create output directory
 mkdir -p build_output
 chmod -R 777 .
@@ -13,6 +16,7 @@ if [ -f "./bootstrap_script.sh" ]; then
   echo "Bootstrap script contents:"
   cat ./bootstrap_script.sh
   echo "Running bootstrap script..."
+  echo "::phase::bootstrap"
   source ./bootstrap_script.sh
 fi
 
@@ -22,12 +26,41 @@ if ! command -v jq &> /dev/null; then
     exit 1
 fi
 
-# install pyright
-python -m pip install --quiet pyright
+echo "::phase::check"
 
 # Print which Python is being used
 echo "Using $(python --version) located at $(which python)"
 
+# Resolve imports only: much faster than a full pyright run, approximates its reportMissingImports count
+if [ "$python_check" = "imports" ] || [ "$python_check" = "both" ]; then
+    echo "Running import checks..."
+    # mounted outside of the project by main.py
+    python /tmp/envsetup-eval/check_imports.py /data/project > build_output/import_check_output.json || true
+
+    if ! jq -e . build_output/import_check_output.json > /dev/null 2>&1; then
+        echo "Failed to get valid import check output"
+        exit 1
+    fi
+
+    jq -s '.[0] * {"import_check": .[1]}' build_output/results.json build_output/import_check_output.json > \
+        build_output/temp.json && mv build_output/temp.json build_output/results.json
+
+    if [ "$python_check" = "imports" ]; then
+        jq '. + {"issues_count": .import_check.issues_count}' build_output/results.json > build_output/temp.json && \
+            mv build_output/temp.json build_output/results.json
+        chmod -R 777 .
+        exit 0
+    fi
+fi
+
+# install pyright unless it is pre-installed in the evaluation image
+if command -v pyright &> /dev/null; then
+    pyright_cmd="pyright"
+else
+    python -m pip install --quiet pyright
+    pyright_cmd="python -m pyright"
+fi
+
 # Run type checking with pyright
 echo "Running type checks..."
 if ! command -v pyright &> /dev/null; then
@@ -36,7 +69,9 @@ if ! command -v pyright &> /dev/null; then
 fi
 
 # Run pyright and capture its output regardless of exit code
-python -m pyright /data/project --level error --outputjson > build_output/pyright_output.json || true
+pyright_start=$SECONDS
+$pyright_cmd /data/project --level error --outputjson > build_output/pyright_output.json || true
+pyright_time=$((SECONDS - pyright_start))
 
 # Check if pyright output exists and is valid JSON
 if [ ! -f build_output/pyright_output.json ]; then
@@ -49,7 +84,7 @@ issue_count=$(jq '[.generalDiagnostics[] | select(.rule == "reportMissingImports
     build_output/pyright_output.json)
 
 # Output results as JSON - exit code is 0 if pyright ran successfully, regardless of found issues
-jq --arg issues "$issue_count" '. + {"issues_count": ($issues|tonumber)}' \
+jq --arg issues "$issue_count" --argjson time "$pyright_time" '. + {"issues_count": ($issues|tonumber), "pyright_time": $time}' \
     build_output/results.json > build_output/temp.json && \
     mv build_output/temp.json build_output/results.json
 
@@ -0,0 +1,62 @@
+import hashlib
+import json
+import logging
+import os
+import uuid
+from typing import Any, Dict, Optional
+
+
+class EvaluationCache:
+    """Content-addressed on-disk cache of evaluation results, shared between runs.
+
+    A result is keyed by the evaluation image id, repository, revision and normalized bootstrap script,
+    plus `salt` for everything else that changes the outcome (e.g. build scripts, check mode and container settings).
+    With `refresh`, cached results are not used, but new results still replace them.
+    """
+
+    LOCAL_FIELDS = ("container_logs_path",)
+    """Fields that point to files of the run that produced a result; they are not kept in the cache."""
+
+    def __init__(self, path: str, image_id: str, salt: str = "", refresh: bool = False):
+        self.path = path
+        self.image_id = image_id
+        self.salt = salt
+        self.refresh = refresh
+        os.makedirs(path, exist_ok=True)
+
+    @staticmethod
+    def normalize_script(script: str) -> str:
+        """Drop what never changes what a script does: line endings, trailing spaces and trailing blank lines.
+
+        Comment-like lines are kept: they can be a part of heredocs or quoted strings.
+        """
+        lines = [line.rstrip() for line in script.replace("\r\n", "\n").split("\n")]
+        return "\n".join(lines).rstrip("\n")
+
+    def get_key(self, repo_name: str, commit_sha: str, script: str) -> str:
+        key_data = [self.image_id, self.salt, repo_name, commit_sha, self.normalize_script(script)]
+        return hashlib.sha256(json.dumps(key_data).encode("utf-8")).hexdigest()
+
+    def _get_path(self, key: str) -> str:
+        return os.path.join(self.path, key[:2], f"{key}.json")
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        if self.refresh:
+            return None
+        try:
+            with open(self._get_path(key)) as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+        except (json.JSONDecodeError, OSError) as e:
+            logging.warning(f"Ignoring broken evaluation cache entry {key}: {e}")
+            return None
+
+    def put(self, key: str, result: Dict[str, Any]) -> None:
+        path = self._get_path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # write to a temporary file first so that concurrent runs never see a partial entry
+        tmp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump({key: value for key, value in result.items() if key not in self.LOCAL_FIELDS}, f)
+        os.replace(tmp_path, path)
@@ -0,0 +1,138 @@
+import glob
+import json
+import logging
+import os
+import uuid
+from typing import Any, Dict, Iterator, List, Optional, Sequence
+
+import pandas as pd
+import pyarrow as pa  # type: ignore[import-untyped]
+import pyarrow.parquet as pq  # type: ignore[import-untyped]
+
+ScalarValue = (str, int, float, bool, type(None))
+
+
+class ResultsStore:
+    """Append-only columnar store for evaluation results.
+
+    Scalar fields (and scalar fields of nested dicts, as `<key>.<subkey>`) are written to `results/*.parquet`,
+    so filtering by exit code or issues count never touches logs. Bulky fields (container logs, raw checker
+    output) are JSON-encoded into `details/*.parquet`; both are joined by `result_id`.
+    Every flush writes new part files, existing files are never rewritten.
+    """
+
+    DETAIL_FIELDS = {"container_logs"}
+
+    def __init__(self, path: str, flush_every: int = 50):
+        self.path = path
+        self.flush_every = flush_every
+        self._rows: List[Dict[str, Any]] = []
+        self._details: List[Dict[str, Any]] = []
+        os.makedirs(os.path.join(path, "results"), exist_ok=True)
+        os.makedirs(os.path.join(path, "details"), exist_ok=True)
+
+    def append(self, result: Dict[str, Any]) -> None:
+        result_id = uuid.uuid4().hex
+        row: Dict[str, Any] = {"result_id": result_id}
+        details: Dict[str, Any] = {"result_id": result_id}
+        for key, value in result.items():
+            if key in self.DETAIL_FIELDS:
+                details[key] = value
+            elif isinstance(value, ScalarValue):
+                row[key] = value
+            else:
+                if isinstance(value, dict):
+                    row.update(
+                        {
+                            f"{key}.{subkey}": subvalue
+                            for subkey, subvalue in value.items()
+                            if isinstance(subvalue, ScalarValue)
+                        }
+                    )
+                details[key] = json.dumps(value)
+        self._rows.append(row)
+        self._details.append(details)
+
+        if len(self._rows) >= self.flush_every:
+            self.flush()
+
+    @staticmethod
+    def _to_table(rows: List[Dict[str, Any]]) -> pa.Table:
+        columns: Dict[str, List[Any]] = {}
+        for row in rows:
+            for key in row:
+                columns.setdefault(key, [])
+        for key, values in columns.items():
+            values.extend(row.get(key) for row in rows)
+
+        arrays = {}
+        for key, values in columns.items():
+            try:
+                arrays[key] = pa.array(values)
+            except (pa.ArrowInvalid, pa.ArrowTypeError):
+                # build scripts are free to put a value of any type under a key, fall back to strings
+                arrays[key] = pa.array([None if value is None else str(value) for value in values])
+        return pa.table(arrays)
+
+    def flush(self) -> None:
+        if not self._rows:
+            return
+        part_name = f"part-{uuid.uuid4().hex}.parquet"
+        # details go first so that every row in results always has its details
+        pq.write_table(self._to_table(self._details), os.path.join(self.path, "details", part_name))
+        pq.write_table(self._to_table(self._rows), os.path.join(self.path, "results", part_name))
+        logging.info(f"Flushed {len(self._rows)} results to {self.path}")
+        self._rows = []
+        self._details = []
+
+    def close(self) -> None:
+        self.flush()
+
+    def __enter__(self) -> "ResultsStore":
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.close()
+
+    @staticmethod
+    def _read_parts(
+        path: str, columns: Optional[Sequence[str]] = None, filters: Optional[List[Any]] = None
+    ) -> pd.DataFrame:
+        # parts might have different columns (e.g. fields from build scripts), so they are read one by one
+        frames = []
+        for part in sorted(glob.glob(os.path.join(path, "*.parquet"))):
+            part_columns = None
+            if columns is not None:
+                schema_names = pq.read_schema(part).names
+                part_columns = [column for column in columns if column in schema_names]
+            frames.append(pq.read_table(part, columns=part_columns, filters=filters).to_pandas())
+        frames = [frame for frame in frames if len(frame.columns)]
+        if not frames:
+            return pd.DataFrame(columns=list(columns) if columns is not None else [])
+        return pd.concat(frames, ignore_index=True)
+
+    @staticmethod
+    def load(path: str, columns: Optional[Sequence[str]] = None, filters: Optional[List[Any]] = None) -> pd.DataFrame:
+        """Load scalar results, e.g. `ResultsStore.load(path, filters=[("exit_code", "==", 0)])`."""
+        return ResultsStore._read_parts(os.path.join(path, "results"), columns=columns, filters=filters)
+
+    @staticmethod
+    def load_details(path: str, result_ids: Optional[Sequence[str]] = None) -> pd.DataFrame:
+        """Load logs and raw outputs, optionally only for the given results."""
+        filters = [("result_id", "in", list(result_ids))] if result_ids is not None else None
+        return ResultsStore._read_parts(os.path.join(path, "details"), filters=filters)
+
+    @staticmethod
+    def iter_records(path: str) -> Iterator[Dict[str, Any]]:
+        """Yield full result records in their original (JSON) form, part by part."""
+        for results_part in sorted(glob.glob(os.path.join(path, "results", "*.parquet"))):
+            rows = pq.read_table(results_part).to_pylist()
+            details_part = os.path.join(path, "details", os.path.basename(results_part))
+            details = {row["result_id"]: row for row in pq.read_table(details_part).to_pylist()}
+            for row in rows:
+                record = {key: value for key, value in row.items() if "." not in key and key != "result_id"}
+                for key, value in details[row["result_id"]].items():
+                    if key == "result_id" or (value is None and key not in ResultsStore.DETAIL_FIELDS):
+                        continue
+                    record[key] = value if key in ResultsStore.DETAIL_FIELDS else json.loads(value)
+                yield record
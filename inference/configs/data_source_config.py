@@ -1,6 +1,6 @@
-from typing import List
+from typing import Dict, Iterable, List, Optional
 
-from env_setup_utils.data_sources import HFDataSource, LocalFileDataSource
+from env_setup_utils.data_sources import BaseDataSource, HFDataSource, LocalFileDataSource
 from pydantic import BaseModel
 
 from .instantiatable_config import InstantiatableConfig
@@ -10,13 +10,50 @@ class HFDataSourceConfig(InstantiatableConfig[HFDataSource]):
     hub_name: str
     configs: List[str]
     split: str
+    streaming: bool = False
+    columns: Optional[List[str]] = None
 
 
 class LocalFileDataSourceConfig(InstantiatableConfig[LocalFileDataSource]):
     path: str
+    columns: Optional[List[str]] = None
+
+
+class DataSelectionConfig(BaseModel):
+    dedupe: bool = True
+    """Set to True to run each repository@revision once, even if it occurs in data several times."""
+    exclude_manifest: Optional[str] = None
+    """Path to a local JSONLines/CSV file with `repository` and `revision` of datapoints to skip (e.g., scripts.jsonl
+      of a previous run)."""
+    num_shards: int = 1
+    """Number of disjoint shards the data is split into (by a stable hash of repository@revision)."""
+    shard_index: int = 0
+    """Index of the shard to run on."""
+    sample_fraction: Optional[float] = None
+    """Set to run on a deterministic random sample of approximately this fraction of data."""
+    seed: int = 0
+    """Seed for `sample_fraction`."""
+    limit: Optional[int] = None
+    """Set to run on at most this number of datapoints."""
+
+    def apply(self, data_source: BaseDataSource, completed: Iterable[Dict[str, str]] = ()) -> BaseDataSource:
+        """Lazily select datapoints to run on, skipping `completed` ones as well as those in the manifest."""
+        if self.dedupe:
+            data_source = data_source.dedupe()
+        if self.exclude_manifest:
+            data_source = data_source.exclude(self.exclude_manifest)
+        data_source = data_source.exclude(completed)
+        if self.num_shards > 1:
+            data_source = data_source.shard(self.num_shards, self.shard_index)
+        if self.sample_fraction is not None:
+            data_source = data_source.sample(self.sample_fraction, seed=self.seed)
+        if self.limit is not None:
+            data_source = data_source.head(self.limit)
+        return data_source
 
 
 class DataSourceConfig(BaseModel):
     type: str
     hf: HFDataSourceConfig
     local: LocalFileDataSourceConfig
+    selection: DataSelectionConfig = DataSelectionConfig()
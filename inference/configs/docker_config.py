@@ -1,6 +1,7 @@
 import os
-from typing import Dict, Optional
+from typing import Dict, List, Optional
 
+from env_setup_utils.repo_downloader import RepoSource
 from pydantic import BaseModel, validator
 
 
@@ -30,6 +31,22 @@ class DockerConfig(BaseModel):
     """Language for the current run; used to determine the path to repositories' sources inside HuggingFace dataset."""
     clear_repo: bool
     """Set to True to remove each downloaded repository after execution finishes, False to keep it."""
+    repo_sources: List[RepoSource] = ["github", "hf"]
+    """Sources to obtain repositories from, in order: `local`, `hf_cache`, `hf` and/or `github`.
+    Refer to `RepoDownloader` for details."""
+    repo_archives_dir: Optional[str] = None
+    """Local path to directory with repositories archives; required for `local` source."""
+    repo_source_timeouts: Dict[str, float] = {}
+    """Timeouts in seconds for network sources (`hf`, `github`)."""
+    repo_failures_cache_path: Optional[str] = None
+    """JSONLines file to persist definitive download failures (repository or revision not found in a source) to,
+    so that they are skipped in subsequent runs. When not set, failures are not remembered between datapoints."""
+    repo_failures_ttl: Optional[float] = 7 * 24 * 60 * 60
+    """Time in seconds after which a remembered failure is retried; None to never retry."""
+    repo_copy_on_write: bool = False
+    """Set to True to download each repository@revision once and give each run its own (reflink) copy of it,
+    so that concurrent runs of the same repository@revision don't collide. With `clear_repo`, only the run's copy
+    is removed."""
 
     @validator("env_vars", pre=True)
     def set_env_vars(cls, env_vars: Dict[str, Optional[str]]) -> Dict[str, str]:
@@ -1,5 +1,7 @@
 from enum import Enum
-from typing import Dict, Optional
+from typing import Dict, Optional, Sequence
+
+from env_setup_utils.repo_downloader import RepoSource
 
 from src.async_bash_executor import AsyncBashExecutor
 from src.toolkits import BashTerminalToolkit, JVMBashTerminalToolkit, PythonBashTerminalToolkit
@@ -28,6 +30,12 @@ class EnvSetupToolkit(Enum):
         output_dir: str,
         language: str,
         clear_repo: bool,
+        repo_sources: Sequence[RepoSource] = ("github", "hf"),
+        repo_archives_dir: Optional[str] = None,
+        repo_source_timeouts: Optional[Dict[str, float]] = None,
+        repo_failures_cache_path: Optional[str] = None,
+        repo_failures_ttl: Optional[float] = 7 * 24 * 60 * 60,
+        repo_copy_on_write: bool = False,
     ) -> BaseEnvSetupToolkit:
         bash_executor = await AsyncBashExecutor.create(
             repository=repository,
@@ -43,6 +51,12 @@ class EnvSetupToolkit(Enum):
             output_dir=output_dir,
             language=language,
             clear_repo=clear_repo,
+            repo_sources=repo_sources,
+            repo_archives_dir=repo_archives_dir,
+            repo_source_timeouts=repo_source_timeouts,
+            repo_failures_cache_path=repo_failures_cache_path,
+            repo_failures_ttl=repo_failures_ttl,
+            repo_copy_on_write=repo_copy_on_write,
         )
 
         if self == EnvSetupToolkit.bash:
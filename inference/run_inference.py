@@ -5,12 +5,14 @@ import shutil
 import subprocess
 import sys
 import tempfile
+import time
 import traceback
 from argparse import ArgumentParser
-from typing import Any, Awaitable, Dict, List, Sequence
+from typing import Any, Callable, Coroutine, Dict, Iterable, List, Optional, Set, TypeVar
 
 import jsonlines
 from dotenv import load_dotenv
+from env_setup_utils.progress_events import ProgressEventWriter
 from huggingface_hub import HfApi  # type: ignore[import-untyped]
 from hydra import compose, initialize
 from omegaconf import OmegaConf
@@ -27,23 +29,56 @@ formatter = logging.Formatter("[%(asctime)s][%(name)s][%(levelname)s] - %(messag
 handler.setFormatter(formatter)
 root.addHandler(handler)
 
+T = TypeVar("T")
 
-async def run_limited(coroutines: Sequence[Awaitable[Any]], batch_size: int):
-    sem = asyncio.Semaphore(batch_size)
 
-    async def runner(coro):
-        async with sem:
-            return await coro
-
-    tasks = [asyncio.create_task(runner(c)) for c in coroutines]
-    return await asyncio.gather(*tasks)
+async def run_limited(
+    examples: Iterable[T],
+    run_one: Callable[[T], Coroutine[Any, Any, None]],
+    max_concurrent: Optional[int],
+    on_exhausted: Callable[[int], None],
+) -> None:
+    """Start `run_one` for examples as they are read, with at most `max_concurrent` running at once.
+
+    Examples are pulled from the (possibly streamed) data source only when there is a free slot, in a worker thread
+    so that downloading does not block running datapoints; `on_exhausted` gets the total once the source runs out.
+    If reading the data source fails, the datapoints that are still running are cancelled.
+    """
+    semaphore = asyncio.Semaphore(max_concurrent) if max_concurrent else None
+    running: Set[asyncio.Task[None]] = set()
+    iterator = iter(examples)
+    num_examples = 0
+    try:
+        while True:
+            if semaphore is not None:
+                await semaphore.acquire()
+            example = await asyncio.to_thread(next, iterator, None)
+            if example is None:
+                if semaphore is not None:
+                    semaphore.release()
+                break
+            num_examples += 1
+            task: asyncio.Task[None] = asyncio.create_task(run_one(example))
+            running.add(task)
+            task.add_done_callback(running.discard)
+            if semaphore is not None:
+                task.add_done_callback(lambda _: semaphore.release())
+        on_exhausted(num_examples)
+        await asyncio.gather(*running)
+    finally:
+        for task in running:
+            task.cancel()
+        await asyncio.gather(*running, return_exceptions=True)
 
 
 async def process_single_datapoint(
     repository: str,
     revision: str,
     config: EnvSetupRunnerConfig,
+    progress_events: ProgressEventWriter,
 ) -> None:
+    start_time = time.time()
+    progress_events.started(repository, revision)
     try:
         toolkit = await config.agent.toolkit.instantiate(
             repository=repository,
@@ -59,6 +94,12 @@ async def process_single_datapoint(
             output_dir=config.docker.output_dir,
             language=config.docker.language,
             clear_repo=config.docker.clear_repo,
+            repo_sources=config.docker.repo_sources,
+            repo_archives_dir=config.docker.repo_archives_dir,
+            repo_source_timeouts=config.docker.repo_source_timeouts,
+            repo_failures_cache_path=config.docker.repo_failures_cache_path,
+            repo_failures_ttl=config.docker.repo_failures_ttl,
+            repo_copy_on_write=config.docker.repo_copy_on_write,
         )
 
         agent = config.agent.instantiate(toolkit=toolkit)
@@ -70,23 +111,37 @@ async def process_single_datapoint(
             log_trajectory=config.log_trajectory,
             logging_dir=config.logging_dir,
         )
+        # the reference point for the latency of the first trajectory node in run reports
+        progress_events.emit("agent_started", repository=repository, revision=revision)
+        timed_out = False
         if config.global_timeout:
             try:
                 await asyncio.wait_for(runner.arun(), timeout=config.global_timeout)
             except asyncio.TimeoutError:
+                timed_out = True
                 logging.warning(
                     f"[{repository}@{revision}] Stopped due to reaching global timeout {config.global_timeout}."
                 )
         else:
             await runner.arun()
+        agent_time = time.time() - start_time
         try:
             await asyncio.wait_for(toolkit.clean(), timeout=60 * 3)
         except asyncio.TimeoutError:
             logging.warning(f"[{repository}@{revision}] Unable to clean container in 3 minutes.")
+        progress_events.finished(
+            repository,
+            revision,
+            duration=time.time() - start_time,
+            agent_time=agent_time,
+            timed_out=timed_out,
+            container_restarts=toolkit.bash_executor.container_restarts,
+        )
         return None
 
-    except Exception:
+    except Exception as e:
         logging.error(f"An error occurred for {repository}@{revision}: {traceback.format_exc()}")
+        progress_events.failed(repository, revision, duration=time.time() - start_time, error=repr(e))
         return None
 
 
@@ -113,10 +168,10 @@ async def main(config_name: str, config_path: str):
             if os.path.exists(cfg_model.logging_dir):
                 shutil.rmtree(cfg_model.logging_dir)
 
-        data_source = getattr(cfg_model.data_source, cfg_model.data_source.type).instantiate()
+        progress_events = ProgressEventWriter.from_env("inference")
 
+        processed_trajectories: List[Dict[str, str]] = []
         if not cfg_model.rewrite_trajectories and os.path.exists(cfg_model.logging_dir):
-            processed_trajectories: List[Dict[str, str]] = []
             for trajectory_file in os.listdir(cfg_model.logging_dir):
                 repository, revision = trajectory_file[: -len(".jsonl")].split("@")
                 repository = repository.replace("__", "/")
@@ -126,37 +181,34 @@ async def main(config_name: str, config_path: str):
                 if messages and messages[-1]["node"] == "commands_history":
                     processed_trajectories.append({"repository": repository, "revision": revision})
 
-            coroutines = [
-                process_single_datapoint(
-                    config=cfg_model,
-                    repository=example["repository"],
-                    revision=example["revision"],
-                )
-                for example in data_source
-                if {"repository": example["repository"], "revision": example["revision"]} not in processed_trajectories
-            ]
-        else:
-            coroutines = [
-                process_single_datapoint(
-                    config=cfg_model,
-                    repository=example["repository"],
-                    revision=example["revision"],
-                )
-                for example in data_source
-            ]
-
-        logging.info(f"Got {len(coroutines)} repositories to process.")
+        data_source = cfg_model.data_source.selection.apply(
+            getattr(cfg_model.data_source, cfg_model.data_source.type).instantiate(),
+            completed=processed_trajectories,
+        )
 
         if cfg_model.langsmith_project is not None:
             os.environ["LANGCHAIN_TRACING_V2"] = "true"
             os.environ["LANGCHAIN_ENDPOINT"] = "https://api.smith.langchain.com"
             os.environ["LANGCHAIN_PROJECT"] = cfg_model.langsmith_project
 
-        if cfg_model.max_concurrent:
-            await run_limited(coroutines, cfg_model.max_concurrent)
-        else:
-            for task_future in asyncio.as_completed(coroutines):
-                await task_future
+        def on_exhausted(num_examples: int) -> None:
+            logging.info(f"Got {num_examples} repositories to process.")
+            progress_events.total(num_examples)
+
+        try:
+            await run_limited(
+                data_source,
+                lambda example: process_single_datapoint(
+                    config=cfg_model,
+                    repository=example["repository"],
+                    revision=example["revision"],
+                    progress_events=progress_events,
+                ),
+                cfg_model.max_concurrent,
+                on_exhausted,
+            )
+        finally:
+            progress_events.close()
 
         if cfg_model.hf.upload:
             hf_api = HfApi()
@@ -3,14 +3,14 @@ import logging
 import os
 import time
 import uuid
-from typing import Dict, List, Optional, Tuple, TypedDict
+from typing import Dict, List, Optional, Sequence, Tuple, TypedDict
 
 from aiodocker import Docker
 from aiodocker.containers import DockerContainer
 from aiodocker.exceptions import DockerError
 from aiodocker.execs import Exec
 from aiodocker.stream import Stream
-from env_setup_utils.repo_downloader import RepoDownloader
+from env_setup_utils.repo_downloader import RepoDownloader, RepoSource
 
 
 class CommandExecutionResult(TypedDict):
@@ -43,6 +43,13 @@ class AsyncBashExecutor:
         clear_repo: bool,
         exec_instance: Exec,
         exec_stream: Stream,
+        repo_sources: Sequence[RepoSource] = ("github", "hf"),
+        repo_archives_dir: Optional[str] = None,
+        repo_source_timeouts: Optional[Dict[str, float]] = None,
+        repo_failures_cache_path: Optional[str] = None,
+        repo_failures_ttl: Optional[float] = 7 * 24 * 60 * 60,
+        repo_copy_on_write: bool = False,
+        run_id: Optional[str] = None,
     ):
         self.repository = repository
         self.revision = revision
@@ -61,6 +68,8 @@ class AsyncBashExecutor:
 
         self.commands_history: List[CommandExecutionResult] = []
         """List of tuples with bash commands and their exit codes."""
+        self.container_restarts = 0
+        """Number of times the container was restarted after a timeout or a failure."""
 
         self.client: Docker = docker_client
         self.container: DockerContainer = container
@@ -71,6 +80,13 @@ class AsyncBashExecutor:
         self.output_dir: str = output_dir
         self.hf_name = hf_name
         self.language = language
+        self.repo_sources = repo_sources
+        self.repo_archives_dir = repo_archives_dir
+        self.repo_source_timeouts = repo_source_timeouts
+        self.repo_failures_cache_path = repo_failures_cache_path
+        self.repo_failures_ttl = repo_failures_ttl
+        self.repo_copy_on_write = repo_copy_on_write
+        self.run_id = run_id
 
         self._command_lock = asyncio.Lock()
 
@@ -93,12 +109,35 @@ class AsyncBashExecutor:
         return exec_instance, exec_stream
 
     @staticmethod
-    def _download_repo(repository: str, revision: str, hf_name: str, output_dir: str, language: str) -> str:
-        repo_downloader = RepoDownloader(hf_name=hf_name, output_dir=output_dir, language=language)
-        is_downloaded = repo_downloader.download(repo_name=repository, commit_sha=revision)
+    def _download_repo(
+        repository: str,
+        revision: str,
+        hf_name: str,
+        output_dir: str,
+        language: str,
+        repo_sources: Sequence[RepoSource],
+        repo_archives_dir: Optional[str],
+        repo_source_timeouts: Optional[Dict[str, float]],
+        repo_failures_cache_path: Optional[str],
+        repo_failures_ttl: Optional[float],
+        repo_copy_on_write: bool,
+        run_id: Optional[str],
+    ) -> str:
+        repo_downloader = RepoDownloader(
+            hf_name=hf_name,
+            output_dir=output_dir,
+            language=language,
+            sources=repo_sources,
+            local_archives_dir=repo_archives_dir,
+            source_timeouts=repo_source_timeouts,
+            failures_cache_path=repo_failures_cache_path,
+            failures_ttl=repo_failures_ttl,
+            copy_on_write=repo_copy_on_write,
+        )
+        is_downloaded = repo_downloader.download(repo_name=repository, commit_sha=revision, run_id=run_id)
         if not is_downloaded:
             raise ValueError(f"Unable to download repository {repository}@{revision}.")
-        return repo_downloader.get_repo_dir_path(repo_name=repository, commit_sha=revision)
+        return repo_downloader.get_repo_dir_path(repo_name=repository, commit_sha=revision, run_id=run_id)
 
     @classmethod
     async def create(
@@ -118,8 +157,16 @@ class AsyncBashExecutor:
         container_start_timeout: int = 30,
         bash_timeout: Optional[int] = None,
         max_num_chars_bash_output: Optional[int] = None,
+        repo_sources: Sequence[RepoSource] = ("github", "hf"),
+        repo_archives_dir: Optional[str] = None,
+        repo_source_timeouts: Optional[Dict[str, float]] = None,
+        repo_failures_cache_path: Optional[str] = None,
+        repo_failures_ttl: Optional[float] = 7 * 24 * 60 * 60,
+        repo_copy_on_write: bool = False,
     ) -> "AsyncBashExecutor":
         env_vars = env_vars or {}
+        # each executor works with its own copy of the repository when copy-on-write checkouts are enabled
+        run_id = uuid.uuid4().hex if repo_copy_on_write else None
         client = Docker()
         try:
             await cls._pull_image(client=client, image=image)
@@ -134,6 +181,13 @@ class AsyncBashExecutor:
                 hf_name=hf_name,
                 output_dir=output_dir,
                 language=language,
+                repo_sources=repo_sources,
+                repo_archives_dir=repo_archives_dir,
+                repo_source_timeouts=repo_source_timeouts,
+                repo_failures_cache_path=repo_failures_cache_path,
+                repo_failures_ttl=repo_failures_ttl,
+                repo_copy_on_write=repo_copy_on_write,
+                run_id=run_id,
             )
 
             exec_instance, exec_stream = await cls._init_exec_stream(
@@ -163,6 +217,13 @@ class AsyncBashExecutor:
                 language=language,
                 clear_repo=clear_repo,
                 command=command,
+                repo_sources=repo_sources,
+                repo_archives_dir=repo_archives_dir,
+                repo_source_timeouts=repo_source_timeouts,
+                repo_failures_cache_path=repo_failures_cache_path,
+                repo_failures_ttl=repo_failures_ttl,
+                repo_copy_on_write=repo_copy_on_write,
+                run_id=run_id,
             )
         except Exception:
             await client.close()
@@ -194,14 +255,30 @@ class AsyncBashExecutor:
         language: str,
         output_dir: str,
         timeout: int,
+        repo_sources: Sequence[RepoSource] = ("github", "hf"),
+        repo_archives_dir: Optional[str] = None,
+        repo_source_timeouts: Optional[Dict[str, float]] = None,
+        repo_failures_cache_path: Optional[str] = None,
+        repo_failures_ttl: Optional[float] = 7 * 24 * 60 * 60,
+        repo_copy_on_write: bool = False,
+        run_id: Optional[str] = None,
     ) -> DockerContainer:
         logging.info(f"[{repository}@{revision}] Downloading repository.")
-        local_repo_path = AsyncBashExecutor._download_repo(
+        # downloading, extracting and waiting for other runs of the same repository block, so they run in a thread
+        local_repo_path = await asyncio.to_thread(
+            AsyncBashExecutor._download_repo,
             repository=repository,
             revision=revision,
             hf_name=hf_name,
             language=language,
             output_dir=output_dir,
+            repo_sources=repo_sources,
+            repo_archives_dir=repo_archives_dir,
+            repo_source_timeouts=repo_source_timeouts,
+            repo_failures_cache_path=repo_failures_cache_path,
+            repo_failures_ttl=repo_failures_ttl,
+            repo_copy_on_write=repo_copy_on_write,
+            run_id=run_id,
         )
         repository_dir = os.path.basename(local_repo_path)
 
@@ -260,6 +337,7 @@ class AsyncBashExecutor:
             logging.error(f"[{self.repository}@{self.revision}] Error stopping container {self.container.id}: {e}")
 
     async def restart_container(self) -> None:
+        self.container_restarts += 1
         try:
             if self.container:
                 container_info = await self.container.show()
@@ -279,6 +357,13 @@ class AsyncBashExecutor:
             output_dir=self.output_dir,
             timeout=self.container_start_timeout,
             command=self.command,
+            repo_sources=self.repo_sources,
+            repo_archives_dir=self.repo_archives_dir,
+            repo_source_timeouts=self.repo_source_timeouts,
+            repo_failures_cache_path=self.repo_failures_cache_path,
+            repo_failures_ttl=self.repo_failures_ttl,
+            repo_copy_on_write=self.repo_copy_on_write,
+            run_id=self.run_id,
         )
         self.container = container
 
@@ -403,7 +488,9 @@ class AsyncBashExecutor:
                 repo_downloader = RepoDownloader(
                     hf_name=self.hf_name, output_dir=self.output_dir, language=self.language
                 )
-                repo_downloader.clear_repo(repo_name=self.repository, commit_sha=self.revision)
+                await asyncio.to_thread(
+                    repo_downloader.clear_repo, repo_name=self.repository, commit_sha=self.revision, run_id=self.run_id
+                )
                 logging.info(f"[{self.repository}@{self.revision}] Repository removed.")
         except DockerError as e:
             logging.error(f"[{self.repository}@{self.revision}] Error cleaning: {e}")
@@ -0,0 +1,52 @@
+import asyncio
+
+import pytest
+
+from run_inference import run_limited
+
+
+def test_run_limited():
+    read = []
+    done = []
+    running = 0
+    max_running = 0
+    totals = []
+
+    def examples():
+        for i in range(10):
+            read.append(i)
+            yield {"repository": f"owner/name{i}"}
+
+    async def run_one(example):
+        nonlocal running, max_running
+        running += 1
+        max_running = max(max_running, running)
+        # examples are read only when there is a free slot
+        assert len(read) - len(done) <= 2
+        await asyncio.sleep(0.01)
+        running -= 1
+        done.append(example["repository"])
+
+    asyncio.run(run_limited(examples(), run_one, max_concurrent=2, on_exhausted=totals.append))
+    assert sorted(done) == sorted(f"owner/name{i}" for i in range(10))
+    assert max_running == 2
+    assert totals == [10]
+
+
+def test_run_limited_cancels_running_on_read_error():
+    cancelled = []
+
+    def examples():
+        yield {"repository": "owner/name"}
+        raise RuntimeError("stream failed")
+
+    async def run_one(example):
+        try:
+            await asyncio.sleep(10)
+        except asyncio.CancelledError:
+            cancelled.append(example["repository"])
+            raise
+
+    with pytest.raises(RuntimeError):
+        asyncio.run(run_limited(examples(), run_one, max_concurrent=2, on_exhausted=lambda _: None))
+    assert cancelled == ["owner/name"]